@@ -0,0 +1,502 @@
+# batch_grading.py
+
+import os
+import sys
+import csv
+import glob
+import json
+import time
+import argparse
+import importlib.util
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+from ows_parser import MAX_PAYLOAD_BYTES_ENV, PayloadTooLarge, load_ows_file, parse_submission_name, get_file_widget_source
+from dataset_cache import CACHE_DIR_ENV, default_cache_dir, get_dataset_cache, is_remote_source
+from dataset_fetch import FETCH_TIMEOUT_ENV, MAX_DOWNLOAD_BYTES_ENV, get_dataset_fetcher
+from grading_criteria_checks import CRITERIA, DATA_CRITERIA, DEFAULT_PARAMS, PARAM_CRITERIA, PROPERTY_WIDGETS, grade_workflow, workflow_ca
+from result_store import criterion_cache_keys, data_source_of, get_result_store, hash_file, score_cache_key
+from rubric_engine import compile_rubric, load_rubric, merge_plans
+from profiling import ProfileReport, get_profiler
+from similarity import build_index, print_clusters, write_similarity_csv
+from zip_ingest import ZIP_ERRORS, list_zip_submissions
+
+META_COLUMNS = ["student_id", "student_name", "file"]
+TAIL_COLUMNS = ["ca", "data_summary", "status", "error", "cached", "elapsed_ms"]
+CA_KEY = "score:CA"  # 채점 결과 캐시에서 CA 값을 저장하는 ID
+_warned_archives = set()  # 감시 모드에서 같은 깨진 ZIP 을 주기마다 다시 경고하지 않도록
+
+
+def find_submissions(target):
+    # 디렉터리면 하위 폴더까지 *.ows 와 *.zip 전부, 아니면 glob 패턴으로 취급
+    # LMS 에서 받은 .zip 은 압축을 풀지 않고 안의 .ows 멤버들을 "반.zip::멤버" 경로로 펼침
+    # 열 수 없는 ZIP 은 경고하고 ZIP 경로 자체를 제출물로 남김 -> 채점하면 "malformed" 행 (조용히 빠지지 않게)
+    if os.path.isdir(target):
+        root = glob.escape(target)
+        paths = glob.glob(os.path.join(root, "**", "*.ows"), recursive=True) + glob.glob(os.path.join(root, "**", "*.zip"), recursive=True)
+    else: paths = glob.glob(target, recursive=True)
+    submissions = [p for p in paths if p.lower().endswith(".ows") and os.path.isfile(p)]
+    for archive in (p for p in paths if p.lower().endswith(".zip") and os.path.isfile(p)):
+        try: submissions.extend(list_zip_submissions(archive))
+        except (OSError,) + ZIP_ERRORS as e:
+            if archive not in _warned_archives: _warned_archives.add(archive); print(f"경고: ZIP 을 열 수 없음: {archive} ({type(e).__name__}: {e})", file=sys.stderr)
+            submissions.append(archive)
+    return sorted(submissions)
+
+def criterion_ids_for(rubric=None):
+    return compile_rubric(rubric).criterion_ids if rubric is not None else [c[0] for c in CRITERIA]
+
+def criterion_labels_for(rubric=None):
+    return {c["id"]: c["label"] for c in compile_rubric(rubric).criteria} if rubric is not None else {c[0]: c[1] for c in CRITERIA}
+
+def data_widgets_for(rubric=None):
+    return sorted(set(compile_rubric(rubric).data_criteria.values())) if rubric is not None else sorted(set(DATA_CRITERIA.values()))
+
+def data_phase_criteria(rubric=None, recompute=False):
+    # 데이터셋이 있어야 판정할 수 있는 기준 ID: 데이터 기준 + (recompute 면) 워크플로를 다시 실행하는 점수 기준
+    if rubric is None: return set(DATA_CRITERIA) | ({"5-1"} if recompute else set())
+    plan = compile_rubric(rubric)
+    return set(plan.data_criteria) | {c["id"] for c in plan.criteria if c["type"] == "score" and (recompute or c["recompute"])}
+
+def _grade_criteria(file_path, plan, ca_threshold, check_data, only=None, recompute=False, outcomes=None):
+    # 파일을 읽고 기준을 평가. (워크플로, 결과, 데이터 요약) 반환, 파일을 못 읽으면 워크플로가 None
+    if plan is not None and only is not None: plan = plan.subset(only)
+    workflow = load_ows_file(file_path, property_widgets=plan.property_widgets if plan else PROPERTY_WIDGETS)
+    if workflow is None: return None, {}, ""
+    if plan is not None: results, data_summary = plan.grade(workflow, check_data, recompute, outcomes)
+    else: results, data_summary = grade_workflow(workflow, ca_threshold=ca_threshold, check_data=check_data, only=only,
+                                                 recompute=recompute, outcomes=outcomes)
+    return workflow, results, data_summary
+
+def parse_variant(spec):
+    # "이름:키=값,키=값" -> 채점 변형 dict. 키는 DEFAULT_PARAMS 의 매개변수 또는 rubric(루브릭 파일 경로)
+    # 예: "strict:ca_threshold=0.8,sample_percentage=70", "v2:rubric=rubrics/v2.json"
+    name, _, assignments = spec.partition(":")
+    if not name or not assignments: raise ValueError(f"변형 형식은 '이름:키=값,...' 입니다: {spec}")
+    variant = {"name": name.strip()}
+    for assignment in assignments.split(","):
+        key, _, value = (part.strip() for part in assignment.partition("="))
+        if key == "rubric": variant["rubric"] = load_rubric(value)
+        elif key in DEFAULT_PARAMS: variant[key] = float(value) if isinstance(DEFAULT_PARAMS[key], float) else int(value)
+        else: raise ValueError(f"알 수 없는 변형 매개변수: {key} (가능: rubric, {', '.join(DEFAULT_PARAMS)})")
+    if "rubric" in variant and len(variant) > 2: raise ValueError(f"루브릭 변형의 값은 루브릭 파일에서 바꾸세요: {spec}")
+    return variant
+
+def _grade_variants(file_path, variants, check_data, recompute=False, outcomes=None):
+    # 파일 읽기/속성 디코딩/데이터 요약은 한 번만 하고 모든 변형을 같은 워크플로에 대해 평가
+    # 기본 기준 변형끼리는 매개변수를 쓰는 기준(PARAM_CRITERIA)만 다시 판정, 루브릭 변형끼리는 사실을 한 번만 모음
+    # (워크플로, 첫 변형의 결과, 첫 변형의 데이터 요약, {변형 이름: {"results", "data_summary", "score"}}) 반환
+    plans = [compile_rubric(v["rubric"]) if v.get("rubric") is not None else None for v in variants]
+    property_widgets = set()
+    for plan in plans: property_widgets |= plan.property_widgets if plan is not None else PROPERTY_WIDGETS
+    workflow = load_ows_file(file_path, property_widgets=property_widgets)
+    if workflow is None: return None, {}, "", {}
+    if plans[0] is not None and outcomes is not None: outcomes.update(dict.fromkeys(plans[0].criterion_ids, "running"))
+    rubric_plans = [plan for plan in plans if plan is not None]
+    facts = merge_plans(rubric_plans).collect(workflow, check_data, recompute) if rubric_plans else None
+    graded = {}; shared = None
+    for index, (variant, plan) in enumerate(zip(variants, plans)):
+        variant_outcomes = outcomes if index == 0 else None
+        if plan is not None:
+            results, data_summary = plan.grade(workflow, check_data, recompute, variant_outcomes, facts)
+        else:
+            params = {key: variant[key] for key in DEFAULT_PARAMS if key in variant}
+            if shared is None:
+                results, data_summary = grade_workflow(workflow, check_data=check_data, recompute=recompute, outcomes=variant_outcomes, params=params)
+                shared = (results, data_summary)
+            else:
+                results, _ = grade_workflow(workflow, check_data=check_data, only=set(PARAM_CRITERIA), recompute=recompute, params=params)
+                results = dict(shared[0], **results); data_summary = shared[1]
+        graded[variant["name"]] = {"results": results, "data_summary": data_summary, "score": sum(1 for v in results.values() if v is True)}
+    first = graded[variants[0]["name"]]
+    return workflow, first["results"], first["data_summary"], graded
+
+def grade_submission(file_path, ca_threshold=0.0, rubric=None, check_data=True, result_store=None, profile=None, recompute=False,
+                     outcomes=None, variants=None, only=None):
+    # profile(dict)이 주어지면 기준/파서 함수별 시간·호출 수·메모리·캐시 적중을 재서 row["profile"] 에 담음
+    # outcomes(dict)를 넘기면 채점하는 동안 기준별 결과 종류를 그 자리에서 채움 (시간 초과로 멈췄을 때 어느 기준이었는지 알 수 있게)
+    # variants(parse_variant 의 dict 목록)가 주어지면 모든 변형을 한 번에 채점해서 row["variants"] 에 담음 (첫 변형이 기본 열)
+    # only(기준 ID 집합)가 주어지면 그 기준만 채점 (나머지 기준은 행에 없고 결과 종류는 "skipped")
+    if not profile: return _grade_submission(file_path, ca_threshold, rubric, check_data, result_store, recompute, outcomes, variants, only)
+    with get_profiler(profile, globals()).submission(file_path) as trace:
+        row = _grade_submission(file_path, ca_threshold, rubric, check_data, result_store, recompute, outcomes, variants, only)
+    trace.update(status=row["status"], cached=row.get("cached", 0)); row["profile"] = trace
+    return row
+
+def _grade_submission(file_path, ca_threshold=0.0, rubric=None, check_data=True, result_store=None, recompute=False, outcomes=None,
+                      variants=None, only=None):
+    # 한 제출물을 채점해서 결과 행(dict) 반환. MemoryError 말고는 예외를 밖으로 내보내지 않음
+    # (메모리 부족은 프로세스 상태를 믿을 수 없으므로 호출한 쪽에서 "memory" 로 기록하고 워커를 교체)
+    # rubric(dict)이 주어지면 기본 check_criterion_* 대신 루브릭 엔진으로 채점
+    # recompute=True 면 CA 같은 점수 기준을 저장된 값 대신 워크플로를 다시 실행해서 판정 (Orange 필요)
+    # result_store(SQLite 경로)가 주어지면 파일 내용 해시 + 기준 캐시 키가 같은 기준은 저장된 결과를 재사용
+    # row["outcomes"]: 기준별 "ok" / "cached" / "skipped" / "payload" / "malformed" / "error" 등 (finish_outcomes 참고)
+    student_id, student_name = parse_submission_name(file_path)
+    outcomes = {} if outcomes is None else outcomes
+    row = {"student_id": student_id, "student_name": student_name, "file": file_path,
+           "data_summary": "", "status": "ok", "error": "", "cached": 0, "outcomes": outcomes, "ca": None}
+    started = time.perf_counter(); criterion_ids = []
+    try:
+        plan = compile_rubric(rubric) if rubric is not None else None
+        criterion_ids = plan.criterion_ids if plan else [c[0] for c in CRITERIA]
+        data_criteria = plan.data_criteria if plan else DATA_CRITERIA
+        if variants:
+            # 변형마다 판정이 달라 채점 결과 캐시는 쓰지 않음
+            workflow, results, data_summary, row["variants"] = _grade_variants(file_path, variants, check_data, recompute, outcomes)
+            if workflow is not None: row["ca"] = _workflow_ca(workflow, recompute and check_data)
+        elif result_store is None:
+            workflow, results, data_summary = _grade_criteria(file_path, plan, ca_threshold, check_data, only, recompute, outcomes)
+            if workflow is not None: row["ca"] = _workflow_ca(workflow, recompute and check_data)
+        else:
+            store = get_result_store(result_store); file_hash = hash_file(file_path)
+            keys = criterion_cache_keys(rubric, ca_threshold, recompute and check_data)
+            keys[CA_KEY] = score_cache_key("CA", recompute and check_data)
+            wanted = [c for c in criterion_ids if (check_data or c not in data_criteria) and (only is None or c in only)]
+            cached = store.lookup(file_hash, {c: keys[c] for c in wanted + [CA_KEY]})
+            cached_ca = cached.pop(CA_KEY, None)
+            missing = [c for c in wanted if c not in cached]
+            workflow, results, data_summary = None, {}, ""
+            if cached_ca is not None: row["ca"] = cached_ca[0]
+            if missing or cached_ca is None:
+                workflow, results, data_summary = _grade_criteria(file_path, plan, ca_threshold, check_data, set(missing), recompute, outcomes)
+            if workflow is not None:
+                entries = []
+                if cached_ca is None:
+                    row["ca"] = _workflow_ca(workflow, recompute and check_data)
+                    entries.append((CA_KEY, keys[CA_KEY], row["ca"], None, None))
+                for c in missing:
+                    if outcomes.get(c) != "ok": continue  # 크기 상한 등으로 평가하지 못한 기준은 저장하지 않음
+                    if c in data_criteria:
+                        # 데이터 기준은 통과했을 때만 저장 (일시적인 네트워크 오류 등으로 실패한 결과는 다음 실행에서 다시 확인)
+                        if results.get(c) is not True: continue
+                        entries.append((c, keys[c], True, data_summary, data_source_of(workflow, data_criteria[c])))
+                    else: entries.append((c, keys[c], results.get(c), None, None))
+                store.save(file_hash, entries)
+            if workflow is not None or not missing:
+                for c, (value, cached_summary) in cached.items():
+                    results[c] = value; outcomes[c] = "cached"
+                    if cached_summary: data_summary = cached_summary
+                if not check_data: data_summary = data_summary or "데이터 검증 생략 (구조 채점 모드)"
+                row["cached"] = len(cached)
+        if workflow is None and not results:
+            row["status"] = "malformed"; row["error"] = "파일을 읽을 수 없음 (없는 파일 또는 XML 파싱 실패)"
+            outcomes.update(dict.fromkeys(criterion_ids, "malformed"))
+        else:
+            row.update(results); row["data_summary"] = data_summary or "N/A"
+    except MemoryError: raise
+    except PayloadTooLarge as e:
+        row["status"] = "too_large"; row["error"] = str(e)
+    except Exception as e:
+        row["status"] = "error"; row["error"] = f"{type(e).__name__}: {e}"
+    finish_outcomes(outcomes, criterion_ids, row["status"])
+    row["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return row
+
+def _workflow_ca(workflow, recompute=False):
+    try: return workflow_ca(workflow, recompute)
+    except PayloadTooLarge: return None
+
+def finish_outcomes(outcomes, criterion_ids, status):
+    # 채점이 중간에 멈춘 기준("running")과 시작도 못 한 기준은 멈춘 이유(status: error/timeout/memory/crashed ...)
+    # 정상 종료(status "ok")에서 평가하지 않은 기준(only 로 뺀 기준 등)만 "skipped"
+    for criterion_id in criterion_ids:
+        if outcomes.get(criterion_id) == "running": outcomes[criterion_id] = status
+        elif criterion_id not in outcomes: outcomes[criterion_id] = "skipped" if status == "ok" else status
+    return outcomes
+
+def failed_row(file_path, status, error_message, criterion_ids=(), outcomes=None):
+    # 채점 결과 없이 끝난 제출물의 행 (워커가 죽음/시간 초과/메모리 부족 등). outcomes 는 그때까지 채워진 기준별 결과 종류
+    student_id, student_name = parse_submission_name(file_path)
+    return {"student_id": student_id, "student_name": student_name, "file": file_path, "data_summary": "",
+            "status": status, "error": error_message, "cached": 0, "elapsed_ms": "", "ca": None,
+            "outcomes": finish_outcomes(dict(outcomes or {}), criterion_ids, status)}
+
+def memory_error_row(file_path, rubric=None, outcomes=None):
+    return failed_row(file_path, "memory", "메모리 부족 (MemoryError)", criterion_ids_for(rubric), outcomes)
+
+
+class ResultWriter:
+    # 제출물 하나가 끝날 때마다 CSV/JSONL 에 바로 한 줄씩 기록 (중간에 멈춰도 그때까지 결과는 남음)
+    # profile_report 가 있으면 행에 붙은 프로파일 trace 를 떼어서 그쪽으로 넘김
+    # npz_path 가 있으면 반 전체 결과를 열 단위 배열(class_results)로도 모아서 .npz 로 저장 (numpy 필요)
+    # variants([(변형 이름, 기준 ID 목록)])가 있으면 CSV 에 변형별 "이름:기준" 열과 "이름:score" 열을 나란히 붙임
+    def __init__(self, csv_path=None, jsonl_path=None, criterion_ids=None, profile_report=None, npz_path=None, labels=None, variants=None):
+        self.profile_report = profile_report
+        criterion_ids = list(criterion_ids or [c[0] for c in CRITERIA])
+        self.columns = META_COLUMNS + criterion_ids + TAIL_COLUMNS
+        for name, variant_criterion_ids in variants or ():
+            self.columns += [f"{name}:{c}" for c in variant_criterion_ids] + [f"{name}:score"]
+        self._csv_file = self._jsonl_file = self._csv_writer = None
+        self.class_results = None
+        if npz_path:
+            from class_results import ClassResultsWriter
+            self.class_results = ClassResultsWriter(npz_path, criterion_ids, labels)
+        if csv_path:
+            self._csv_file = open(csv_path, "w", newline="", encoding="utf-8-sig")  # 엑셀에서 한글이 깨지지 않도록 BOM
+            self._csv_writer = csv.DictWriter(self._csv_file, fieldnames=self.columns, extrasaction="ignore")
+            self._csv_writer.writeheader()
+        if jsonl_path: self._jsonl_file = open(jsonl_path, "w", encoding="utf-8")
+
+    def write(self, row):
+        trace = row.pop("profile", None)
+        if trace is not None and self.profile_report is not None: self.profile_report.add(trace)
+        if self._csv_writer is not None:
+            flat = dict(row)
+            for name, graded in row.get("variants", {}).items():
+                flat.update((f"{name}:{c}", value) for c, value in graded["results"].items()); flat[f"{name}:score"] = graded["score"]
+            self._csv_writer.writerow(flat); self._csv_file.flush()
+        if self._jsonl_file is not None:
+            self._jsonl_file.write(json.dumps(row, ensure_ascii=False) + "\n"); self._jsonl_file.flush()
+        if self.class_results is not None: self.class_results.write(row)
+
+    def close(self):
+        if self.class_results is not None: self.class_results.close()
+        for f in (self._csv_file, self._jsonl_file):
+            if f is not None: f.close()
+
+    def __enter__(self): return self
+    def __exit__(self, *exc_info): self.close()
+
+
+def iter_graded(paths, workers=None, limits=None, **grade_kwargs):
+    # 끝나는 순서대로 결과 행을 내보냄. 워커 프로세스가 죽으면 풀을 새로 만들어 남은 파일을 이어서 채점
+    # grade_kwargs 는 grade_submission 에 그대로 전달
+    # limits({"timeout", "memory_mb", "max_tasks_per_worker"})가 주어지면 제출물마다 시간/메모리 제한을 거는 격리 워커로 채점
+    workers = workers or os.cpu_count() or 1
+    if limits:
+        from isolated_worker import IsolatedPool
+        if not paths: return
+        criterion_ids = criterion_ids_for(grade_kwargs.get("rubric"))
+        with IsolatedPool(min(workers, len(paths)), **limits, **grade_kwargs) as pool:
+            # 풀이 멈추면 (워커가 시작도 못 하고 계속 죽음 등) 남은 제출물은 crashed 행으로
+            futures = {}
+            for path in paths:
+                try: futures[pool.submit(path)] = path
+                except RuntimeError as e: yield failed_row(path, "crashed", str(e), criterion_ids)
+            for future in as_completed(futures):
+                try: row = future.result()
+                except Exception as e: row = failed_row(futures[future], "crashed", f"{type(e).__name__}: {e}", criterion_ids)
+                yield row
+        return
+    if workers <= 1:
+        for path in paths:
+            try: row = grade_submission(path, **grade_kwargs)
+            except MemoryError: row = memory_error_row(path, grade_kwargs.get("rubric"))
+            yield row
+        return
+    pending = list(paths); retried = set()
+    while pending:
+        broken = []
+        # spawn: 원격 데이터 선행 다운로드 스레드가 도는 중에 fork 하지 않도록 (macOS 기본값과도 같음)
+        with ProcessPoolExecutor(max_workers=min(workers, len(pending)), mp_context=multiprocessing.get_context("spawn")) as pool:
+            futures = {pool.submit(grade_submission, path, **grade_kwargs): path for path in pending}
+            for future in as_completed(futures):
+                path = futures[future]
+                try: row = future.result()
+                except BrokenProcessPool: broken.append(path); continue
+                except MemoryError: row = memory_error_row(path, grade_kwargs.get("rubric"))
+                except Exception as e: row = failed_row(path, "crashed", f"{type(e).__name__}: {e}", criterion_ids_for(grade_kwargs.get("rubric")))
+                yield row
+        pending = []
+        for path in broken:
+            # 풀이 깨지면 같이 돌던 파일도 모두 실패하므로 한 번은 다시 시도, 두 번째도 실패하면 crashed 로 기록
+            if path in retried: yield failed_row(path, "crashed", "채점 워커 프로세스가 비정상 종료됨", criterion_ids_for(grade_kwargs.get("rubric")))
+            else: retried.add(path); pending.append(path)
+
+def collect_data_sources(paths, widgets=("File",)):
+    # 각 제출물의 데이터 소스 위젯 설정만 읽어서 {경로: 소스} 반환 (다른 위젯 속성은 메모리에 두지 않음)
+    # 읽다가 실패한 제출물(속성 크기 상한 초과 등)은 건너뜀 -> 워커가 채점하면서 "payload"/"error" 행으로 기록
+    sources = {}
+    for path in paths:
+        try:
+            workflow = load_ows_file(path, property_widgets=set(widgets))
+            if workflow is None: continue
+            for widget in widgets:
+                node_id = workflow.node_id(widget)
+                source, _ = get_file_widget_source(workflow.properties(node_id) if node_id else None)
+                if source: sources[path] = source; break
+        except Exception: continue
+    return sources
+
+def prefetch_remote_sources(paths, widgets=("File",)):
+    # 반 전체에서 서로 다른 원격 데이터셋 URL 을 모아 한꺼번에 (동시에) 내려받기 시작
+    # 워커는 같은 URL 을 파일 잠금으로 기다렸다가 내려받은 파일을 그대로 씀
+    cache = get_dataset_cache()
+    urls = {source for source in collect_data_sources(paths, widgets).values()
+            if is_remote_source(source) and cache.get(source) is None}
+    return get_dataset_fetcher().prefetch(urls)
+
+def _print_row(row, criterion_ids, position=""):
+    passed = sum(1 for criterion_id in criterion_ids if row.get(criterion_id) is True)
+    status = f"{passed}/{len(criterion_ids)}" if row["status"] == "ok" else f"{row['status']} - {row['error']}"
+    cached = f" (캐시 {row['cached']}개)" if row.get("cached") else ""
+    print(f"  {position}{row['student_id']} {row['student_name']}: {status}{cached}")
+
+def print_variant_table(rows, variants):
+    # 기준별로 변형마다 통과한 학생 수를 나란히 (변형끼리 달라진 기준에는 * 표시)
+    names = [variant["name"] for variant in variants]
+    graded_rows = [row["variants"] for row in rows if row.get("variants")]
+    if not graded_rows: return
+    criterion_ids = []
+    for name in names:
+        for c in graded_rows[0][name]["results"]:
+            if c not in criterion_ids: criterion_ids.append(c)
+    width = max(8, *(len(name) + 2 for name in names))
+    print(f"변형별 통과 학생 수 ({len(graded_rows)}명)")
+    print("  " + f"{'기준':<8}" + "".join(f"{name:>{width}}" for name in names))
+    for c in criterion_ids:
+        counts = [sum(1 for graded in graded_rows if graded[name]["results"].get(c) is True) for name in names]
+        present = [c in graded_rows[0][name]["results"] for name in names]
+        cells = "".join(f"{count if has else '-':>{width}}" for count, has in zip(counts, present))
+        print(f"  {c:<8}{cells}{'  *' if len(set(counts)) > 1 else ''}")
+    means = [sum(graded[name]["score"] for graded in graded_rows) / len(graded_rows) for name in names]
+    print("  " + f"{'평균 점수':<6}" + "".join(f"{mean:>{width}.2f}" for mean in means))
+
+def _file_signature(path):
+    try: st = os.stat(path)
+    except OSError: return None
+    return st.st_mtime_ns, st.st_size
+
+def watch_submissions(target, writer, criterion_ids, interval=0.5, **grade_kwargs):
+    # 제출 폴더를 주기적으로 확인해서 새로 생기거나 바뀐 파일만 바로 채점
+    # 복사 중인 파일을 읽지 않도록, 바뀐 뒤 한 주기 동안 크기/mtime 이 그대로일 때 채점
+    print(f"감시 모드: {target} (Ctrl+C 로 종료)")
+    seen = {path: _file_signature(path) for path in find_submissions(target)}
+    changing = {}
+    try:
+        while True:
+            time.sleep(interval)
+            for path in find_submissions(target):
+                signature = _file_signature(path)
+                if signature is None or seen.get(path) == signature: continue
+                if changing.get(path) != signature: changing[path] = signature; continue
+                del changing[path]; seen[path] = signature
+                row = grade_submission(path, **grade_kwargs)
+                writer.write(row); _print_row(row, criterion_ids, f"[변경 {row['elapsed_ms']} ms] ")
+    except KeyboardInterrupt:
+        print("감시 종료")
+
+def run_batch(target, csv_path=None, jsonl_path=None, workers=None, watch=False, watch_interval=0.5,
+              profile_trace=None, profile_top=10, similarity=None, similarity_csv=None, limits=None, npz_path=None, scheduled=False, ordered=False,
+              **grade_kwargs):
+    # grade_kwargs["variants"] 가 있으면 첫 변형은 기본 채점(rubric/ca_threshold)과 같아야 함 (main 에서 "base" 로 만듦)
+    # scheduled/ordered 면 scheduler 로 느린 제출물부터 채점하고 구조 기준 결과/진행률을 바로 보여 줌 (ordered: 결과 파일은 학번 순)
+    paths = find_submissions(target)
+    if not paths and not watch:
+        print(f"채점할 .ows 파일이 없습니다: {target}"); return []
+    rubric = grade_kwargs.get("rubric")
+    criterion_ids = criterion_ids_for(rubric)
+    scheduled = scheduled or ordered
+    if grade_kwargs.get("check_data", True) and paths and not scheduled:
+        prefetching = prefetch_remote_sources(paths, data_widgets_for(rubric))
+        if prefetching: print(f"원격 데이터셋 {len(prefetching)}개 선행 다운로드 시작")
+    print(f"제출물 {len(paths)}개 채점 시작 (워커 {workers or os.cpu_count()}개)")
+    started = time.perf_counter(); rows = []
+    report = ProfileReport(profile_trace) if grade_kwargs.get("profile") else None
+    variants = grade_kwargs.get("variants")
+    variant_columns = [(v["name"], criterion_ids_for(v.get("rubric"))) for v in variants] if variants else None
+    try:
+        with ResultWriter(csv_path, jsonl_path, criterion_ids, report, npz_path, criterion_labels_for(rubric), variant_columns) as writer:
+            if scheduled and paths:
+                from scheduler import run_scheduled
+                rows = run_scheduled(paths, writer, criterion_ids, workers, limits, ordered, **grade_kwargs)
+            else:
+                for done, row in enumerate(iter_graded(paths, workers, limits, **grade_kwargs), 1):
+                    writer.write(row); rows.append(row)
+                    _print_row(row, criterion_ids, f"[{done}/{len(paths)}] ")
+            print(f"채점 완료: {len(rows)}개, {time.perf_counter() - started:.2f}초")
+            if variants: print_variant_table(rows, variants)
+            if writer.class_results is not None:
+                rates = writer.class_results.results.pass_rates()
+                print("기준별 통과율: " + ", ".join(f"{c} {r * 100:.0f}%" for c, r in zip(criterion_ids, rates) if r == r))
+            if report is not None: report.print_summary(profile_top)
+            if similarity is not None:
+                # 채점이 끝난 뒤 반 전체를 한 번 더 훑어 서로 비슷한 워크플로 묶음을 보고 (similarity: Jaccard 임계값)
+                clusters = build_index([row["file"] for row in rows if row["status"] == "ok"], similarity).clusters()
+                print_clusters(clusters)
+                if similarity_csv: write_similarity_csv(similarity_csv, clusters)
+            if watch: watch_submissions(target, writer, criterion_ids, watch_interval, **grade_kwargs)
+    finally:
+        # 끝날 때 아직 받는 중이거나 대기 중인 선행 다운로드는 취소 (다운로드 스레드가 인터프리터 종료를 붙잡지 않게)
+        get_dataset_fetcher().close()
+        if report is not None: report.close()
+    return rows
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Orange .ows 제출물 일괄 채점")
+    parser.add_argument("target", help="제출물 디렉터리 또는 glob 패턴 (예: 'submissions/*.ows')")
+    parser.add_argument("--csv", dest="csv_path", help="결과 CSV 경로")
+    parser.add_argument("--jsonl", dest="jsonl_path", help="결과 JSONL 경로")
+    parser.add_argument("--npz", dest="npz_path", help="반 전체 결과 배열(.npz) 경로. class_results.py 로 통과율/반별/순위 집계 (numpy 필요)")
+    parser.add_argument("--workers", type=int, default=None, help="워커 프로세스 수 (기본: CPU 코어 수, 1이면 단일 프로세스)")
+    parser.add_argument("--ca-threshold", type=float, default=0.0, help="기준 5-1 의 CA 하한 (기본 0.0)")
+    parser.add_argument("--rubric", help="루브릭 파일(.json/.yaml). 지정하면 루브릭 엔진으로 채점 (예: rubrics/default_rubric.json)")
+    parser.add_argument("--variant", action="append", default=[], metavar="NAME:KEY=VALUE,...",
+                        help="같은 제출물을 한 번에 채점할 변형 (여러 번 지정). 키: ca_threshold, impute_method, sample_percentage, rubric. "
+                             "예: --variant 'strict:ca_threshold=0.8,sample_percentage=70'")
+    parser.add_argument("--structural-only", action="store_true", help="데이터셋을 불러오지 않고 구조 기준만 채점 (Orange import 없이 빠르게 시작)")
+    parser.add_argument("--cache-dir", help="데이터셋 요약/채점 결과 캐시 디렉터리 (기본: ~/.cache/orange_autograder)")
+    parser.add_argument("--fetch-timeout", type=float, help="원격 데이터셋 다운로드 타임아웃(초, 기본 20)")
+    parser.add_argument("--max-download-mb", type=float, help="원격 데이터셋 최대 크기(MB, 기본 200)")
+    parser.add_argument("--recompute-scores", action="store_true",
+                        help="CA 를 저장된 score_table 대신 워크플로를 다시 실행해서 구함 (Orange 필요, 같은 앞단은 학생끼리 한 번만 실행)")
+    parser.add_argument("--timeout", type=float, help="제출물당 채점 시간 제한(초). 제한 옵션을 주면 제출물마다 격리된 워커에서 채점")
+    parser.add_argument("--memory-limit-mb", type=float, help="워커 프로세스 메모리 상한(MB, RLIMIT_AS: Orange import 를 포함한 워커 전체 주소 공간. macOS 에서는 최대 RSS 로 워커 교체)")
+    parser.add_argument("--max-tasks-per-worker", type=int, help="워커 하나가 이만큼 채점하면 새 프로세스로 교체")
+    parser.add_argument("--max-payload-mb", type=float, help="노드 속성(pickle) 하나의 최대 크기(MB). 넘으면 그 기준은 payload 로 기록")
+    parser.add_argument("--schedule", action="store_true",
+                        help="사전 조사로 느린 제출물(원격/큰 데이터셋)부터 채점하고, 데이터셋을 받는 동안 구조 기준 결과를 먼저 보여 줌 (진행률/남은 시간 표시)")
+    parser.add_argument("--ordered", action="store_true", help="--schedule 에 더해 CSV/JSONL/.npz 를 학번 순으로 기록 (끝난 행은 앞 학번이 끝날 때까지 버퍼에 둠)")
+    parser.add_argument("--incremental", action="store_true", help="채점 결과 캐시 사용: 내용/기준이 바뀐 제출물·기준만 다시 채점")
+    parser.add_argument("--result-db", help="채점 결과 캐시 SQLite 경로 (기본: 캐시 디렉터리/results.sqlite, 지정하면 --incremental 포함)")
+    parser.add_argument("--watch", action="store_true", help="일괄 채점 후 제출 폴더를 감시하며 새/변경 파일을 바로 채점")
+    parser.add_argument("--watch-interval", type=float, default=0.5, help="감시 주기(초, 기본 0.5)")
+    parser.add_argument("--similarity", type=float, nargs="?", const=0.7, default=None, metavar="THRESHOLD",
+                        help="채점 후 워크플로 유사도(표절 의심) 그룹 보고. 임계값 생략 시 0.7")
+    parser.add_argument("--similarity-csv", help="유사도 그룹 CSV 경로 (기본: --csv 가 있으면 그 옆의 *_similarity.csv)")
+    parser.add_argument("--profile", action="store_true", help="기준/파서 함수별 시간·호출 수·캐시 적중을 재서 요약 출력")
+    parser.add_argument("--profile-memory", action="store_true", help="--profile 에 함수별 최대 메모리도 포함 (tracemalloc, 느려짐)")
+    parser.add_argument("--profile-trace", default="profile_trace.jsonl", help="제출물별 프로파일 trace JSONL 경로 (기본 profile_trace.jsonl)")
+    parser.add_argument("--profile-top", type=int, default=10, help="요약에 보여 줄 항목 수 (기본 10)")
+    parser.add_argument("--profile-files", help="cProfile 결과를 저장할 파일 이름 패턴 (예: '30101*', --profile 포함)")
+    parser.add_argument("--profile-tool", choices=["cprofile", "pyinstrument"], default="cprofile", help="--profile-files 에 쓸 프로파일러")
+    parser.add_argument("--profile-dir", default="profiles", help="cProfile(.prof)/pyinstrument(.html) 결과 폴더 (기본 profiles)")
+    args = parser.parse_args(argv)
+    # 워커 프로세스도 환경 변수로 같은 캐시/다운로드 설정을 씀
+    if args.cache_dir: os.environ[CACHE_DIR_ENV] = args.cache_dir
+    if args.fetch_timeout: os.environ[FETCH_TIMEOUT_ENV] = str(args.fetch_timeout)
+    if args.max_download_mb: os.environ[MAX_DOWNLOAD_BYTES_ENV] = str(int(args.max_download_mb * 1024 * 1024))
+    if args.max_payload_mb: os.environ[MAX_PAYLOAD_BYTES_ENV] = str(int(args.max_payload_mb * 1024 * 1024))
+    limits = None
+    if args.timeout or args.memory_limit_mb or args.max_tasks_per_worker:
+        limits = {"timeout": args.timeout, "memory_mb": args.memory_limit_mb, "max_tasks_per_worker": args.max_tasks_per_worker}
+    rubric = load_rubric(args.rubric) if args.rubric else None
+    variants = None
+    if args.variant:
+        if args.incremental or args.result_db: parser.error("--variant 는 --incremental/--result-db 와 함께 쓸 수 없습니다.")
+        base = {"name": "base", "rubric": rubric} if rubric is not None else {"name": "base", "ca_threshold": args.ca_threshold}
+        try: variants = [base] + [parse_variant(spec) for spec in args.variant]
+        except (ValueError, OSError) as e: parser.error(str(e))
+        if len({v["name"] for v in variants}) < len(variants): parser.error("변형 이름이 겹칩니다 (base 는 기본 채점 이름).")
+    result_store = None
+    if args.incremental or args.result_db:
+        result_store = args.result_db or os.path.join(default_cache_dir(), "results.sqlite")
+    similarity_csv = args.similarity_csv
+    if similarity_csv is None and args.similarity is not None and args.csv_path:
+        similarity_csv = os.path.splitext(args.csv_path)[0] + "_similarity.csv"
+    profile = None
+    if args.profile or args.profile_memory or args.profile_files:
+        if args.profile_files and args.profile_tool == "pyinstrument" and importlib.util.find_spec("pyinstrument") is None:
+            parser.error("--profile-tool pyinstrument 를 쓰려면 pyinstrument 가 필요합니다.")
+        profile = {"memory": args.profile_memory, "dump_pattern": args.profile_files, "dump_tool": args.profile_tool,
+                   "dump_dir": os.path.abspath(args.profile_dir)}
+    run_batch(args.target, args.csv_path, args.jsonl_path, args.workers, args.watch, args.watch_interval,
+              args.profile_trace if profile else None, args.profile_top, args.similarity, similarity_csv, limits, args.npz_path,
+              args.schedule, args.ordered,
+              ca_threshold=args.ca_threshold, rubric=rubric, check_data=not args.structural_only, result_store=result_store,
+              profile=profile, recompute=args.recompute_scores, variants=variants)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,184 @@
+# benchmark.py
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import tracemalloc
+import statistics
+
+try: import resource
+except ImportError: resource = None  # Windows
+
+from ows_parser import (load_ows_file, get_node_by_id, get_node_by_name, get_node_by_qualified_name,
+                        get_node_actual_properties_element, get_node_properties_obj, get_node_settings, check_link_exists)
+from grading_criteria_checks import CRITERIA, DATA_CRITERIA, PROPERTY_WIDGETS
+from batch_grading import iter_graded
+from synthetic_ows import write_class
+
+
+def summarize_samples(samples_s):
+    # 초 단위 측정값 -> ms 단위 통계
+    ms = sorted(s * 1000 for s in samples_s)
+    if len(ms) == 1: return {"n": 1, "mean_ms": ms[0], "p50_ms": ms[0], "p90_ms": ms[0], "p99_ms": ms[0], "max_ms": ms[0]}
+    cuts = statistics.quantiles(ms, n=100, method="inclusive")
+    return {"n": len(ms), "mean_ms": statistics.fmean(ms), "p50_ms": cuts[49], "p90_ms": cuts[89], "p99_ms": cuts[98], "max_ms": ms[-1]}
+
+def time_calls(func, repeats, setup=None):
+    # setup() 의 반환값을 func 에 넘김 (setup 시간은 측정에서 제외)
+    samples = []
+    for _ in range(repeats):
+        arg = setup() if setup else None
+        started = time.perf_counter()
+        func(arg) if setup else func()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+def peak_memory(func):
+    # func 한 번 실행 중 파이썬 힙 최대 사용량 (바이트)
+    tracemalloc.start()
+    try:
+        func(); return tracemalloc.get_traced_memory()[1]
+    finally: tracemalloc.stop()
+
+def children_peak_rss():
+    # 종료된 워커 프로세스 중 최대 RSS (바이트). macOS 는 바이트, 리눅스는 KB 단위로 보고됨
+    if resource is None: return None
+    rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024
+
+def bench_load(paths, repeats):
+    valid = [p for p in paths if load_ows_file(p) is not None]
+    total_bytes = sum(os.path.getsize(p) for p in valid)
+    results = {}
+    for label, widgets in (("load_ows_file (전체)", None), ("load_ows_file (채점용 위젯만)", PROPERTY_WIDGETS)):
+        samples = []
+        for _ in range(repeats):
+            for path in valid: samples.extend(time_calls(lambda: load_ows_file(path, widgets), 1))
+        stats = summarize_samples(samples)
+        stats["mb_per_s"] = total_bytes * repeats / (1024 * 1024) / max(sum(samples), 1e-9)
+        stats["peak_bytes"] = peak_memory(lambda: load_ows_file(valid[0], widgets))
+        results[label] = stats
+    return results
+
+def bench_lookups(path, iterations):
+    workflow = load_ows_file(path)
+    file_id = workflow.node_id("File"); sampler_id = workflow.node_id("Data Sampler")
+    probes = {
+        "get_node_by_name": lambda: get_node_by_name(workflow, "Predictions"),
+        "get_node_by_id": lambda: get_node_by_id(workflow, sampler_id),
+        "get_node_by_qualified_name": lambda: get_node_by_qualified_name(workflow, "Orange.widgets.model.owknn.OWKNNLearner"),
+        "get_node_actual_properties_element": lambda: get_node_actual_properties_element(workflow, file_id),
+        "check_link_exists": lambda: check_link_exists(workflow, file_id, workflow.node_id("Preprocess"), "data", "data"),
+    }
+    return {label: summarize_samples(time_calls(func, iterations)) for label, func in probes.items()}
+
+def bench_decoding(path, repeats):
+    # 속성 디코딩은 워크플로 객체마다 한 번만 일어나므로 매번 새로 읽은 워크플로에서 첫 호출을 측정
+    probes = {
+        "get_node_properties_obj (pickle, File)": lambda wf: get_node_properties_obj(wf, wf.node_id("File")),
+        "get_node_properties_obj (pickle, Predictions)": lambda wf: get_node_properties_obj(wf, wf.node_id("Predictions")),
+        "get_node_settings (literal, Preprocess)": lambda wf: get_node_settings(wf, wf.node_id("Preprocess")),
+        "get_node_settings (literal, Data Sampler)": lambda wf: get_node_settings(wf, wf.node_id("Data Sampler")),
+    }
+    return {label: summarize_samples(time_calls(func, repeats, setup=lambda: load_ows_file(path))) for label, func in probes.items()}
+
+def bench_criteria(path, repeats, check_data=False):
+    results = {}
+    for criterion_id, label, func in CRITERIA:
+        if criterion_id in DATA_CRITERIA and not check_data: continue
+        results[f"{criterion_id} {label}"] = summarize_samples(time_calls(func, repeats, setup=lambda: load_ows_file(path)))
+    return results
+
+def bench_batch(paths, workers, check_data=False):
+    started = time.perf_counter()
+    rows = list(iter_graded(paths, workers=workers, check_data=check_data))
+    wall_s = time.perf_counter() - started
+    stats = summarize_samples([row.get("elapsed_ms", 0.0) / 1000 for row in rows])
+    statuses = {}
+    for row in rows: statuses[row["status"]] = statuses.get(row["status"], 0) + 1
+    stats.update(files=len(rows), wall_s=wall_s, files_per_s=len(rows) / max(wall_s, 1e-9), statuses=statuses,
+                 worker_peak_rss_bytes=children_peak_rss() if workers and workers > 1 else None)
+    if not workers or workers <= 1: stats["peak_bytes"] = peak_memory(lambda: list(iter_graded(paths[:5], workers=1, check_data=check_data)))
+    return stats
+
+def _format_bytes(n):
+    if n is None: return "-"
+    for unit in ("B", "KB", "MB", "GB"):
+        if n < 1024 or unit == "GB": return f"{n:.1f} {unit}"
+        n /= 1024
+
+def print_section(title, results):
+    print(f"\n[{title}]")
+    for label, s in results.items():
+        extra = ""
+        if "mb_per_s" in s: extra += f", {s['mb_per_s']:.1f} MB/s"
+        if "peak_bytes" in s: extra += f", 최대 메모리 {_format_bytes(s['peak_bytes'])}"
+        print(f"  {label}: p50 {s['p50_ms']:.4f} ms, p90 {s['p90_ms']:.4f} ms, p99 {s['p99_ms']:.4f} ms (n={s['n']}){extra}")
+
+def compare_with_baseline(report, baseline, tolerance):
+    # 같은 항목의 p50 이 기준보다 tolerance 비율 이상 느려졌으면 회귀로 보고
+    regressions = []
+    for section, results in report["sections"].items():
+        for label, s in results.items():
+            base = baseline.get("sections", {}).get(section, {}).get(label)
+            if base and base["p50_ms"] > 0 and s["p50_ms"] > base["p50_ms"] * (1 + tolerance):
+                regressions.append(f"{section} / {label}: {base['p50_ms']:.3f} ms -> {s['p50_ms']:.3f} ms")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="합성 .ows 워크플로로 파서/채점 기준/일괄 채점 성능 측정")
+    parser.add_argument("--students", type=int, default=300, help="일괄 채점에 쓸 합성 제출물 수")
+    parser.add_argument("--nodes", type=int, default=10)
+    parser.add_argument("--links", type=int, default=15)
+    parser.add_argument("--payload-kb", type=int, default=16, help="literal 속성마다 덧붙일 크기(KB)")
+    parser.add_argument("--pickle-payload-kb", type=int, default=64, help="pickle 속성마다 덧붙일 크기(KB)")
+    parser.add_argument("--disabled-ratio", type=float, default=0.05)
+    parser.add_argument("--malformed-ratio", type=float, default=0.02)
+    parser.add_argument("--repeats", type=int, default=20, help="항목별 반복 횟수")
+    parser.add_argument("--lookup-iterations", type=int, default=10000)
+    parser.add_argument("--workers", type=int, default=None, help="일괄 채점 워커 수 (기본: CPU 수)")
+    parser.add_argument("--check-data", action="store_true", help="데이터셋 검증 기준도 측정 (Orange 와 네트워크 필요)")
+    parser.add_argument("--dir", help="합성 제출물을 만들 폴더 (기본: 임시 폴더, 끝나면 삭제)")
+    parser.add_argument("--json", help="결과를 JSON 으로 저장 (다음 실행의 --baseline 으로 사용)")
+    parser.add_argument("--baseline", help="이전 --json 결과와 비교해 느려진 항목 보고")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="회귀로 볼 p50 증가 비율")
+    parser.add_argument("--skip-batch", action="store_true")
+    args = parser.parse_args(argv)
+
+    out_dir = args.dir or tempfile.mkdtemp(prefix="ows_bench_")
+    try:
+        paths = write_class(out_dir, args.students, args.malformed_ratio, seed=0, n_nodes=args.nodes, n_links=args.links,
+                            payload_kb=args.payload_kb, pickle_payload_kb=args.pickle_payload_kb, disabled_ratio=args.disabled_ratio)
+        sample = next(p for p in paths if load_ows_file(p) is not None)
+        print(f"합성 제출물 {len(paths)}개 (노드 {args.nodes}, 링크 {args.links}, 파일당 약 {_format_bytes(os.path.getsize(sample))})")
+        report = {"config": vars(args), "sections": {}}
+        sections = [("파일 읽기", lambda: bench_load(paths[:min(len(paths), 30)], max(1, args.repeats // 10))),
+                    ("조회 함수", lambda: bench_lookups(sample, args.lookup_iterations)),
+                    ("속성 디코딩", lambda: bench_decoding(sample, args.repeats)),
+                    ("채점 기준", lambda: bench_criteria(sample, args.repeats, args.check_data))]
+        for title, run in sections:
+            report["sections"][title] = run(); print_section(title, report["sections"][title])
+        if not args.skip_batch:
+            batch = bench_batch(paths, args.workers, args.check_data)
+            report["batch"] = batch
+            print(f"\n[일괄 채점] {batch['files']}개 {batch['wall_s']:.2f}초, {batch['files_per_s']:.1f} 파일/초, "
+                  f"파일당 p50 {batch['p50_ms']:.1f} ms / p90 {batch['p90_ms']:.1f} ms / p99 {batch['p99_ms']:.1f} ms, "
+                  f"워커 최대 RSS {_format_bytes(batch['worker_peak_rss_bytes'])}, 상태 {batch['statuses']}")
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f: json.dump(report, f, ensure_ascii=False, indent=2)
+        if args.baseline:
+            with open(args.baseline, encoding="utf-8") as f: baseline = json.load(f)
+            regressions = compare_with_baseline(report, baseline, args.tolerance)
+            print(f"\n기준 결과 대비 느려진 항목 {len(regressions)}개 (허용 {args.tolerance:.0%})")
+            for line in regressions: print(f"  {line}")
+            if regressions: return 1
+    finally:
+        if not args.dir: shutil.rmtree(out_dir, ignore_errors=True)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
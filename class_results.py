@@ -0,0 +1,219 @@
+# class_results.py
+
+import os
+import csv
+import sys
+import time
+import argparse
+
+import numpy as np
+
+# 반 전체 채점 결과를 열 단위 배열로 모아 둔 것: 학생 x 기준 통과 행렬 + CA 벡터 + 학번/이름/상태 열
+# 통과율/점수 분포/반별 집계/순위는 모두 배열 연산 한 번으로 계산 (제출물을 다시 읽지 않음)
+# .npz 로 저장해 두면 나중에 class_results.py 로 바로 다시 잘라 볼 수 있음
+SECTION_DIGITS = 3          # 학번 앞 3자리 = 학년(1) + 반(2). 예: 30101 -> 301
+INITIAL_CAPACITY = 64
+NPZ_FLUSH_SECONDS = 1.0     # 채점 중에는 이 간격으로만 .npz 를 다시 씀 (끝날 때는 항상 저장)
+
+
+def section_of(student_ids, digits=SECTION_DIGITS):
+    # 학번 배열 -> 반 배열 (숫자가 아닌 학번은 반 없음 "")
+    ids = np.asarray(student_ids, dtype=str)
+    numeric = np.char.isdigit(ids) & (np.char.str_len(ids) > digits)
+    return np.where(numeric, ids.astype(f"U{digits}"), "")
+
+
+class ClassResults:
+    # 행(제출물)은 채점이 끝나는 대로 뒤에 추가. 같은 파일이 다시 들어오면 (감시 모드의 재채점 등) 그 행을 덮어씀
+    # (학번이 아니라 파일로 구분: 한 학생이 낸 서로 다른 파일은 CSV/JSONL 처럼 각각 한 행)
+    # passed: 통과 여부, graded: 실제로 판정한 칸 (None/데이터 생략/채점 실패는 False -> 통과율 분모에서 제외)
+    def __init__(self, criterion_ids, labels=None, capacity=INITIAL_CAPACITY):
+        self.criterion_ids = list(criterion_ids)
+        self.labels = [dict(labels or {}).get(c, "") for c in self.criterion_ids]
+        self.n = 0; self._index = {}
+        columns = len(self.criterion_ids)
+        self._passed = np.zeros((capacity, columns), dtype=bool)
+        self._graded = np.zeros((capacity, columns), dtype=bool)
+        self._ca = np.full(capacity, np.nan)
+        self._ids = [""] * capacity; self._names = [""] * capacity; self._statuses = [""] * capacity; self._files = [""] * capacity
+
+    def _grow(self):
+        capacity = len(self._ca) * 2
+        self._passed = np.resize(self._passed, (capacity, self._passed.shape[1])); self._passed[self.n:] = False
+        self._graded = np.resize(self._graded, (capacity, self._graded.shape[1])); self._graded[self.n:] = False
+        self._ca = np.concatenate([self._ca, np.full(capacity - len(self._ca), np.nan)])
+        for column in (self._ids, self._names, self._statuses, self._files): column.extend([""] * (capacity - len(column)))
+
+    def append(self, row):
+        # batch_grading 의 결과 행(dict) 하나를 추가
+        key = str(row.get("file") or row.get("student_id", ""))
+        index = self._index.get(key)
+        if index is None:
+            if self.n == len(self._ca): self._grow()
+            index = self._index[key] = self.n; self.n += 1
+        values = [row.get(c) for c in self.criterion_ids]
+        self._passed[index] = [value is True for value in values]
+        self._graded[index] = [isinstance(value, bool) for value in values]
+        ca = row.get("ca")
+        self._ca[index] = float(ca) if isinstance(ca, (int, float)) and not isinstance(ca, bool) else np.nan
+        self._ids[index] = str(row.get("student_id", "")); self._names[index] = str(row.get("student_name", ""))
+        self._statuses[index] = str(row.get("status", "")); self._files[index] = key
+
+    # --- 열 (앞의 n 행만 보이는 뷰) ---
+    @property
+    def passed(self): return self._passed[:self.n]
+    @property
+    def graded(self): return self._graded[:self.n]
+    @property
+    def ca(self): return self._ca[:self.n]
+    @property
+    def student_ids(self): return np.array(self._ids[:self.n], dtype=str)
+    @property
+    def student_names(self): return np.array(self._names[:self.n], dtype=str)
+    @property
+    def statuses(self): return np.array(self._statuses[:self.n], dtype=str)
+    @property
+    def files(self): return np.array(self._files[:self.n], dtype=str)
+
+    # --- 집계 ---
+    def scores(self):
+        return self.passed.sum(axis=1)
+
+    def pass_rates(self):
+        # 기준별 통과율 (판정한 학생 중). 판정한 학생이 없으면 nan
+        graded = self.graded.sum(axis=0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(graded > 0, self.passed.sum(axis=0) / graded, np.nan)
+
+    def score_distribution(self):
+        # 통과한 기준 수 k 인 학생 수 (k = 0 .. 기준 수)
+        return np.bincount(self.scores(), minlength=len(self.criterion_ids) + 1)
+
+    def ca_stats(self):
+        ca = self.ca[~np.isnan(self.ca)]
+        if not ca.size: return {"n": 0}
+        return {"n": int(ca.size), "mean": float(ca.mean()), "min": float(ca.min()),
+                "p50": float(np.median(ca)), "max": float(ca.max())}
+
+    def by_section(self, digits=SECTION_DIGITS):
+        # 반별 {반: {"n", "mean_score", "mean_ca", "pass_rates"}}. 그룹 합은 np.add.at 한 번으로
+        sections, inverse = np.unique(section_of(self.student_ids, digits), return_inverse=True)
+        groups = len(sections)
+        counts = np.bincount(inverse, minlength=groups)
+        score_sums = np.bincount(inverse, weights=self.scores(), minlength=groups)
+        known = ~np.isnan(self.ca)
+        ca_counts = np.bincount(inverse[known], minlength=groups)
+        ca_sums = np.bincount(inverse[known], weights=self.ca[known], minlength=groups)
+        passed = np.zeros((groups, len(self.criterion_ids))); graded = np.zeros_like(passed)
+        np.add.at(passed, inverse, self.passed); np.add.at(graded, inverse, self.graded)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean_ca = np.where(ca_counts > 0, ca_sums / ca_counts, np.nan)
+            rates = np.where(graded > 0, passed / graded, np.nan)
+        return {str(section): {"n": int(counts[i]), "mean_score": float(score_sums[i] / counts[i]),
+                               "mean_ca": float(mean_ca[i]), "pass_rates": rates[i]}
+                for i, section in enumerate(sections)}
+
+    def ranking(self):
+        # (순서, 순위): 점수 내림차순, 같으면 CA 내림차순 (CA 없으면 맨 뒤). 완전히 같으면 같은 순위 (1, 2, 2, 4 ...)
+        scores = self.scores(); ca = np.nan_to_num(self.ca, nan=-1.0)
+        order = np.lexsort((-ca, -scores))
+        s = scores[order]; c = ca[order]
+        new = np.r_[True, (s[1:] != s[:-1]) | (c[1:] != c[:-1])]
+        positions = np.arange(len(order))
+        ranks = np.empty(len(order), dtype=int)
+        ranks[order] = np.maximum.accumulate(np.where(new, positions, 0)) + 1
+        return order, ranks
+
+    # --- 저장/불러오기 ---
+    def to_npz(self, path):
+        # 다른 프로세스가 읽는 중이어도 깨진 파일을 보지 않도록 임시 파일에 쓰고 바꿔치기
+        tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+        np.savez(tmp_path, passed=self.passed, graded=self.graded, ca=self.ca, student_id=self.student_ids,
+                 student_name=self.student_names, status=self.statuses, file_path=self.files,
+                 criterion_id=np.array(self.criterion_ids, dtype=str), label=np.array(self.labels, dtype=str))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def from_npz(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            results = cls(data["criterion_id"].tolist(), dict(zip(data["criterion_id"].tolist(), data["label"].tolist())),
+                          capacity=max(len(data["ca"]), 1))
+            n = len(data["ca"])
+            results._passed[:n] = data["passed"]; results._graded[:n] = data["graded"]; results._ca[:n] = data["ca"]
+            results._ids[:n] = data["student_id"].tolist(); results._names[:n] = data["student_name"].tolist()
+            results._statuses[:n] = data["status"].tolist()
+            # file_path 열이 없는 예전 .npz 는 학번으로 (학번도 없으면 행 번호)
+            results._files[:n] = data["file_path"].tolist() if "file_path" in data.files else [key or str(i) for i, key in enumerate(results._ids[:n])]
+        results.n = n; results._index = {key: i for i, key in enumerate(results._files[:n])}
+        return results
+
+    def to_csv(self, path, digits=SECTION_DIGITS):
+        # 학번 순 학생별 요약: 반, 통과 기준 수, CA, 순위, 기준별 통과(1)/실패(0)/미판정(빈칸)
+        _, ranks = self.ranking()
+        sections = section_of(self.student_ids, digits)
+        with open(path, "w", newline="", encoding="utf-8-sig") as f:
+            writer = csv.writer(f)
+            writer.writerow(["student_id", "student_name", "section", "score", "ca", "rank", "status"] + self.criterion_ids)
+            scores = self.scores()
+            for i in np.argsort(self.student_ids, kind="stable"):
+                cells = [int(p) if g else "" for p, g in zip(self.passed[i], self.graded[i])]
+                ca = "" if np.isnan(self.ca[i]) else f"{self.ca[i]:.4f}"
+                writer.writerow([self._ids[i], self._names[i], sections[i], int(scores[i]), ca, int(ranks[i]), self._statuses[i]] + cells)
+
+
+class ClassResultsWriter:
+    # ResultWriter 에 붙여 쓰는 것: 행이 들어올 때마다 추가하고, .npz 는 NPZ_FLUSH_SECONDS 마다 + 닫을 때 저장
+    def __init__(self, npz_path, criterion_ids, labels=None):
+        self.npz_path = npz_path
+        self.results = ClassResults(criterion_ids, labels)
+        self._saved_at = 0.0
+
+    def write(self, row):
+        self.results.append(row)
+        if time.monotonic() - self._saved_at >= NPZ_FLUSH_SECONDS: self.flush()
+
+    def flush(self):
+        self.results.to_npz(self.npz_path); self._saved_at = time.monotonic()
+
+    def close(self):
+        self.flush()
+
+
+def print_report(results, digits=SECTION_DIGITS, top=10):
+    n = results.n; criteria = len(results.criterion_ids)
+    print(f"학생 {n}명, 기준 {criteria}개")
+    if not n: return
+    print("기준별 통과율:")
+    for criterion_id, label, rate in zip(results.criterion_ids, results.labels, results.pass_rates()):
+        print(f"  {criterion_id:<8} {'-' if np.isnan(rate) else f'{rate * 100:5.1f}%':>6}  {label}")
+    print("통과 기준 수 분포:")
+    distribution = results.score_distribution(); peak = max(int(distribution.max()), 1)
+    for score, count in enumerate(distribution):
+        if count: print(f"  {score:>3}/{criteria}  {int(count):>4}명  {'#' * max(1, round(count * 40 / peak))}")
+    stats = results.ca_stats()
+    if stats["n"]: print(f"CA: {stats['n']}명, 평균 {stats['mean']:.3f}, 중앙값 {stats['p50']:.3f}, 최소 {stats['min']:.3f}, 최대 {stats['max']:.3f}")
+    print("반별:")
+    for section, group in results.by_section(digits).items():
+        mean_ca = "-" if np.isnan(group["mean_ca"]) else f"{group['mean_ca']:.3f}"
+        print(f"  {section or '(반 없음)':<8} {group['n']:>4}명  평균 {group['mean_score']:.2f}/{criteria}  CA {mean_ca}")
+    order, ranks = results.ranking()
+    print(f"순위 (상위 {min(top, n)}명):")
+    scores = results.scores()
+    for i in order[:top]:
+        ca = "" if np.isnan(results.ca[i]) else f"  CA {results.ca[i]:.3f}"
+        print(f"  {ranks[i]:>4}. {results._ids[i]} {results._names[i]}  {scores[i]}/{criteria}{ca}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="batch_grading.py --npz 로 저장한 반 전체 결과 집계 (제출물을 다시 읽지 않음)")
+    parser.add_argument("npz", help="채점 결과 .npz")
+    parser.add_argument("--section-digits", type=int, default=SECTION_DIGITS, help="반으로 묶을 학번 앞자리 수 (기본 3)")
+    parser.add_argument("--top", type=int, default=10, help="순위에 보여 줄 학생 수 (기본 10)")
+    parser.add_argument("--csv", dest="csv_path", help="학생별 요약(반/점수/CA/순위) CSV 경로")
+    args = parser.parse_args(argv)
+    results = ClassResults.from_npz(args.npz)
+    print_report(results, args.section_digits, args.top)
+    if args.csv_path: results.to_csv(args.csv_path, args.section_digits)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
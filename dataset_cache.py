@@ -0,0 +1,151 @@
+# dataset_cache.py
+
+import os
+import json
+import time
+import hashlib
+import tempfile
+import threading
+import contextlib
+from collections import OrderedDict
+
+try:
+    import fcntl
+except ImportError:  # Windows: 프로세스 간 잠금 없이 동작 (중복 로드만 생길 수 있음)
+    fcntl = None
+
+CACHE_DIR_ENV = "ORANGE_GRADER_CACHE_DIR"
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "orange_autograder")
+ERROR_TTL = 60.0  # 오류가 담긴 요약(다운로드 실패 등)은 이 시간 동안만 기억하고 그 뒤에는 다시 불러옴 (상주 데몬 워커에서도 재시도되게)
+
+
+def default_cache_dir():
+    return os.environ.get(CACHE_DIR_ENV) or DEFAULT_CACHE_DIR
+
+def is_remote_source(source):
+    return isinstance(source, str) and source.strip().lower().startswith(("http://", "https://"))
+
+def source_identity(source):
+    # URL 은 그대로, 로컬 파일은 절대경로 + mtime + 크기 (파일이 바뀌면 다른 키가 됨)
+    source = source.strip()
+    if is_remote_source(source): return f"url:{source}"
+    path = os.path.abspath(os.path.expanduser(source))
+    try: st = os.stat(path)
+    except OSError: return f"file:{path}:missing"
+    return f"file:{path}:{st.st_mtime_ns}:{st.st_size}"
+
+def source_key(source):
+    return hashlib.sha256(source_identity(source).encode("utf-8")).hexdigest()
+
+@contextlib.contextmanager
+def file_lock(lock_path):
+    if fcntl is None:
+        yield; return
+    with open(lock_path, "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try: yield
+        finally: fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class DatasetCache:
+    # 데이터셋 요약(스키마 + 행 수) 캐시. 프로세스 안에서는 LRU dict, 워커들끼리는 디스크의 JSON 파일로 공유
+    def __init__(self, cache_dir=None, max_memory_entries=128, max_disk_bytes=64 * 1024 * 1024, error_ttl=ERROR_TTL):
+        self.cache_dir = os.path.join(cache_dir or default_cache_dir(), "datasets")
+        self.max_memory_entries = max_memory_entries; self.max_disk_bytes = max_disk_bytes; self.error_ttl = error_ttl
+        self._memory = OrderedDict(); self._errors = {}; self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key + ".json")
+
+    def _remember(self, key, summary):
+        with self._lock:
+            self._memory[key] = summary; self._memory.move_to_end(key)
+            while len(self._memory) > self.max_memory_entries: self._memory.popitem(last=False)
+
+    def _remember_error(self, key, summary):
+        with self._lock:
+            now = time.monotonic()
+            for stale in [k for k, (_, expires) in self._errors.items() if expires <= now]: del self._errors[stale]
+            self._errors[key] = (summary, now + self.error_ttl)
+
+    def _lookup(self, key):
+        with self._lock:
+            error = self._errors.get(key)
+            if error is not None:
+                if error[1] > time.monotonic(): return error[0]
+                del self._errors[key]
+            summary = self._memory.get(key)
+            if summary is not None: self._memory.move_to_end(key); return summary
+        entry_path = self._entry_path(key)
+        try:
+            with open(entry_path, encoding="utf-8") as f: summary = json.load(f)
+        except (OSError, ValueError): return None
+        try: os.utime(entry_path)  # 디스크 LRU 용으로 최근 사용 시각 갱신
+        except OSError: pass
+        self._remember(key, summary)
+        return summary
+
+    def get(self, source):
+        return self._lookup(source_key(source))
+
+    def put(self, source, summary, persist=True):
+        key = source_key(source)
+        self._remember(key, summary)
+        if persist: self._write_disk(key, summary)
+
+    def get_or_load(self, source, loader):
+        # loader(source) -> 요약 dict. 오류가 담긴 요약({'error': ...})은 디스크에 쓰지 않고 메모리에 error_ttl 초 동안만 둔다
+        key = source_key(source)
+        summary = self._lookup(key)
+        if summary is not None: self.hits += 1; return summary
+        try: os.makedirs(os.path.dirname(self._entry_path(key)), exist_ok=True)
+        except OSError: return self._load_uncached(key, source, loader)
+        with file_lock(self._entry_path(key) + ".lock"):
+            summary = self._lookup(key)  # 다른 워커가 잠금을 잡고 있는 동안 이미 로드했을 수 있음
+            if summary is not None: self.hits += 1; return summary
+            return self._load_uncached(key, source, loader)
+
+    def _load_uncached(self, key, source, loader):
+        self.misses += 1
+        summary = loader(source)
+        if summary.get("error") is not None: self._remember_error(key, summary); return summary
+        self._remember(key, summary); self._write_disk(key, summary)
+        return summary
+
+    def _write_disk(self, key, summary):
+        entry_path = self._entry_path(key)
+        try:
+            os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(entry_path), suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f: json.dump(summary, f, ensure_ascii=False)
+            os.replace(tmp_path, entry_path)
+        except (OSError, TypeError, ValueError): return
+        self._evict_disk()
+
+    def _evict_disk(self):
+        # 용량 상한을 넘으면 가장 오래 안 쓴 항목부터 삭제
+        entries = []; total = 0
+        for dirpath, _, filenames in os.walk(self.cache_dir):
+            for filename in filenames:
+                if not filename.endswith(".json"): continue
+                path = os.path.join(dirpath, filename)
+                try: st = os.stat(path)
+                except OSError: continue
+                entries.append((st.st_mtime, st.st_size, path)); total += st.st_size
+        if total <= self.max_disk_bytes: return
+        for _, size, path in sorted(entries):
+            try: os.remove(path)
+            except OSError: continue
+            with contextlib.suppress(OSError): os.remove(path + ".lock")
+            total -= size
+            if total <= self.max_disk_bytes: break
+
+
+_default_cache = None
+
+def get_dataset_cache():
+    # 프로세스마다 하나씩 (배치 워커도 각자 하나를 만들고 디스크 캐시를 공유)
+    global _default_cache
+    if _default_cache is None: _default_cache = DatasetCache()
+    return _default_cache
@@ -0,0 +1,218 @@
+# dataset_fetch.py
+
+import os
+import re
+import time
+import socket
+import hashlib
+import contextlib
+import tempfile
+import threading
+import http.client
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit, urljoin, unquote
+
+from dataset_cache import ERROR_TTL, default_cache_dir, is_remote_source, file_lock
+
+FETCH_TIMEOUT_ENV = "ORANGE_GRADER_FETCH_TIMEOUT"
+MAX_DOWNLOAD_BYTES_ENV = "ORANGE_GRADER_MAX_DOWNLOAD_BYTES"
+DATA_EXTENSIONS = (".csv", ".tab", ".tsv", ".txt", ".xlsx", ".xls", ".pkl", ".pickle", ".basket", ".xml", ".gz", ".bz2", ".xz")
+CONTENT_TYPE_EXTENSIONS = {
+    "text/csv": ".csv", "text/tab-separated-values": ".tab", "text/plain": ".csv",
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet": ".xlsx", "application/vnd.ms-excel": ".xls",
+}
+MAX_REDIRECTS = 5
+
+
+class FetchError(Exception):
+    pass
+
+
+def normalize_dataset_url(url):
+    # 구글 드라이브 '보기' 링크와 구글 시트 링크를 파일을 직접 내려받는 주소로 바꿈
+    url = url.strip()
+    match = re.match(r"https?://drive\.google\.com/file/d/([^/?#]+)", url)
+    if match: return f"https://drive.google.com/uc?export=download&id={match.group(1)}"
+    match = re.match(r"https?://docs\.google\.com/spreadsheets/d/([^/?#]+)", url)
+    if match: return f"https://docs.google.com/spreadsheets/d/{match.group(1)}/export?format=csv"
+    return url
+
+def _extension_for(url, headers):
+    disposition = headers.get("content-disposition", "")
+    match = re.search(r"filename\*?=(?:UTF-8'')?\"?([^\";]+)", disposition, re.IGNORECASE)
+    for name in ((unquote(match.group(1)) if match else ""), unquote(urlsplit(url).path)):
+        ext = os.path.splitext(name)[1].lower()
+        if ext in DATA_EXTENSIONS: return ext
+    content_type = headers.get("content-type", "").split(";")[0].strip().lower()
+    return CONTENT_TYPE_EXTENSIONS.get(content_type, ".csv")
+
+
+class DatasetFetcher:
+    # 원격 데이터셋을 스레드 풀에서 동시에 내려받아 로컬 파일로 넘겨줌
+    # - 같은 URL 은 진행 중인 다운로드를 공유 (프로세스 안: Future, 워커 프로세스끼리: 파일 잠금 + 디스크 캐시)
+    # - 스레드별로 호스트마다 연결을 유지해서 재사용 (keep-alive)
+    # - 요청마다 타임아웃, 응답 크기 상한
+    def __init__(self, cache_dir=None, timeout=20.0, max_bytes=200 * 1024 * 1024, max_workers=8, max_age=24 * 3600):
+        self.download_dir = os.path.join(cache_dir or default_cache_dir(), "downloads")
+        self.timeout = timeout; self.max_bytes = max_bytes; self.max_age = max_age
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="dataset-fetch")
+        self._in_flight = {}; self._lock = threading.Lock()
+        self._local = threading.local()
+        self._connections = set(); self.closed = False  # close() 가 진행 중인 읽기를 끊을 수 있도록 모든 스레드의 연결
+
+    def fetch(self, url):
+        # 로컬 경로를 돌려주는 Future. 같은 URL 을 여러 번 요청해도 다운로드는 한 번
+        # 실패한 다운로드는 끝나는 대로 잊어서 다음 요청 때 다시 시도 (상주 데몬 워커에서 일시적인 오류가 남지 않게)
+        # 끝난 다운로드도 파일이 지워졌거나 max_age 가 지났으면 다시 받음
+        url = url.strip()
+        with self._lock:
+            future = self._in_flight.get(url)
+            if future is not None and future.done() and not self._usable(future): future = None
+            started = future is None
+            if started: future = self._in_flight[url] = self._executor.submit(self._download, url)
+        if started: future.add_done_callback(lambda done: self._forget_failed(url, done))  # 이미 끝났으면 바로 불리므로 잠금 밖에서
+        return future
+
+    def _usable(self, future):
+        if future.exception() is not None: return False
+        try: st = os.stat(future.result())
+        except OSError: return False
+        return self.max_age is None or time.time() - st.st_mtime <= self.max_age
+
+    def _forget_failed(self, url, future):
+        if future.cancelled() or future.exception() is not None:
+            with self._lock:
+                if self._in_flight.get(url) is future: del self._in_flight[url]
+
+    def prefetch(self, urls):
+        return {url: self.fetch(url) for url in {u.strip() for u in urls if is_remote_source(u)}}
+
+    def local_path(self, url, timeout=None):
+        # 내려받기가 끝날 때까지 기다렸다가 로컬 경로 반환 (실패하면 FetchError)
+        return self.fetch(url).result(timeout)
+
+    def _cached_download(self, url):
+        # 내려받아 둔 파일 경로 (max_age 안). ERROR_TTL 안에 실패한 기록(<sha>.error)이 있으면 다시 받지 않고 FetchError
+        # -> 한 번 실패한 URL 을 부모 프로세스와 워커들이 차례로 잠금을 기다렸다가 타임아웃까지 다시 기다리지 않음
+        prefix = os.path.join(self.download_dir, hashlib.sha256(url.encode("utf-8")).hexdigest())
+        try:
+            if time.time() - os.stat(prefix + ".error").st_mtime <= ERROR_TTL:
+                with open(prefix + ".error", encoding="utf-8") as f: message = f.read()
+                raise FetchError(message or "최근 다운로드 실패")
+        except OSError: pass
+        for ext in DATA_EXTENSIONS:
+            path = prefix + ext
+            try: st = os.stat(path)
+            except OSError: continue
+            if self.max_age is None or time.time() - st.st_mtime <= self.max_age: return path
+        return None
+
+    def _download(self, url):
+        os.makedirs(self.download_dir, exist_ok=True)
+        prefix = os.path.join(self.download_dir, hashlib.sha256(url.encode("utf-8")).hexdigest())
+        with file_lock(prefix + ".lock"):
+            path = self._cached_download(url)
+            if path is not None: return path
+            fd, tmp_path = tempfile.mkstemp(dir=self.download_dir, suffix=".part")
+            try:
+                with os.fdopen(fd, "wb") as out: ext = self._stream_to(normalize_dataset_url(url), out)
+                path = prefix + ext
+                os.replace(tmp_path, path)
+            except FetchError as e:
+                if self.closed: raise  # 닫혀서 멈춘 것은 실패로 기록하지 않음
+                with contextlib.suppress(OSError), open(prefix + ".error", "w", encoding="utf-8") as f: f.write(str(e))
+                raise
+            finally:
+                if os.path.exists(tmp_path): os.remove(tmp_path)
+            with contextlib.suppress(OSError): os.remove(prefix + ".error")
+            return path
+
+    def _connection(self, scheme, netloc, fresh=False):
+        connections = getattr(self._local, "connections", None)
+        if connections is None: connections = self._local.connections = {}
+        key = (scheme, netloc)
+        if fresh and key in connections:
+            conn = connections.pop(key); conn.close()
+            with self._lock: self._connections.discard(conn)
+        if key not in connections:
+            conn_class = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+            conn = conn_class(netloc, timeout=self.timeout)
+            with self._lock:
+                if self.closed: raise FetchError("다운로드 취소됨 (채점 종료)")
+                self._connections.add(conn)
+            connections[key] = conn
+        return connections[key]
+
+    def _request(self, url):
+        parts = urlsplit(url)
+        target = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        headers = {"User-Agent": "orange-autograder", "Accept": "*/*"}
+        for attempt in range(2):  # keep-alive 연결이 서버 쪽에서 끊겼으면 새 연결로 한 번 더
+            conn = self._connection(parts.scheme, parts.netloc, fresh=attempt > 0)
+            try:
+                conn.request("GET", target, headers=headers)
+                return conn, conn.getresponse()
+            except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError, http.client.CannotSendRequest):
+                if attempt or self.closed: raise  # close() 가 끊은 연결은 다시 잇지 않음
+        raise FetchError(url)
+
+    def _stream_to(self, url, out):
+        deadline = time.monotonic() + self.timeout
+        for _ in range(MAX_REDIRECTS + 1):
+            try: conn, response = self._request(url)
+            except (OSError, http.client.HTTPException) as e: raise FetchError(f"연결 실패: {e}") from e
+            headers = {k.lower(): v for k, v in response.getheaders()}
+            if response.status in (301, 302, 303, 307, 308) and "location" in headers:
+                response.read(); url = urljoin(url, headers["location"]); continue
+            if response.status != 200:
+                response.read(); raise FetchError(f"HTTP {response.status}")
+            if headers.get("content-type", "").startswith("text/html"):
+                response.read(); raise FetchError("데이터 대신 HTML 페이지가 돌아옴 (공유 권한 또는 로그인 필요)")
+            length = headers.get("content-length")
+            if length and length.isdigit() and int(length) > self.max_bytes:
+                conn.close(); raise FetchError(f"파일이 너무 큼 ({int(length)} 바이트 > {self.max_bytes})")
+            received = 0
+            try:
+                while True:
+                    # 읽기마다 소켓 타임아웃을 남은 시간으로 줄여서 전체 시간을 제한 (조금씩 보내는 서버가 한 번의 read 를 붙잡지 않게)
+                    if self.closed:
+                        conn.close(); raise FetchError("다운로드 취소됨 (채점 종료)")
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        conn.close(); raise FetchError(f"시간 초과 ({self.timeout}초)")
+                    if conn.sock is not None: conn.sock.settimeout(max(0.1, remaining))
+                    chunk = response.read1(64 * 1024)
+                    if not chunk: break
+                    received += len(chunk)
+                    if received > self.max_bytes:
+                        conn.close(); raise FetchError(f"파일이 너무 큼 (> {self.max_bytes} 바이트)")
+                    out.write(chunk)
+            except socket.timeout as e:
+                conn.close(); raise FetchError(f"시간 초과 ({self.timeout}초)") from e
+            except (OSError, http.client.HTTPException) as e:
+                conn.close(); raise FetchError(f"다운로드 중 오류: {e}") from e
+            if conn.sock is not None: conn.sock.settimeout(self.timeout)  # keep-alive 로 다시 쓸 연결은 원래 타임아웃으로
+            return _extension_for(url, headers)
+        raise FetchError("리다이렉트가 너무 많음")
+
+    def close(self):
+        # 대기 중인 다운로드는 취소하고, 받는 중인 연결은 소켓을 끊어서 스레드가 바로 끝나게 함
+        self.closed = True
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        with self._lock: connections = list(self._connections); self._connections.clear()
+        for conn in connections:
+            sock = conn.sock
+            if sock is None: continue
+            with contextlib.suppress(OSError): sock.shutdown(socket.SHUT_RDWR)
+
+
+_default_fetcher = None
+
+def get_dataset_fetcher():
+    # 프로세스마다 하나. 타임아웃/크기 상한은 환경 변수로 워커 프로세스에도 전달됨
+    global _default_fetcher
+    if _default_fetcher is None or _default_fetcher.closed:
+        timeout = float(os.environ.get(FETCH_TIMEOUT_ENV) or 20.0)
+        max_bytes = int(os.environ.get(MAX_DOWNLOAD_BYTES_ENV) or 200 * 1024 * 1024)
+        _default_fetcher = DatasetFetcher(timeout=timeout, max_bytes=max_bytes)
+    return _default_fetcher
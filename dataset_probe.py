@@ -0,0 +1,195 @@
+# dataset_probe.py
+
+import os
+import re
+import csv
+import mmap
+import zipfile
+import xml.etree.ElementTree as ET
+
+# Orange Table 을 만들지 않고 헤더와 줄 수만 읽어서 summarize_table 과 같은 모양의 요약을 만듦
+# 형식을 모르거나 확실하지 않으면 None -> 호출한 쪽에서 Orange Table 로 전부 읽음
+PROBE_EXTENSIONS = (".csv", ".tab", ".tsv", ".txt", ".xlsx")
+FULL_SCAN_BYTES = 4 * 1024 * 1024   # 이보다 작은 파일은 모든 행으로 타입을 추정 (Orange 와 같은 결과)
+SAMPLE_ROWS = 2000                  # 큰 파일은 앞부분 행만 보고 추정
+MISSING_VALUES = frozenset({"", "?", ".", "NA", "~", "nan", "NaN"})
+TYPE_NAMES = {"c": "ContinuousVariable", "continuous": "ContinuousVariable", "n": "ContinuousVariable", "numeric": "ContinuousVariable",
+              "d": "DiscreteVariable", "discrete": "DiscreteVariable", "s": "StringVariable", "string": "StringVariable",
+              "text": "StringVariable", "t": "TimeVariable", "time": "TimeVariable"}
+FLAG_NAMES = {"c": "class", "class": "class", "m": "meta", "meta": "meta", "i": "ignore", "ignore": "ignore",
+              "w": "weight", "weight": "weight"}
+HEADER1_TYPES = {"C": "ContinuousVariable", "D": "DiscreteVariable", "S": "StringVariable", "T": "TimeVariable"}
+TIME_PATTERN = re.compile(r"^\d{4}-\d{2}-\d{2}([ T]\d{2}:\d{2}(:\d{2}(\.\d+)?)?)?$|^\d{2}:\d{2}(:\d{2})?$")
+XLSX_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+
+
+def _natural_key(value):
+    return [int(part) if part.isdigit() else part.lower() for part in re.split(r"(\d+)", value)]
+
+def _is_number(value):
+    try: float(value); return True
+    except ValueError: return False
+
+def _is_flag_cell(cell):
+    # 세 번째 헤더 행의 칸: 비어 있거나 class/meta/ignore/weight (공백으로 여러 개, key=value 속성 포함)
+    return all(token in FLAG_NAMES or "=" in token for token in cell.split())
+
+def _is_type_cell(cell):
+    # 두 번째 헤더 행의 칸: 비어 있거나 타입 이름, 또는 공백으로 나눈 범주 값 목록
+    return not cell or cell.lower() in TYPE_NAMES or " " in cell.strip()
+
+def _parse_header(rows):
+    # (헤더 행 수, [(이름, 선언된 타입 또는 None, 플래그, 선언된 범주 값)]) - Orange 의 세 가지 헤더 형식
+    names = [cell.strip() for cell in rows[0]]
+    if any("#" in name for name in names):
+        columns = []
+        for name in names:
+            prefix, _, bare = name.rpartition("#")
+            declared = next((HEADER1_TYPES[ch] for ch in prefix if ch in HEADER1_TYPES), None)
+            flag = next((FLAG_NAMES[ch] for ch in prefix if ch in FLAG_NAMES), None)
+            columns.append((bare if prefix or name.endswith("#") else name, declared, flag, None))
+        return 1, columns
+    if len(rows) >= 3:
+        types = [c.strip() for c in rows[1]] + [""] * (len(names) - len(rows[1]))
+        flags = [c.strip() for c in rows[2]] + [""] * (len(names) - len(rows[2]))
+        if all(_is_type_cell(t) for t in types) and all(_is_flag_cell(f) for f in flags) and \
+           any(t.lower() in TYPE_NAMES or f for t, f in zip(types, flags)):
+            columns = []
+            for name, type_cell, flag_cell in zip(names, types, flags):
+                declared = TYPE_NAMES.get(type_cell.lower()); values = None
+                if declared is None and " " in type_cell.strip():
+                    declared = "DiscreteVariable"; values = type_cell.split()
+                flag = next((FLAG_NAMES[t] for t in flag_cell.split() if t in FLAG_NAMES), None)
+                columns.append((name, declared, flag, values))
+            return 3, columns
+    return 1, [(name, None, None, None) for name in names]
+
+def _guess_type(values):
+    # Orange 의 guess_data_type 과 같은 순서: 범주형 -> 수치형 -> 시간 -> 문자열
+    present = [v for v in values if v not in MISSING_VALUES]
+    if not present: return "ContinuousVariable", []
+    numeric = all(_is_number(v) for v in present[:3])
+    unique = set(present)
+    max_values = 3 if numeric else int(round(len(values) ** 0.7))
+    if len(unique) <= min(max_values, 100):
+        if not numeric: return "DiscreteVariable", sorted(unique, key=_natural_key)
+        try:
+            if {float(v) for v in unique} <= {0.0, 1.0}: return "DiscreteVariable", sorted(unique, key=_natural_key)
+        except ValueError: return "DiscreteVariable", sorted(unique, key=_natural_key)
+    if all(_is_number(v) for v in present): return "ContinuousVariable", []
+    if all(TIME_PATTERN.match(v.strip()) for v in present): return "TimeVariable", []
+    return "StringVariable", []
+
+def _summarize(header_rows, data_rows, n_rows, sampled):
+    n_header, columns = _parse_header(header_rows)
+    attributes = []; class_vars = []
+    for index, (name, declared, flag, values) in enumerate(columns):
+        if flag in ("ignore", "weight", "meta"): continue
+        column = [row[index].strip() if index < len(row) else "" for row in data_rows]
+        type_name, guessed_values = (declared, values) if declared else _guess_type(column)
+        if type_name == "DiscreteVariable" and values is None:
+            values = sorted({v for v in column if v not in MISSING_VALUES}, key=_natural_key) if declared else guessed_values
+        if type_name == "StringVariable": continue  # 문자열 열은 Orange 에서 메타 속성이 됨
+        (class_vars if flag == "class" else attributes).append((name, type_name, values))
+    summary_class_vars = []
+    for name, type_name, values in class_vars[:1]:
+        values_str = str(tuple(values)) if type_name == "DiscreteVariable" else ("연속형" if type_name == "ContinuousVariable" else "타입 불명확")
+        summary_class_vars.append([name, type_name, values_str])
+    return {"n_rows": n_rows, "n_variables": len(attributes) + len(class_vars), "n_attributes": len(attributes),
+            "attributes": [[name, type_name] for name, type_name, _ in attributes[:3]],
+            "n_class_vars": len(class_vars), "class_vars": summary_class_vars, "error": None,
+            "probed": True, "sampled": sampled, "header_rows": n_header}
+
+def count_lines(path):
+    # 메모리 맵으로 줄바꿈 수를 셈 (파일 전체를 파이썬 객체로 읽지 않음). 마지막 줄에 줄바꿈이 없거나 끝에 빈 줄이 있어도 맞게
+    size = os.path.getsize(path)
+    if size == 0: return 0
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        end = size
+        while end > 0 and mm[end - 1:end] in (b"\n", b"\r", b" ", b"\t"): end -= 1
+        if end == 0: return 0
+        lines = 1; chunk = 1024 * 1024
+        for start in range(0, end, chunk): lines += mm[start:min(start + chunk, end)].count(b"\n")
+        return lines
+
+def _detect_encoding(path):
+    with open(path, "rb") as f: raw = f.read(256 * 1024)
+    for encoding in ("utf-8-sig", "cp949"):
+        try: raw.decode(encoding); break
+        except UnicodeDecodeError as e:
+            if e.start > len(raw) - 4: break  # 잘린 마지막 글자 때문이면 인코딩은 맞음
+    else: encoding = "latin-1"
+    return encoding
+
+def probe_text(path):
+    size = os.path.getsize(path)
+    encoding = _detect_encoding(path)
+    ext = os.path.splitext(path)[1].lower()
+    with open(path, encoding=encoding, errors="replace", newline="") as f:
+        first_line = f.readline(); f.seek(0)
+        if ext in (".tab", ".tsv") or "\t" in first_line: delimiter = "\t"
+        else: delimiter = max((",", ";", "|"), key=first_line.count)
+        reader = csv.reader(f, delimiter=delimiter)
+        rows = []
+        full_scan = size <= FULL_SCAN_BYTES
+        for row in reader:
+            if not row or not any(cell.strip() for cell in row): continue
+            rows.append(row)
+            if not full_scan and len(rows) >= SAMPLE_ROWS + 3: break
+    if not rows: return None
+    # 따옴표 안의 줄바꿈이 있으면 줄 수와 행 수가 달라지므로 Orange 에 맡김
+    if any("\n" in cell or "\r" in cell for row in rows for cell in row): return None
+    n_header, _ = _parse_header(rows[:3])
+    # 큰 파일은 줄 수로 행 수를 셈 (중간의 빈 줄도 한 행으로 세어짐, 끝부분 빈 줄은 제외)
+    n_rows = len(rows) - n_header if full_scan else count_lines(path) - n_header
+    return _summarize(rows[:3], rows[n_header:], max(n_rows, 0), not full_scan)
+
+def _xlsx_rows(archive, shared_strings, sheet_name):
+    with archive.open(sheet_name) as f:
+        for _, element in ET.iterparse(f):
+            if element.tag != XLSX_NS + "row": continue
+            cells = {}
+            for cell in element.iter(XLSX_NS + "c"):
+                reference = cell.get("r", ""); column = 0
+                for ch in reference:
+                    if not ch.isalpha(): break
+                    column = column * 26 + ord(ch.upper()) - 64
+                cell_type = cell.get("t"); value = cell.find(XLSX_NS + "v")
+                if cell_type == "s" and value is not None: text = shared_strings[int(value.text)]
+                elif cell_type == "inlineStr": text = "".join(t.text or "" for t in cell.iter(XLSX_NS + "t"))
+                elif cell_type == "b" and value is not None: text = "TRUE" if value.text == "1" else "FALSE"
+                else: text = value.text if value is not None and value.text is not None else ""
+                if text.endswith(".0") and _is_number(text): text = text[:-2]
+                cells[(column or len(cells) + 1) - 1] = text
+            element.clear()
+            if cells: yield [cells.get(i, "") for i in range(max(cells) + 1)]
+
+def probe_xlsx(path):
+    with zipfile.ZipFile(path) as archive:
+        names = set(archive.namelist())
+        sheets = sorted((n for n in names if n.startswith("xl/worksheets/sheet") and n.endswith(".xml")), key=_natural_key)
+        if not sheets: return None
+        shared_strings = []
+        if "xl/sharedStrings.xml" in names:
+            with archive.open("xl/sharedStrings.xml") as f:
+                for _, element in ET.iterparse(f):
+                    if element.tag == XLSX_NS + "si":
+                        shared_strings.append("".join(t.text or "" for t in element.iter(XLSX_NS + "t"))); element.clear()
+        rows = []; n_rows = 0
+        for row in _xlsx_rows(archive, shared_strings, sheets[0]):
+            if not any(cell.strip() for cell in row): continue
+            n_rows += 1
+            if len(rows) < SAMPLE_ROWS + 3: rows.append(row)
+    if not rows: return None
+    n_header, _ = _parse_header(rows[:3])
+    return _summarize(rows[:3], rows[n_header:], n_rows - n_header, n_rows > len(rows))
+
+def probe_dataset(path):
+    # 로컬 파일의 요약 dict, 또는 이 방법으로 알 수 없으면 None
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in PROBE_EXTENSIONS: return None
+    try:
+        if ext == ".xlsx": return probe_xlsx(path)
+        return probe_text(path)
+    except (OSError, ValueError, KeyError, IndexError, csv.Error, zipfile.BadZipFile, ET.ParseError):
+        return None
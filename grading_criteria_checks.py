@@ -1,60 +1,33 @@
 # grading_criteria_checks.py
 
 import os
-import ast
 # import requests # 현재 직접 사용 안 함
 # import io
 # import csv
 
 from ows_parser import (
+    as_workflow,
     load_ows_file,
     get_node_by_name,
     get_node_properties_obj,
+    get_node_settings,
     check_link_exists,
-    get_data_summary_from_url,
+    check_path_exists,
+    get_file_widget_source,
+    load_data_summary,
+    format_data_summary,
+    is_valid_data_summary,
+    PayloadTooLarge,
     ORANGE_AVAILABLE_PARSER
 )
+from workflow_executor import recompute_scores
 
 ORANGE_AVAILABLE = ORANGE_AVAILABLE_PARSER
-if ORANGE_AVAILABLE:
-    try:
-        from Orange.data import Table, Domain, Variable
-        from orangewidget.settings import Context as OrangeContext
-    except ImportError:
-        ORANGE_AVAILABLE = False # 만약 ows_parser에서는 성공했어도 여기서 실패하면 False로
-        class Table:
-            def __init__(self, *args, **kwargs): self._domain = Domain(); self._len = 0
-            def __len__(self): return self._len
-            @property
-            def domain(self):
-                if not hasattr(self, '_domain') or self._domain is None : self._domain = Domain()
-                return self._domain
-        class Domain:
-            def __init__(self): self.attributes = []; self.class_var = None; self.class_vars = []; self.metas = []; self.variables = []
-        class Variable: pass
-        class OrangeContext: pass
-else:
-    class Table:
-        def __init__(self, *args, **kwargs): self._domain = Domain(); self._len = 0
-        def __len__(self): return self._len
-        @property
-        def domain(self):
-            if not hasattr(self, '_domain') or self._domain is None : self._domain = Domain()
-            return self._domain
-    class Domain:
-        def __init__(self): self.attributes = []; self.class_var = None; self.class_vars = []; self.metas = []; self.variables = []
-    class Variable: pass
-    class OrangeContext: pass
-
-if ORANGE_AVAILABLE:
-    print("[Init grading_criteria_checks] Orange3 라이브러리 사용 가능.")
-else:
-    print("경고: grading_criteria_checks - Orange3 라이브러리 사용 불가. 일부 기능이 제한됩니다.")
 
 
 def _get_node_id_from_name(xml_root, widget_name):
     node = get_node_by_name(xml_root, widget_name)
-    return node.get("id") if node else None
+    return node.get("id") if node is not None else None
 
 # === 평가 요소 1: 데이터 업로드 ===
 def check_criterion_1_1(xml_root):
@@ -69,52 +42,14 @@ def check_criterion_1_2(xml_root, data_summary_output_list=None):
     file_properties = get_node_properties_obj(xml_root, file_node_id)
     if not isinstance(file_properties, dict): return False
 
-    data_load_and_valid_schema = False
-    extracted_data_source_for_summary = "N/A"
-    source_to_try_loading = None
-
-    if 'url' in file_properties and isinstance(file_properties['url'], str) and file_properties['url'].strip().startswith('http'):
-        source_to_try_loading = file_properties['url'].strip()
-        extracted_data_source_for_summary = source_to_try_loading
-    elif 'recent_urls' in file_properties and isinstance(file_properties['recent_urls'], list) and file_properties['recent_urls']:
-        for url_candidate in file_properties['recent_urls']:
-            if isinstance(url_candidate, str) and url_candidate.strip().lower().startswith('http'):
-                source_to_try_loading = url_candidate.strip()
-                extracted_data_source_for_summary = source_to_try_loading
-                break
-    if not source_to_try_loading and 'recent_paths' in file_properties and \
-       isinstance(file_properties['recent_paths'], list) and file_properties['recent_paths']:
-        first_path_obj = file_properties['recent_paths'][0]
-        path_str = None
-        if hasattr(first_path_obj, 'abspath') and isinstance(first_path_obj.abspath, str): path_str = first_path_obj.abspath.strip()
-        elif isinstance(first_path_obj, str): path_str = first_path_obj.strip()
-        if path_str:
-            source_to_try_loading = path_str
-            extracted_data_source_for_summary = f"Local: {os.path.basename(path_str)}"
-
-    summary_for_output = "데이터 소스 정보 없음 또는 요약 실패"
-    if source_to_try_loading:
-        summary_for_output = get_data_summary_from_url(source_to_try_loading)
+    source_to_try_loading, extracted_data_source_for_summary = get_file_widget_source(file_properties)
+
+    # 요약과 검증이 같은 (캐시된) 로드 결과를 함께 사용 - 데이터셋은 실행당 한 번만 읽음
+    data_summary = load_data_summary(source_to_try_loading) if source_to_try_loading else None
+    summary_for_output = format_data_summary(data_summary) if data_summary else "데이터 소스 정보 없음 또는 요약 실패"
     if data_summary_output_list is not None: data_summary_output_list.append(f"소스: {extracted_data_source_for_summary} | 요약: {summary_for_output}")
 
-    if source_to_try_loading and ORANGE_AVAILABLE:
-        try:
-            data_table = Table(source_to_try_loading)
-            if data_table is not None and len(data_table) > 0 and \
-               data_table.domain is not None and \
-               hasattr(data_table.domain, 'variables') and \
-               isinstance(data_table.domain.variables, list) and \
-               len(data_table.domain.variables) > 0:
-                data_load_and_valid_schema = True
-        except: pass
-    elif source_to_try_loading and not ORANGE_AVAILABLE:
-        if not summary_for_output.startswith("데이터 요약 불가") and \
-           not summary_for_output.startswith("데이터 로드 실패") and \
-           not summary_for_output.startswith("데이터 로드/분석 오류") and \
-           ("총 " in summary_for_output and "개 행" in summary_for_output):
-            data_load_and_valid_schema = True
-            
-    return data_load_and_valid_schema
+    return is_valid_data_summary(data_summary)
 
 def check_criterion_1_3(xml_root):
     if xml_root is None: return False
@@ -122,7 +57,7 @@ def check_criterion_1_3(xml_root):
     dt_node_id = _get_node_id_from_name(xml_root, "Data Table") # ID "1"
     if not (file_node_id and dt_node_id): return False
     # 모범 답안 링크 ID "14": File(0) --Data/data--> Data Table(1) --Data/data-->
-    return check_link_exists(xml_root, "0", "1", "data", "data")
+    return check_link_exists(xml_root, file_node_id, dt_node_id, "data", "data")
 
 
 # === 평가 요소 2: 데이터 전처리 ===
@@ -130,24 +65,20 @@ def check_criterion_2_1(xml_root):
     if xml_root is None: return False
     return get_node_by_name(xml_root, "Preprocess") is not None
 
-def check_criterion_2_2(xml_root):
+def check_criterion_2_2(xml_root, impute_method=5):
     if xml_root is None: return False
     preprocess_node_id = _get_node_id_from_name(xml_root, "Preprocess") # ID "2"
     if not preprocess_node_id: return False
-    props_text = get_node_properties_obj(xml_root, preprocess_node_id)
-    if not isinstance(props_text, str): return False
-    try:
-        settings = ast.literal_eval(props_text)
-        if isinstance(settings, dict) and 'storedsettings' in settings:
-            preprocessors = settings['storedsettings'].get('preprocessors', [])
-            if isinstance(preprocessors, list):
-                for processor in preprocessors:
-                    if isinstance(processor, tuple) and len(processor) == 2:
-                        if processor[0] == 'orange.preprocess.impute' and \
-                           isinstance(processor[1], dict) and \
-                           processor[1].get('method') == 5: # 모범 답안 값
-                            return True
-    except: return False
+    settings = get_node_settings(xml_root, preprocess_node_id)
+    if isinstance(settings, dict) and isinstance(settings.get('storedsettings'), dict):
+        preprocessors = settings['storedsettings'].get('preprocessors', [])
+        if isinstance(preprocessors, list):
+            for processor in preprocessors:
+                if isinstance(processor, tuple) and len(processor) == 2:
+                    if processor[0] == 'orange.preprocess.impute' and \
+                       isinstance(processor[1], dict) and \
+                       processor[1].get('method') == impute_method: # 모범 답안 값 5
+                        return True
     return False
 
 def check_criterion_2_3(xml_root):
@@ -156,28 +87,24 @@ def check_criterion_2_3(xml_root):
     preprocess_node_id = _get_node_id_from_name(xml_root, "Preprocess") # ID "2"
     if not (file_node_id and preprocess_node_id): return False
     # 모범 답안 링크 ID "13": File(0) --Data/data--> Preprocess(2) --Data/data-->
-    return check_link_exists(xml_root, "0", "2", "data", "data")
+    return check_link_exists(xml_root, file_node_id, preprocess_node_id, "data", "data")
 
 # === 평가 요소 3: 데이터 분류 ===
 def check_criterion_3_1(xml_root):
     if xml_root is None: return False
     return get_node_by_name(xml_root, "Data Sampler") is not None
 
-def check_criterion_3_2(xml_root): 
+def check_criterion_3_2(xml_root, sample_percentage=80):
     if xml_root is None: return False
     ds_node_id = _get_node_id_from_name(xml_root, "Data Sampler") # ID "3"
     if not ds_node_id: return False
-    props_text = get_node_properties_obj(xml_root, ds_node_id)
-    if not isinstance(props_text, str): return False
-    try:
-        settings = ast.literal_eval(props_text)
-        if isinstance(settings, dict):
-            sampling_type = settings.get('sampling_type')
-            percentage = settings.get('sampleSizePercentage')
-            # 모범 답안 ID "3" (Data Sampler) 은 sampleSizePercentage: 80, sampling_type: 0
-            if sampling_type == 0 and percentage == 80: 
-                return True
-    except: return False
+    settings = get_node_settings(xml_root, ds_node_id)
+    if isinstance(settings, dict):
+        sampling_type = settings.get('sampling_type')
+        percentage = settings.get('sampleSizePercentage')
+        # 모범 답안 ID "3" (Data Sampler) 은 sampleSizePercentage: 80, sampling_type: 0
+        if sampling_type == 0 and percentage == sample_percentage:
+            return True
     return False
 
 def check_criterion_3_3(xml_root):
@@ -198,7 +125,8 @@ def check_criterion_3_3(xml_root):
     ds_node_id = _get_node_id_from_name(xml_root, "Data Sampler") # ID "3"
     if not (source_node_id and ds_node_id): return False
     # 모범 답안 링크 ID "0": Preprocess(2) --Preprocessed Data/preprocessed_data--> Data Sampler(3) --Data/data-->
-    return check_link_exists(xml_root, source_node_id, ds_node_id, source_channel_id_val, "data")
+    # 사이에 Select Columns, Impute 같은 위젯을 끼워 넣어도 데이터가 이어지면 인정
+    return check_path_exists(xml_root, source_node_id, ds_node_id, source_channel_id_val, "data")
 
 
 # === 평가 요소 4: 모델링 ===
@@ -208,51 +136,61 @@ def check_criterion_4_1(xml_root):
     ds_node_id = _get_node_id_from_name(xml_root, "Data Sampler")      # ID "3"
     if not (knn_node_id and ds_node_id): return False
     # 모범 답안 링크 ID "1": Data Sampler(3) --Data Sample/data_sample--> kNN(4) --Data/data-->
-    return check_link_exists(xml_root, "3", "4", "data_sample", "data")
+    return check_link_exists(xml_root, ds_node_id, knn_node_id, "data_sample", "data")
 
 def check_criterion_4_2(xml_root):
     if xml_root is None: return False
     tree_node_id = _get_node_id_from_name(xml_root, "Tree")            # ID "5"
     ds_node_id = _get_node_id_from_name(xml_root, "Data Sampler")      # ID "3"
     if not (tree_node_id and ds_node_id): return False
-    return check_link_exists(xml_root, "3", "5", "data_sample", "data")
+    return check_link_exists(xml_root, ds_node_id, tree_node_id, "data_sample", "data")
 
 def check_criterion_4_3(xml_root):
     if xml_root is None: return False
     lr_node_id = _get_node_id_from_name(xml_root, "Logistic Regression") # ID "6"
     ds_node_id = _get_node_id_from_name(xml_root, "Data Sampler")        # ID "3"
     if not (lr_node_id and ds_node_id): return False
-    return check_link_exists(xml_root, "3", "6", "data_sample", "data")
+    return check_link_exists(xml_root, ds_node_id, lr_node_id, "data_sample", "data")
 
 # === 평가 요소 5: 성능 평가 ===
-def check_criterion_5_1(xml_root, ca_threshold=0.0):
-    if xml_root is None: return False
+def find_score_in_obj(obj_to_search, metric="CA"):
+    if isinstance(obj_to_search, dict):
+        for key, value in obj_to_search.items():
+            # show_score_hints 의 {'CA': True} 같은 표시 여부 플래그는 점수가 아님
+            if str(key).upper() == metric.upper() and isinstance(value, (int, float)) and not isinstance(value, bool): return value
+            if isinstance(value, (dict, list)):
+                found = find_score_in_obj(value, metric)
+                if found is not None: return found
+    elif isinstance(obj_to_search, list):
+        for item in obj_to_search:
+            found = find_score_in_obj(item, metric)
+            if found is not None: return found
+    return None
+
+def get_saved_score(pred_properties, metric="CA"):
+    # Predictions 위젯에 저장된 score_table 에서 지표 값을 찾음 (pickle 은 제한된 Unpickler 로 Orange 없이도 읽힘)
+    if not isinstance(pred_properties, dict): return None
+    score_table = pred_properties.get('score_table')
+    if not isinstance(score_table, dict): return None
+    return find_score_in_obj(score_table.get('results', score_table), metric)
+
+def workflow_ca(xml_root, recompute=False):
+    # Predictions 위젯의 CA. recompute=True 면 파이프라인을 다시 실행해서 얻은 값 (다시 실행할 수 없으면 저장된 값). 없으면 None
+    if xml_root is None: return None
     pred_node_id = _get_node_id_from_name(xml_root, "Predictions") # ID "8"
-    if not pred_node_id: return False
-    
+    if not pred_node_id: return None
+
     pred_properties = get_node_properties_obj(xml_root, pred_node_id)
-    if not isinstance(pred_properties, dict): return False
-
-    if ORANGE_AVAILABLE and 'score_table' in pred_properties:
-        score_table = pred_properties.get('score_table')
-        if isinstance(score_table, dict):
-            def find_ca_in_obj(obj_to_search):
-                if isinstance(obj_to_search, dict):
-                    for key, value in obj_to_search.items():
-                        if str(key).upper() == 'CA' and isinstance(value, (int, float)): return value
-                        if isinstance(value, (dict, list)):
-                            found = find_ca_in_obj(value)
-                            if found is not None: return found
-                elif isinstance(obj_to_search, list):
-                    for item in obj_to_search:
-                        found = find_ca_in_obj(item)
-                        if found is not None: return found
-                return None
-            
-            ca_value = find_ca_in_obj(score_table.get('results', score_table))
-            
-            if ca_value is not None:
-                return ca_value >= ca_threshold
+    if not isinstance(pred_properties, dict): return None
+
+    ca_value = recompute_scores(as_workflow(xml_root), pred_node_id, "CA") if recompute else None
+    if ca_value is None: ca_value = get_saved_score(pred_properties, "CA")
+    return ca_value
+
+def check_criterion_5_1(xml_root, ca_threshold=0.0, recompute=False):
+    ca_value = workflow_ca(xml_root, recompute)
+    if ca_value is not None:
+        return ca_value >= ca_threshold
     return False
 
 def check_criterion_5_2(xml_root):
@@ -261,10 +199,73 @@ def check_criterion_5_2(xml_root):
     pred_node_id = _get_node_id_from_name(xml_root, "Predictions")    # ID "8"
     if not (ds_node_id and pred_node_id): return False
     # 모범 답안 링크 ID "10": DS(3) --Remaining Data/remaining_data--> Predictions(8) --Data/data-->
-    return check_link_exists(xml_root, "3", "8", "remaining_data", "data")
+    # 중간 위젯을 거쳐 Predictions 의 data 입력으로 들어가도 인정
+    return check_path_exists(xml_root, ds_node_id, pred_node_id, "remaining_data", "data")
+
+
+# 기준들이 속성(설정)을 읽는 위젯. 스트리밍 로더는 나머지 위젯의 속성 내용을 메모리에 두지 않음
+PROPERTY_WIDGETS = frozenset({"File", "Preprocess", "Data Sampler", "Predictions"})
+
+# === 채점 기준 목록 (배치 채점의 열 순서도 이 순서를 따름) ===
+# check_criterion_* 의 판정 로직을 바꾸면 올려야 함 (저장된 채점 결과 캐시가 무효화됨)
+CRITERIA_VERSION = 2
+CRITERIA = [
+    ("1-1", "File 위젯 사용", check_criterion_1_1),
+    ("1-2", "실제 데이터 로드 및 내용 확인", check_criterion_1_2),
+    ("1-3", "File-Data Table 연결", check_criterion_1_3),
+    ("2-1", "Preprocess 위젯 사용", check_criterion_2_1),
+    ("2-2", "Preprocess 설정 확인", check_criterion_2_2),
+    ("2-3", "File-Preprocess 연결", check_criterion_2_3),
+    ("3-1", "Data Sampler 사용", check_criterion_3_1),
+    ("3-2", "Data Sampler 설정", check_criterion_3_2),
+    ("3-3", "Preprocess/File-Data Sampler 연결", check_criterion_3_3),
+    ("4-1", "kNN 사용 및 연결", check_criterion_4_1),
+    ("4-2", "Tree 사용 및 연결", check_criterion_4_2),
+    ("4-3", "Logistic Regression 사용 및 연결", check_criterion_4_3),
+    ("5-1", "Predictions 사용/CA 확인", check_criterion_5_1),
+    ("5-2", "Data Sampler-Predictions 연결", check_criterion_5_2),
+]
+
+# 데이터셋을 실제로 불러와야 하는 기준과 그 데이터 소스 위젯 (구조만 보는 빠른 채점에서는 건너뜀 -> Orange import 없음)
+DATA_CRITERIA = {"1-2": "File"}
+
+# 채점 변형마다 바꿀 수 있는 매개변수와 그 값을 쓰는 기준 (나머지 기준은 변형끼리 결과가 같음)
+DEFAULT_PARAMS = {"ca_threshold": 0.0, "impute_method": 5, "sample_percentage": 80}
+PARAM_CRITERIA = {"2-2": "impute_method", "3-2": "sample_percentage", "5-1": "ca_threshold"}
+
+def grade_workflow(xml_root, ca_threshold=0.0, check_data=True, only=None, recompute=False, outcomes=None, params=None):
+    # 모든 기준을 한 워크플로에 대해 평가. ({기준 ID: bool}, 데이터 요약 문자열) 반환
+    # check_data=False 이면 데이터 기준은 평가하지 않고 None 으로 남김. only 가 주어지면 그 기준들만 평가
+    # params 로 DEFAULT_PARAMS 의 값(Preprocess impute 방식, Data Sampler 비율 등)을 바꿀 수 있음
+    # recompute=True 면 5-1 의 CA 를 워크플로를 다시 실행해서 구함 (데이터를 불러오므로 check_data=False 면 하지 않음)
+    # outcomes(dict)에는 기준별 결과 종류: "ok", "skipped"(데이터 생략), "payload"(속성이 상한보다 커서 못 읽음, 값은 None)
+    # 평가 중인 기준은 "running" -> 시간/메모리 제한으로 중간에 멈추면 그 기준이 "running" 으로 남음
+    outcomes = {} if outcomes is None else outcomes
+    params = {**DEFAULT_PARAMS, "ca_threshold": ca_threshold, **(params or {})}
+    data_summary = []
+    results = {}
+    for criterion_id, _, check in CRITERIA:
+        if only is not None and criterion_id not in only: continue
+        outcomes[criterion_id] = "running"
+        try:
+            if criterion_id in DATA_CRITERIA and not check_data:
+                results[criterion_id] = None; data_summary.append("데이터 검증 생략 (구조 채점 모드)")
+                outcomes[criterion_id] = "skipped"; continue
+            elif check is check_criterion_1_2: results[criterion_id] = check(xml_root, data_summary)
+            elif check is check_criterion_5_1: results[criterion_id] = check(xml_root, ca_threshold=params["ca_threshold"], recompute=recompute and check_data)
+            elif criterion_id in PARAM_CRITERIA: results[criterion_id] = check(xml_root, params[PARAM_CRITERIA[criterion_id]])
+            else: results[criterion_id] = check(xml_root)
+        except PayloadTooLarge:
+            results[criterion_id] = None; outcomes[criterion_id] = "payload"; continue
+        outcomes[criterion_id] = "ok"
+    return results, (data_summary[0] if data_summary else "N/A")
 
 
 if __name__ == '__main__':
+    if ORANGE_AVAILABLE:
+        print("[Init grading_criteria_checks] Orange3 라이브러리 사용 가능.")
+    else:
+        print("경고: grading_criteria_checks - Orange3 라이브러리 사용 불가. 일부 기능이 제한됩니다.")
     script_dir = os.path.dirname(os.path.abspath(__file__))
     test_file_path = os.path.join(script_dir, "30101 테스트.ows") 
     
@@ -0,0 +1,248 @@
+# grading_daemon.py
+
+import os
+import sys
+import json
+import time
+import shutil
+import signal
+import argparse
+import tempfile
+import threading
+import socketserver
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+from dataset_cache import CACHE_DIR_ENV, default_cache_dir
+from dataset_fetch import FETCH_TIMEOUT_ENV, MAX_DOWNLOAD_BYTES_ENV
+from grading_criteria_checks import CRITERIA
+from isolated_worker import IsolatedPool
+from ows_parser import MAX_PAYLOAD_BYTES_ENV
+from rubric_engine import compile_rubric, load_rubric
+from zip_ingest import submission_exists
+
+MAX_BODY_BYTES = 50 * 1024 * 1024
+USAGE = """예:
+  python grading_daemon.py --port 8765
+  curl -s localhost:8765/health
+  curl -s -X POST --data-binary @"30101 홍길동.ows" "localhost:8765/grade?name=30101%20홍길동.ows"
+  curl -s -X POST -H 'Content-Type: application/json' -d '{"path": "/submissions/30101 홍길동.ows"}' localhost:8765/grade
+  curl -s -X POST -H 'Content-Type: application/json' -d '{"path": "/exports/3반.zip::30101 홍길동.ows"}' localhost:8765/grade
+  python grading_daemon.py --socket /tmp/orange_grader.sock   # curl --unix-socket /tmp/orange_grader.sock http://x/health"""
+
+
+def _warm_worker(preload_orange):
+    # 워커가 뜰 때 한 번: 채점 모듈 import, 필요하면 Orange 도 미리 import (첫 요청부터 바로 채점)
+    import batch_grading  # noqa: F401
+    if preload_orange:
+        from ows_parser import ORANGE_AVAILABLE_PARSER, get_orange_table_class
+        if ORANGE_AVAILABLE_PARSER: get_orange_table_class()
+
+
+def _upload_name(name):
+    # ?name= 에서 파일 이름만 씀. .ows 파일 이름이 아니면(., .. 등) 기본 이름 (스풀 디렉터리 밖이나 디렉터리를 열지 않게)
+    name = os.path.basename((name or "").replace("\\", "/"))
+    return name if name.lower().endswith(".ows") else "submission.ows"
+
+
+class GradingService:
+    # 미리 띄워 둔 워커 풀 + 크기가 정해진 대기열. 자리가 없으면 바로 거절 (HTTP 503) 해서 요청이 쌓이지 않게 함
+    # 워커 프로세스는 계속 살아 있으므로 데이터셋 요약/채점 결과 캐시가 메모리에 그대로 남음
+    # 제출물마다 시간(request_timeout)/메모리 제한을 걸고, 제한에 걸리거나 죽은 워커는 풀이 알아서 새로 띄움
+    def __init__(self, workers=None, queue_size=32, request_timeout=60.0, preload_orange=True, memory_mb=None,
+                 max_tasks_per_worker=None, **grade_kwargs):
+        self.workers = workers or os.cpu_count() or 1
+        self.capacity = self.workers + queue_size
+        self.request_timeout = request_timeout; self.preload_orange = preload_orange
+        self.memory_mb = memory_mb; self.max_tasks_per_worker = max_tasks_per_worker
+        self.grade_kwargs = grade_kwargs
+        rubric = grade_kwargs.get("rubric")
+        plan = compile_rubric(rubric) if rubric is not None else None
+        self.criteria = [(c["id"], c["label"]) for c in plan.criteria] if plan else [(c[0], c[1]) for c in CRITERIA]
+        self._slots = threading.BoundedSemaphore(self.capacity)
+        self._lock = threading.Lock()
+        self.pending = 0; self.graded = 0; self.rejected = 0; self.started = time.time()
+        self.rebuilt = 0; self.broken = None
+        self._pool = self._new_pool()
+
+    def _new_pool(self):
+        pool = IsolatedPool(self.workers, self.request_timeout, self.memory_mb, self.max_tasks_per_worker,
+                            initializer=_warm_worker, initargs=(self.preload_orange,), **self.grade_kwargs)
+        # 워커들이 import 를 끝낼 때까지 기다림 (첫 요청이 콜드 스타트를 치르지 않게)
+        pool.wait_ready()
+        if pool.broken: pool.close(); raise RuntimeError(pool.broken)
+        return pool
+
+    def try_acquire(self):
+        if not self._slots.acquire(blocking=False):
+            with self._lock: self.rejected += 1
+            return False
+        with self._lock: self.pending += 1
+        return True
+
+    def release(self):
+        with self._lock: self.pending -= 1
+        self._slots.release()
+
+    def grade(self, file_path, **overrides):
+        # 자리를 잡은(try_acquire) 뒤에 호출. 시간 초과/메모리 부족/워커 종료도 상태(status)가 담긴 행으로 돌아옴
+        pool = self._pool
+        try: row = pool.submit(file_path, **overrides).result()
+        except RuntimeError:
+            if not pool.broken: raise
+            # 워커가 계속 시작에 실패해 풀이 멈췄으면(broken) 한 번 새로 띄워서 다시 맡김. 새 풀도 못 띄우면 이후 요청은 바로 500
+            with self._lock:
+                if self.broken: raise RuntimeError(self.broken) from None
+                if self._pool is pool:  # 먼저 실패한 다른 요청이 이미 새로 띄웠으면 그 풀을 씀
+                    pool.close()
+                    try: self._pool = self._new_pool()
+                    except RuntimeError as e:
+                        self.broken = f"채점 풀을 다시 띄우지 못함: {e}"; raise RuntimeError(self.broken) from e
+                    self.rebuilt += 1
+            row = self._pool.submit(file_path, **overrides).result()
+        with self._lock: self.graded += 1
+        return row
+
+    def health(self):
+        with self._lock:
+            broken = self.broken or self._pool.broken
+            return {"status": "broken" if broken else "ok", "broken": broken, "workers": self.workers,
+                    "capacity": self.capacity, "pending": self.pending, "graded": self.graded, "rejected": self.rejected, "uptime_s": round(time.time() - self.started, 1),
+                    "recycled": self._pool.recycled, "killed": self._pool.killed, "rebuilt": self.rebuilt,
+                    "criteria": [criterion_id for criterion_id, _ in self.criteria]}
+
+    def close(self):
+        self._pool.close()
+
+
+class GradingRequestHandler(BaseHTTPRequestHandler):
+    # GET /health, POST /grade (JSON {"path": ...} 또는 .ows 파일 내용 그대로 + ?name=파일이름)
+    server_version = "OrangeGrader/1.0"
+    protocol_version = "HTTP/1.1"
+
+    def address_string(self):
+        return self.client_address[0] if isinstance(self.client_address, tuple) and self.client_address else "unix"
+
+    def log_message(self, fmt, *args):
+        if self.server.verbose: super().log_message(fmt, *args)
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items(): self.send_header(key, value)
+        self.end_headers(); self.wfile.write(body)
+
+    def do_GET(self):
+        if urlsplit(self.path).path == "/health":
+            health = self.server.service.health()
+            self._send_json(200 if health["status"] == "ok" else 503, health)
+        else: self._send_json(404, {"error": "없는 경로입니다. (GET /health, POST /grade)"})
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        if url.path != "/grade": return self._send_json(404, {"error": "없는 경로입니다. (GET /health, POST /grade)"})
+        try: length = int(self.headers.get("Content-Length") or 0)
+        except ValueError: length = -1
+        if length < 0 or length > MAX_BODY_BYTES:
+            # 본문을 읽지 않고 답하므로 연결을 닫음 (keep-alive 면 남은 본문이 다음 요청으로 읽힘)
+            self.close_connection = True
+            if length < 0: return self._send_json(400, {"error": "잘못된 Content-Length"})
+            return self._send_json(413, {"error": f"요청이 너무 큽니다 (> {MAX_BODY_BYTES} 바이트)"})
+        body = self.rfile.read(length) if length else b""
+        service = self.server.service
+        if not service.try_acquire():
+            return self._send_json(503, {"error": "채점 대기열이 가득 찼습니다. 잠시 후 다시 시도하세요."}, {"Retry-After": "1"})
+        spool_dir = None
+        try:
+            query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+            if self.headers.get("Content-Type", "").startswith("application/json"):
+                request = json.loads(body.decode("utf-8") or "{}")
+                if not isinstance(request, dict): return self._send_json(400, {"error": "JSON 본문은 객체여야 합니다 (예: {\"path\": \"...\"})"})
+                file_path = request.get("path")
+                if not isinstance(file_path, str) or not file_path or not submission_exists(file_path):
+                    return self._send_json(400, {"error": f"파일이 없습니다: {file_path}"})
+            else:
+                request = query
+                spool_dir = tempfile.mkdtemp(prefix="grade_", dir=self.server.spool_root)
+                file_path = os.path.join(spool_dir, _upload_name(query.get("name")))
+                with open(file_path, "wb") as f: f.write(body)
+            overrides = {}
+            if "ca_threshold" in request: overrides["ca_threshold"] = float(request["ca_threshold"])
+            if str(request.get("structural_only", "")).lower() in ("1", "true", "yes"): overrides["check_data"] = False
+            if str(request.get("recompute", "")).lower() in ("1", "true", "yes"): overrides["recompute"] = True
+            row = service.grade(file_path, **overrides)
+            row["labels"] = dict(service.criteria)
+            if spool_dir: row["file"] = os.path.basename(file_path)
+            # 제한에 걸린 제출물도 기준별 결과 종류(outcomes)가 담긴 행을 그대로 돌려줌
+            self._send_json({"timeout": 504, "memory": 500, "crashed": 500}.get(row["status"], 200), row)
+        except (ValueError, UnicodeDecodeError) as e:
+            self._send_json(400, {"error": f"잘못된 요청: {e}"})
+        except (RuntimeError, OSError) as e:
+            self._send_json(500, {"error": str(e)})
+        finally:
+            service.release()
+            if spool_dir: shutil.rmtree(spool_dir, ignore_errors=True)
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def serve(service, host="127.0.0.1", port=8765, socket_path=None, verbose=False):
+    if socket_path:
+        if os.path.exists(socket_path): os.remove(socket_path)
+        server = _UnixHTTPServer(socket_path, GradingRequestHandler)
+        where = f"unix:{socket_path}"
+    else:
+        server = ThreadingHTTPServer((host, port), GradingRequestHandler); server.daemon_threads = True
+        where = f"http://{host}:{server.server_address[1]}"
+    server.service = service; server.verbose = verbose
+    server.spool_root = tempfile.mkdtemp(prefix="orange_grader_spool_")
+    signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=server.shutdown, daemon=True).start())
+    print(f"채점 데몬 시작: {where} (워커 {service.workers}개, 대기열 {service.capacity - service.workers})")
+    try: server.serve_forever()
+    except KeyboardInterrupt: pass
+    finally:
+        server.server_close(); service.close()
+        shutil.rmtree(server.spool_root, ignore_errors=True)
+        if socket_path and os.path.exists(socket_path): os.remove(socket_path)
+        print("채점 데몬 종료")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="워커를 미리 띄워 두고 요청마다 바로 채점하는 로컬 채점 데몬",
+                                     epilog=USAGE, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--socket", help="TCP 대신 이 경로의 Unix 소켓으로 받음")
+    parser.add_argument("--workers", type=int, default=None, help="워커 프로세스 수 (기본: CPU 코어 수)")
+    parser.add_argument("--queue-size", type=int, default=32, help="처리 중인 것 외에 기다릴 수 있는 요청 수 (넘치면 503)")
+    parser.add_argument("--timeout", type=float, default=60.0, help="요청당 채점 시간 제한(초, 넘으면 워커를 교체)")
+    parser.add_argument("--memory-limit-mb", type=float, help="워커 프로세스 메모리 상한(MB, RLIMIT_AS: Orange import 를 포함한 워커 전체 주소 공간. macOS 에서는 최대 RSS 로 워커 교체)")
+    parser.add_argument("--max-tasks-per-worker", type=int, help="워커 하나가 이만큼 채점하면 새 프로세스로 교체")
+    parser.add_argument("--max-payload-mb", type=float, help="노드 속성(pickle) 하나의 최대 크기(MB)")
+    parser.add_argument("--ca-threshold", type=float, default=0.0)
+    parser.add_argument("--rubric", help="루브릭 파일(.json/.yaml)")
+    parser.add_argument("--structural-only", action="store_true", help="데이터셋 검증 없이 구조 기준만 (Orange 를 미리 띄우지 않음)")
+    parser.add_argument("--cache-dir", help="데이터셋 요약/채점 결과 캐시 디렉터리")
+    parser.add_argument("--fetch-timeout", type=float)
+    parser.add_argument("--max-download-mb", type=float)
+    parser.add_argument("--incremental", action="store_true", help="채점 결과 캐시(SQLite) 사용")
+    parser.add_argument("--recompute-scores", action="store_true", help="CA 를 워크플로를 다시 실행해서 구함 (Orange 필요)")
+    parser.add_argument("--verbose", action="store_true", help="요청마다 접근 로그 출력")
+    args = parser.parse_args(argv)
+    if args.cache_dir: os.environ[CACHE_DIR_ENV] = args.cache_dir
+    if args.fetch_timeout: os.environ[FETCH_TIMEOUT_ENV] = str(args.fetch_timeout)
+    if args.max_download_mb: os.environ[MAX_DOWNLOAD_BYTES_ENV] = str(int(args.max_download_mb * 1024 * 1024))
+    if args.max_payload_mb: os.environ[MAX_PAYLOAD_BYTES_ENV] = str(int(args.max_payload_mb * 1024 * 1024))
+    result_store = os.path.join(default_cache_dir(), "results.sqlite") if args.incremental else None
+    service = GradingService(args.workers, args.queue_size, args.timeout, preload_orange=not args.structural_only,
+                             memory_mb=args.memory_limit_mb, max_tasks_per_worker=args.max_tasks_per_worker,
+                             ca_threshold=args.ca_threshold, rubric=load_rubric(args.rubric) if args.rubric else None,
+                             check_data=not args.structural_only, result_store=result_store, recompute=args.recompute_scores)
+    serve(service, args.host, args.port, args.socket, args.verbose)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,245 @@
+# isolated_worker.py
+
+import os
+import sys
+import time
+import signal
+import resource
+import threading
+import collections
+import multiprocessing
+from multiprocessing.connection import wait
+from concurrent.futures import Future
+
+from batch_grading import criterion_ids_for, failed_row, grade_submission, memory_error_row
+
+# 제출물마다 시간/메모리 제한을 거는 워커 풀. 워커는 제출물 하나씩 받아 채점하고, 제한에 걸리면 그 제출물만
+# "timeout"/"memory" 행으로 기록한 뒤 새 프로세스로 교체됨 (반 전체 채점이 한 제출물 때문에 멈추거나 죽지 않게)
+KILL_GRACE = 5.0          # 워커 안의 타이머로 멈추지 못하면 (C 코드 안에서 멈춤 등) 이만큼 더 기다렸다가 강제 종료
+RSS_RECYCLE_RATIO = 0.8   # 최대 RSS 가 메모리 상한의 이 비율을 넘은 워커는 다음 제출물 전에 교체
+MAX_STARTUP_FAILURES = 3  # 준비도 못 하고 죽는 워커가 연달아 이만큼이면 (import 실패 등) 다시 띄우지 않고 풀을 멈춤
+READY = "ready"
+
+
+class GradingTimeout(BaseException):
+    # BaseException: 채점 코드의 except Exception 에 잡히지 않고 워커 루프까지 올라오도록
+    pass
+
+_deadline_armed = False
+
+def _raise_timeout(signum, frame):
+    if _deadline_armed: raise GradingTimeout()
+
+def _set_deadline(seconds):
+    global _deadline_armed
+    _deadline_armed = bool(seconds)
+    signal.setitimer(signal.ITIMER_REAL, seconds or 0)
+
+def _apply_memory_limit(memory_mb):
+    # RLIMIT_AS 로 주소 공간 상한 -> 넘는 할당은 MemoryError. macOS 는 RLIMIT_AS 를 강제하지 않으므로
+    # 거기서는 최대 RSS 를 보고 워커를 교체하는 것으로 대신함. 실제로 강제되면 True
+    if not memory_mb: return False
+    limit = int(memory_mb * 1024 * 1024)
+    try: resource.setrlimit(resource.RLIMIT_AS, (limit, resource.getrlimit(resource.RLIMIT_AS)[1]))
+    except (ValueError, OSError): return False
+    return sys.platform != "darwin"
+
+def _peak_rss_bytes():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024  # macOS 는 바이트, 리눅스는 KB
+
+def _preload_orange():
+    # 데이터셋을 불러오는 채점이면 Orange 를 미리 import (원래는 첫 데이터 기준에서 늦게 import 됨)
+    from ows_parser import ORANGE_AVAILABLE_PARSER, get_orange_table_class
+    if ORANGE_AVAILABLE_PARSER: get_orange_table_class()
+
+def _worker_main(conn, limits, grade_kwargs, initializer=None, initargs=()):
+    # 워커 프로세스: (경로, 덮어쓸 인자) 를 받아 채점하고 (행, 교체 여부) 를 돌려줌. None 을 받거나 교체할 때 종료
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl+C 는 부모가 처리
+    if initializer is not None: initializer(*initargs)
+    # RLIMIT_AS 는 이미 import 한 모듈(Orange/numpy 수백 MB)까지 포함한 프로세스 전체 주소 공간에 걸림 -> 상한은 그만큼 넉넉히
+    # 데이터 채점이면 Orange 를 상한을 걸기 전에 import 해서, 상한에 걸리면 import 도중(워커가 죽음)이 아니라
+    # 채점 중 MemoryError("memory" 행)로 나타나게 함
+    if limits.get("memory_mb") and grade_kwargs.get("check_data", True): _preload_orange()
+    _apply_memory_limit(limits.get("memory_mb"))
+    signal.signal(signal.SIGALRM, _raise_timeout)
+    timeout = limits.get("timeout"); max_tasks = limits.get("max_tasks_per_worker")
+    memory_bytes = (limits.get("memory_mb") or 0) * 1024 * 1024
+    conn.send(READY)
+    done = 0
+    while True:
+        try: task = conn.recv()
+        except (EOFError, OSError): break
+        if task is None: break
+        path, overrides = task
+        kwargs = dict(grade_kwargs, **overrides)
+        outcomes = {}; started = time.perf_counter(); recycle = False
+        try:
+            _set_deadline(timeout)
+            row = grade_submission(path, outcomes=outcomes, **kwargs)
+            _set_deadline(None)
+        except GradingTimeout:
+            _set_deadline(None)
+            row = failed_row(path, "timeout", f"채점 시간 초과 ({timeout}초)", criterion_ids_for(kwargs.get("rubric")), outcomes)
+            recycle = True
+        except MemoryError:
+            _set_deadline(None)
+            row = memory_error_row(path, kwargs.get("rubric"), outcomes); recycle = True
+        if row["elapsed_ms"] == "": row["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        done += 1
+        # 제한에 걸린 워커는 상태(잠금, 반쯤 채운 캐시 등)를 믿을 수 없으므로 교체
+        recycle = recycle or bool(max_tasks and done >= max_tasks) or bool(memory_bytes and _peak_rss_bytes() > RSS_RECYCLE_RATIO * memory_bytes)
+        conn.send((row, recycle))
+        if recycle: break
+    conn.close()
+
+
+class IsolatedPool:
+    # 워커마다 전용 파이프를 두고 제출물을 하나씩 나눠 줌. 디스패처 스레드가 결과/워커 종료/시간 초과를 함께 기다림
+    # 워커 안의 타이머(SIGALRM)로 시간 초과를 먼저 처리하고, 그래도 KILL_GRACE 안에 답이 없으면 프로세스를 죽이고 새로 띄움
+    def __init__(self, workers=None, timeout=None, memory_mb=None, max_tasks_per_worker=None, initializer=None, initargs=(),
+                 **grade_kwargs):
+        self.workers = workers or os.cpu_count() or 1
+        self.timeout = timeout
+        self.limits = {"timeout": timeout, "memory_mb": memory_mb, "max_tasks_per_worker": max_tasks_per_worker}
+        self.grade_kwargs = grade_kwargs; self.initializer = initializer; self.initargs = initargs
+        self.criterion_ids = criterion_ids_for(grade_kwargs.get("rubric"))
+        self.recycled = 0; self.killed = 0; self._startup_failures = 0; self.broken = None
+        # spawn: 원격 데이터 선행 다운로드 스레드가 도는 중에 fork 하지 않도록 (macOS 기본값과도 같음)
+        self._context = multiprocessing.get_context("spawn")
+        self._queue = collections.deque(); self._lock = threading.Lock()
+        self._wake_reader, self._wake_writer = self._context.Pipe(duplex=False)
+        self._wake_lock = threading.Lock(); self._woken = False
+        self._closed = False; self._warm = threading.Event()
+        self._slots = [self._spawn() for _ in range(self.workers)]
+        self._thread = threading.Thread(target=self._dispatch, name="isolated-pool", daemon=True)
+        self._thread.start()
+
+    def _spawn(self):
+        parent_conn, child_conn = self._context.Pipe()
+        process = self._context.Process(target=_worker_main, daemon=True,
+                                        args=(child_conn, self.limits, self.grade_kwargs, self.initializer, self.initargs))
+        process.start(); child_conn.close()
+        return {"process": process, "conn": parent_conn, "ready": False, "task": None}
+
+    def _wake(self):
+        with self._wake_lock:
+            if not self._woken: self._woken = True; self._wake_writer.send(None)
+
+    def wait_ready(self, timeout=None):
+        # 처음 띄운 워커들이 모두 import 를 마칠 때까지 기다림
+        return self._warm.wait(timeout)
+
+    def submit(self, file_path, **overrides):
+        future = Future()
+        with self._lock:
+            if self._closed: raise RuntimeError("이미 닫힌 채점 풀입니다")
+            if self.broken: raise RuntimeError(self.broken)
+            self._queue.append((future, file_path, overrides))
+        self._wake()
+        return future
+
+    def _assign(self):
+        for slot in self._slots:
+            while slot["ready"] and slot["task"] is None and self._queue:
+                future, path, overrides = self._queue.popleft()
+                if not future.set_running_or_notify_cancel(): continue
+                slot["task"] = (future, path, time.monotonic())
+                try: slot["conn"].send((path, overrides))
+                except OSError: pass  # 이미 죽은 워커: 종료 신호(sentinel)로 처리
+
+    def _finish(self, slot, row):
+        future = slot["task"][0]; slot["task"] = None
+        future.set_result(row)
+
+    def _replace(self, slot, kill=False):
+        process = slot["process"]
+        if kill: process.kill()
+        process.join(KILL_GRACE)
+        if process.is_alive(): process.kill(); process.join()
+        slot["conn"].close()
+        slot.update(self._spawn())
+
+    def _collect(self, slot):
+        try:
+            while slot["conn"].poll():
+                message = slot["conn"].recv()
+                if message == READY:
+                    slot["ready"] = True; self._startup_failures = 0
+                    if all(s["ready"] for s in self._slots): self._warm.set()
+                    continue
+                row, recycle = message
+                self._finish(slot, row)
+                if recycle:
+                    self.recycled += 1; self._replace(slot); return
+        except (EOFError, OSError): pass
+        if not slot["process"].is_alive():
+            task = slot["task"]; exitcode = slot["process"].exitcode
+            if task is not None:
+                self._finish(slot, failed_row(task[1], "crashed", f"채점 워커 프로세스가 비정상 종료됨 (exit {exitcode})",
+                                              self.criterion_ids, dict.fromkeys(self.criterion_ids, "running")))
+            if not slot["ready"]:
+                self._startup_failures += 1
+                if self._startup_failures >= MAX_STARTUP_FAILURES: return self._break(f"채점 워커를 시작할 수 없음 (exit {exitcode})")
+            self._replace(slot)
+
+    def _break(self, reason):
+        # 기다리던 제출물은 모두 예외로 끝내고, 이후 submit 도 거절
+        with self._lock:
+            self.broken = reason
+            queued = list(self._queue); self._queue.clear()
+        for future, _, _ in queued:
+            if future.set_running_or_notify_cancel(): future.set_exception(RuntimeError(reason))
+        self._warm.set()
+
+    def _enforce_deadlines(self, now):
+        # 다음 마감까지 남은 시간 (없으면 None)
+        if not self.timeout: return None
+        nearest = None
+        for slot in self._slots:
+            if slot["task"] is None: continue
+            remaining = slot["task"][2] + self.timeout + KILL_GRACE - now
+            if remaining > 0:
+                nearest = remaining if nearest is None else min(nearest, remaining); continue
+            path = slot["task"][1]
+            self._finish(slot, failed_row(path, "timeout", f"채점 시간 초과 ({self.timeout}초, 워커 강제 종료)",
+                                          self.criterion_ids, dict.fromkeys(self.criterion_ids, "running")))
+            self.killed += 1; self._replace(slot, kill=True)
+        return nearest
+
+    def _dispatch(self):
+        while True:
+            with self._lock:
+                if self._closed: break
+                self._assign()
+            timeout = self._enforce_deadlines(time.monotonic())
+            # 멈춘 풀에서는 죽은 워커를 더 기다리지 않음 (닫힌 파이프가 계속 깨워서 헛돌지 않게)
+            slots = [s for s in self._slots if not self.broken or s["process"].is_alive()]
+            waitables = [self._wake_reader] + [s["conn"] for s in slots] + [s["process"].sentinel for s in slots]
+            ready = set(wait(waitables, timeout))
+            if self._wake_reader in ready:
+                with self._wake_lock:
+                    while self._wake_reader.poll(): self._wake_reader.recv()
+                    self._woken = False
+            for slot in slots:
+                if slot["conn"] in ready or slot["process"].sentinel in ready: self._collect(slot)
+
+    def close(self):
+        with self._lock:
+            if self._closed: return
+            self._closed = True
+            queued = list(self._queue); self._queue.clear()
+        for future, _, _ in queued: future.cancel()
+        self._wake(); self._thread.join()
+        for slot in self._slots:
+            if slot["task"] is not None: slot["task"][0].set_exception(RuntimeError("채점 풀이 닫혀 채점을 마치지 못함"))
+            try: slot["conn"].send(None)
+            except OSError: pass
+        for slot in self._slots:
+            slot["process"].join(1.0)
+            if slot["process"].is_alive(): slot["process"].kill(); slot["process"].join()
+            slot["conn"].close()
+        self._wake_reader.close(); self._wake_writer.close()
+
+    def __enter__(self): return self
+    def __exit__(self, *exc_info): self.close()
@@ -1,37 +1,265 @@
 # ows_parser.py
 
 import xml.etree.ElementTree as ET
+import xml.parsers.expat as expat
+import ast
+import io
 import base64
 import pickle
 import os
+import importlib.util
 
-try:
-    from Orange.data import Table, Domain, Variable
-    ORANGE_AVAILABLE_PARSER = True
-except ImportError:
-    ORANGE_AVAILABLE_PARSER = False
-    class Table:
-        def __init__(self, *args, **kwargs):
-            self._domain = Domain()
-            self._len = 0
-        def __len__(self): return self._len
-        @property
-        def domain(self):
-            if not hasattr(self, '_domain') or self._domain is None : self._domain = Domain()
-            return self._domain
-    class Domain:
-        def __init__(self): self.attributes = []; self.class_var = None; self.class_vars = []; self.metas = []; self.variables = []
-    class Variable:
-        def __init__(self, name="dummy_var"):
-            self.name = name; self.is_discrete = False; self.is_continuous = False; self.is_string = False; self.values = []
-
-def load_ows_file(file_path):
-    try: tree = ET.parse(file_path); root = tree.getroot(); return root
+from dataset_cache import get_dataset_cache, is_remote_source
+from dataset_fetch import FetchError, get_dataset_fetcher
+from workflow_graph import ReachabilityIndex, normalize_channel
+from dataset_probe import probe_dataset
+from zip_ingest import ZIP_ERRORS, open_submission, parse_member_name, split_member_path
+
+# Orange 는 실제로 데이터셋을 불러올 때만 import (구조만 보는 채점은 Orange 없이 바로 시작)
+# find_spec 은 패키지를 찾기만 하고 import 하지 않으므로 import 비용이 들지 않음
+ORANGE_AVAILABLE_PARSER = importlib.util.find_spec("Orange") is not None
+_orange_table_class = None
+
+# 노드 속성 하나(pickle/literal 텍스트)의 최대 크기. 넘는 속성은 읽으려 할 때 PayloadTooLarge (워커들은 환경 변수로 같은 값을 씀)
+MAX_PAYLOAD_BYTES_ENV = "ORANGE_GRADER_MAX_PAYLOAD_BYTES"
+
+class PayloadTooLarge(ValueError):
+    pass
+
+def payload_limit():
+    value = os.environ.get(MAX_PAYLOAD_BYTES_ENV)
+    return int(value) if value else None
+
+def _check_payload(size, what):
+    limit = payload_limit()
+    if limit is not None and size > limit: raise PayloadTooLarge(f"{what} 크기 {size} 바이트 > 상한 {limit} 바이트")
+
+def get_orange_table_class():
+    global _orange_table_class
+    if _orange_table_class is None:
+        from Orange.data import Table
+        _orange_table_class = Table
+    return _orange_table_class
+
+# === 제한된 Unpickler: 학생 파일의 pickle 속성에서 임의 코드가 실행되지 않도록 함 ===
+# Orange/Qt/numpy 등의 클래스는 실제로 import 하지 않고 가벼운 대체 객체로 바꿔서 읽는다
+STAND_IN_MODULE_PREFIXES = ("Orange", "orangewidget", "orangecanvas", "orangecontrib",
+                            "AnyQt", "PyQt5", "PyQt6", "sip", "numpy", "scipy", "pandas", "sklearn")
+SAFE_PICKLE_GLOBALS = {
+    ("builtins", name) for name in ("set", "frozenset", "bytearray", "bytes", "complex", "slice", "range",
+                                    "list", "dict", "tuple", "int", "float", "str", "bool", "object")
+} | {("collections", "OrderedDict"), ("collections", "defaultdict"), ("copyreg", "_reconstructor"),
+     ("_codecs", "encode"), ("datetime", "datetime"), ("datetime", "date"), ("datetime", "time"),
+     ("datetime", "timedelta"), ("datetime", "timezone"), ("decimal", "Decimal")}
+
+class OrangeStandIn:
+    # 대체 객체. 생성 인자와 pickle 상태만 보관 (RecentPath.abspath, Context.values 같은 속성은 그대로 접근 가능)
+    qualified_name = None
+    def __init__(self, *args, **kwargs):
+        self.args = args; self.kwargs = kwargs
+    def __setstate__(self, state):
+        if isinstance(state, tuple) and len(state) == 2 and (state[0] is None or isinstance(state[0], dict)):
+            state, slot_state = state
+            if isinstance(slot_state, dict): self.__dict__.update(slot_state)
+        if isinstance(state, dict): self.__dict__.update(state)
+        elif state is not None: self.state = state
+    def __repr__(self):
+        return f"<{self.qualified_name} {self.__dict__!r}>"
+
+_stand_in_classes = {}
+
+def _stand_in_class(module, name):
+    qualified_name = f"{module}.{name}"
+    cls = _stand_in_classes.get(qualified_name)
+    if cls is None:
+        cls = type(name, (OrangeStandIn,), {"qualified_name": qualified_name, "__module__": __name__})
+        _stand_in_classes[qualified_name] = cls
+    return cls
+
+class RestrictedUnpickler(pickle.Unpickler):
+    def find_class(self, module, name):
+        if module.split(".", 1)[0] in STAND_IN_MODULE_PREFIXES: return _stand_in_class(module, name)
+        if (module, name) in SAFE_PICKLE_GLOBALS: return super().find_class(module, name)
+        raise pickle.UnpicklingError(f"허용되지 않은 pickle 전역 객체: {module}.{name}")
+
+
+class DeferredProperties:
+    # 스트리밍 로드 때 건너뛴 <properties> 는 파일 안의 위치(바이트 오프셋)만 기억했다가 필요해지면 그 부분만 다시 읽음
+    # (ZIP 멤버면 압축을 푼 내용 안의 오프셋)
+    __slots__ = ("source", "start", "end")
+    def __init__(self, source, start, end):
+        self.source = source; self.start = start; self.end = end
+
+    def load(self):
+        _check_payload(self.end - self.start, "노드 속성")
+        try:
+            with open_submission(self.source) as f:
+                f.seek(self.start); fragment = f.read(self.end - self.start)
+            return ET.fromstring(fragment + b"</properties>")
+        except (OSError, ET.ParseError) + ZIP_ERRORS: return None
+
+
+class OwsWorkflow:
+    # .ows 파일 하나를 한 번만 훑어서 만든 색인. 노드/속성/링크 조회는 모두 dict/set 으로 O(1)
+    def __init__(self, root=None, source=None):
+        self.root = root; self.source = source
+        self.nodes = []
+        self.nodes_by_id = {}; self.nodes_by_name = {}; self.nodes_by_qualified_name = {}
+        self.properties_by_node_id = {}
+        self.links = set()      # (source_node_id, sink_node_id, source_channel, sink_channel), enabled 링크만
+        self.adjacency = {}     # source_node_id -> [링크 키, ...]
+        self._reachability = None
+        self._decoded_properties = {}; self._literal_settings = {}  # 노드별 디코딩 결과 (요청된 노드만)
+
+    @classmethod
+    def from_root(cls, root, source=None):
+        workflow = cls(root, source)
+        for section in root:
+            if section.tag == "nodes":
+                for node in section.findall('node'): workflow.add_node(node)
+            elif section.tag == "links":
+                for link in section.findall('link'): workflow.add_link(link.attrib)
+            elif section.tag == "node_properties":
+                for props_element in section.findall('properties'): workflow.add_properties(props_element)
+        return workflow
+
+    def add_node(self, node):
+        self.nodes.append(node)
+        node_id = node.get('id')
+        if node_id is not None: self.nodes_by_id.setdefault(node_id.strip(), node)
+        self.nodes_by_name.setdefault(node.get('name'), node)
+        self.nodes_by_qualified_name.setdefault(node.get('qualified_name'), node)
+
+    def add_link(self, attrib):
+        if attrib.get('enabled', 'true').lower() != 'true': return
+        # channel_id가 있으면 그것을 우선 사용, 없으면 channel 이름을 id 형식으로 바꿔서 사용
+        s_ch = attrib.get('source_channel_id'); t_ch = attrib.get('sink_channel_id')
+        if s_ch is None: s_ch = attrib.get('source_channel')
+        if t_ch is None: t_ch = attrib.get('sink_channel')
+        key = (attrib.get('source_node_id'), attrib.get('sink_node_id'), normalize_channel(s_ch), normalize_channel(t_ch))
+        if key not in self.links:
+            self.links.add(key); self.adjacency.setdefault(key[0], []).append(key); self._reachability = None
+
+    def add_properties(self, props_element, node_id=None):
+        # props_element 는 <properties> 엘리먼트 또는 DeferredProperties
+        if node_id is None: node_id = props_element.get('node_id')
+        self.properties_by_node_id.setdefault(node_id, props_element)
+
+    def node_by_id(self, node_id):
+        return self.nodes_by_id.get(node_id.strip()) if node_id is not None else None
+
+    def node_by_name(self, widget_name):
+        return self.nodes_by_name.get(widget_name)
+
+    def node_by_qualified_name(self, qualified_name):
+        return self.nodes_by_qualified_name.get(qualified_name)
+
+    def node_id(self, widget_name):
+        node = self.nodes_by_name.get(widget_name)
+        return node.get('id') if node is not None else None
+
+    def properties_element(self, node_id):
+        props_element = self.properties_by_node_id.get(node_id)
+        if isinstance(props_element, DeferredProperties):
+            props_element = props_element.load(); self.properties_by_node_id[node_id] = props_element
+        return props_element
+
+    def properties(self, node_id):
+        # pickle 속성은 처음 요청될 때 한 번만 디코딩, literal 속성은 원문 문자열 그대로
+        if node_id in self._decoded_properties: return self._decoded_properties[node_id]
+        properties_element = self.properties_element(node_id)
+        if properties_element is None: return None
+        prop_format = properties_element.get('format', 'literal'); prop_text = properties_element.text
+        if prop_format != "pickle" or not prop_text: return prop_text
+        decoded = decode_pickle_properties(prop_text)
+        self._decoded_properties[node_id] = decoded
+        return decoded
+
+    def settings(self, node_id):
+        # 형식과 상관없이 설정 dict (또는 해석 실패 시 None). literal 은 ast.literal_eval 결과를 노드별로 기억
+        properties_element = self.properties_element(node_id)
+        if properties_element is None: return None
+        if properties_element.get('format', 'literal') == "pickle": return self.properties(node_id)
+        if node_id not in self._literal_settings:
+            try: self._literal_settings[node_id] = ast.literal_eval(properties_element.text or "")
+            except (ValueError, SyntaxError, TypeError, RecursionError): self._literal_settings[node_id] = None
+        return self._literal_settings[node_id]
+
+    def has_link(self, source_node_id, sink_node_id, source_channel, sink_channel):
+        return (source_node_id, sink_node_id, normalize_channel(source_channel), normalize_channel(sink_channel)) in self.links
+
+    def reachability(self):
+        # 경로 질의용 색인. 처음 필요할 때 한 번 만듦
+        if self._reachability is None: self._reachability = ReachabilityIndex(self.nodes_by_id, self.links)
+        return self._reachability
+
+    def has_path(self, source_node_id, sink_node_id, source_channel=None, sink_channel=None):
+        return self.reachability().has_path(source_node_id, sink_node_id, source_channel, sink_channel)
+
+def as_workflow(xml_root):
+    # load_ows_file 결과(OwsWorkflow)는 그대로, ET.parse 로 직접 만든 루트 엘리먼트는 색인을 만들어서 반환
+    if xml_root is None or isinstance(xml_root, OwsWorkflow): return xml_root
+    return OwsWorkflow.from_root(xml_root)
+
+def load_ows_file(file_path, property_widgets=None):
+    # expat 으로 파일을 한 번 스트리밍하면서 노드/링크/속성을 바로 색인 (ElementTree 트리를 만들지 않음)
+    # property_widgets(위젯 이름 집합)가 주어지면 그 위젯들의 속성만 텍스트로 보관하고,
+    # 나머지 <properties> 는 내용을 버리고 바이트 오프셋만 기억 -> 큰 pickle/literal 덩어리가 메모리에 남지 않음
+    # file_path 는 "반.zip::멤버" 형태의 ZIP 멤버여도 됨 (압축을 풀면서 바로 파싱)
+    workflow = OwsWorkflow(source=file_path)
+    parser = expat.ParserCreate(); parser.buffer_text = True
+    stack = []
+    props_attrib = props_chunks = None; props_start = 0; props_saw_text = False; props_size = 0
+    limit = payload_limit()
+
+    def start_element(tag, attrib):
+        nonlocal props_attrib, props_chunks, props_start, props_saw_text, props_size
+        parent = stack[-1] if stack else None
+        stack.append(tag)
+        if tag == "node" and parent == "nodes": workflow.add_node(ET.Element(tag, attrib))
+        elif tag == "link" and parent == "links": workflow.add_link(attrib)
+        elif tag == "properties" and parent == "node_properties":
+            node = workflow.node_by_id(attrib.get('node_id'))
+            keep_text = property_widgets is None or (node is not None and node.get('name') in property_widgets)
+            props_attrib = attrib; props_chunks = [] if keep_text else None
+            props_start = parser.CurrentByteIndex; props_saw_text = False; props_size = 0
+
+    def end_element(tag):
+        nonlocal props_attrib, props_chunks
+        stack.pop()
+        if tag != "properties" or props_attrib is None: return
+        node_id = props_attrib.get('node_id')
+        if props_chunks is None and props_saw_text:
+            workflow.add_properties(DeferredProperties(file_path, props_start, parser.CurrentByteIndex), node_id)
+        else:
+            props_element = ET.Element(tag, props_attrib)
+            if props_chunks: props_element.text = "".join(props_chunks)
+            workflow.add_properties(props_element, node_id)
+        props_attrib = props_chunks = None
+
+    def character_data(data):
+        nonlocal props_saw_text, props_chunks, props_size
+        if props_attrib is None: return
+        props_saw_text = True
+        if props_chunks is None: return
+        props_size += len(data)
+        # 상한을 넘는 속성은 텍스트를 버리고 오프셋만 기억 (필요해서 읽으려 할 때 PayloadTooLarge)
+        if limit is not None and props_size > limit: props_chunks = None
+        else: props_chunks.append(data)
+
+    parser.StartElementHandler = start_element
+    parser.EndElementHandler = end_element
+    parser.CharacterDataHandler = character_data
+    try:
+        with open_submission(file_path) as f: parser.ParseFile(f)
     except FileNotFoundError: return None
-    except ET.ParseError: return None
+    except expat.ExpatError: return None
+    except ZIP_ERRORS: return None
+    return workflow
 
 def get_node_by_id(nodes_element_param, node_id_to_find):
     if nodes_element_param is None: return None
+    if isinstance(nodes_element_param, OwsWorkflow): return nodes_element_param.node_by_id(node_id_to_find)
     normalized_node_id_to_find = node_id_to_find.strip()
     for node_element in nodes_element_param.findall('node'):
         current_node_id_from_attr = node_element.get('id')
@@ -43,117 +271,156 @@ def get_node_by_id(nodes_element_param, node_id_to_find):
 
 def get_node_by_name(xml_root, widget_name_to_find):
     if xml_root is None: return None
-    nodes_element = None
-    for child_of_root in xml_root:
-        if child_of_root.tag == "nodes": nodes_element = child_of_root; break
-    if nodes_element is not None:
-        for node in nodes_element.findall('node'):
-            if node.get('name') == widget_name_to_find: return node
-    return None
+    return as_workflow(xml_root).node_by_name(widget_name_to_find)
+
+def get_node_by_qualified_name(xml_root, qualified_name_to_find):
+    if xml_root is None: return None
+    return as_workflow(xml_root).node_by_qualified_name(qualified_name_to_find)
 
 def decode_pickle_properties(pickled_string):
     if pickled_string:
-        try: decoded_base64 = base64.b64decode(pickled_string); return pickle.loads(decoded_base64)
+        _check_payload(len(pickled_string) * 3 // 4, "pickle 속성")
+        try: decoded_base64 = base64.b64decode(pickled_string); return RestrictedUnpickler(io.BytesIO(decoded_base64)).load()
+        except MemoryError: raise
         except Exception: return None
     return None
 
 def get_node_actual_properties_element(xml_root, node_id_to_find):
     if xml_root is None: return None
-    node_properties_section = xml_root.find('node_properties')
-    if node_properties_section is not None:
-        for props_element in node_properties_section.findall('properties'):
-            if props_element.get('node_id') == node_id_to_find: return props_element
-    return None
+    return as_workflow(xml_root).properties_element(node_id_to_find)
 
 def get_node_properties_obj(xml_root, node_id):
     if xml_root is None or node_id is None: return None
-    properties_element = get_node_actual_properties_element(xml_root, node_id)
-    if properties_element is not None:
-        prop_format = properties_element.get('format', 'literal'); prop_text = properties_element.text
-        if prop_format == "pickle" and prop_text: return decode_pickle_properties(prop_text)
-        else: return prop_text
-    return None
+    return as_workflow(xml_root).properties(node_id)
+
+def get_node_settings(xml_root, node_id):
+    if xml_root is None or node_id is None: return None
+    return as_workflow(xml_root).settings(node_id)
 
 def check_link_exists(xml_root, source_node_id_to_find, sink_node_id_to_find, source_channel_val_to_find, sink_channel_val_to_find):
     # print(f"  [Link Check] 찾기: {source_node_id_to_find}({source_channel_val_to_find}) -> {sink_node_id_to_find}({sink_channel_val_to_find})")
     if xml_root is None: return False
-    links_element = xml_root.find('links')
-    if links_element is None: return False
-
-    for link_element in links_element.findall('link'):
-        if link_element.get('enabled', 'true').lower() == 'true':
-            s_node_ok = link_element.get('source_node_id') == source_node_id_to_find
-            t_node_ok = link_element.get('sink_node_id') == sink_node_id_to_find
-
-            xml_s_ch_id = link_element.get('source_channel_id')
-            xml_s_ch_name = link_element.get('source_channel') # Name for fallback
-            xml_t_ch_id = link_element.get('sink_channel_id')
-            xml_t_ch_name = link_element.get('sink_channel')   # Name for fallback
-            
-            # channel_id가 있으면 그것을 우선 사용, 없으면 channel 이름 사용
-            s_channel_ok = (xml_s_ch_id == source_channel_val_to_find) or \
-                           (xml_s_ch_id is None and xml_s_ch == source_channel_val_to_find)
-            t_channel_ok = (xml_t_ch_id == sink_channel_val_to_find) or \
-                           (xml_t_ch_id is None and xml_t_ch == sink_channel_val_to_find)
-            
-            # 디버깅 로그 (필요시 주석 해제하여 상세 비교)
-            # current_s_ch_to_log = xml_s_ch_id if xml_s_ch_id is not None else xml_s_ch_name
-            # current_t_ch_to_log = xml_t_ch_id if xml_t_ch_id is not None else xml_t_ch_name
-            # print(f"    [Link Check {link_element.get('id')}] XML: src_id='{link_element.get('source_node_id')}', sink_id='{link_element.get('sink_node_id')}', actual_src_ch='{current_s_ch_to_log}', actual_sink_ch='{current_t_ch_to_log}'")
-            # print(f"                찾는 값: src_id='{source_node_id_to_find}', sink_id='{sink_node_id_to_find}', src_ch_val='{source_channel_val_to_find}', sink_ch_val='{sink_channel_val_to_find}'")
-            # print(f"                조건 결과: s_node_ok={s_node_ok}, t_node_ok={t_node_ok}, s_channel_ok={s_channel_ok}, t_channel_ok={t_channel_ok}")
-
-            if s_node_ok and t_node_ok and s_channel_ok and t_channel_ok:
-                return True
-    return False
+    return as_workflow(xml_root).has_link(source_node_id_to_find, sink_node_id_to_find, source_channel_val_to_find, sink_channel_val_to_find)
+
+def check_path_exists(xml_root, source_node_id, sink_node_id, source_channel=None, sink_channel=None):
+    # check_link_exists 와 같지만 중간에 다른 위젯(Select Columns, Impute 등)을 거쳐도 됨
+    # source_channel: source 에서 나가는 첫 링크의 채널, sink_channel: sink 로 들어오는 마지막 링크의 채널 (None 이면 아무 채널)
+    if xml_root is None: return False
+    return as_workflow(xml_root).has_path(source_node_id, sink_node_id, source_channel, sink_channel)
 
 def parse_filename(ows_filename):
     base_name = os.path.splitext(ows_filename)[0]; parts = base_name.split(" ", 1)
     student_id = parts[0]; student_name = parts[1] if len(parts) > 1 else ""
     return student_id, student_name
 
-def get_data_summary_from_url(data_url):
-    if not data_url: return "데이터 URL 또는 경로 없음"
-    if not ORANGE_AVAILABLE_PARSER:
-        return f"데이터 요약 불가 (Orange 라이브러리 로드 실패 - URL: {data_url[:30]}...)"
-    summary_lines = []
+def parse_submission_name(file_path):
+    # 제출물 경로 -> (학번, 이름). ZIP 멤버면 LMS 가 붙인 접두어/폴더까지 고려해서 해석
+    _, member = split_member_path(file_path)
+    if member is not None: return parse_member_name(member)
+    return parse_filename(os.path.basename(file_path))
+
+def get_file_widget_source(file_properties):
+    # File 위젯 설정에서 불러올 데이터 소스를 고름: url -> recent_urls 의 첫 http 주소 -> recent_paths 의 첫 경로
+    # (불러올 소스, 요약에 표시할 이름) 반환. 없으면 (None, "N/A")
+    if not isinstance(file_properties, dict): return None, "N/A"
+    if 'url' in file_properties and isinstance(file_properties['url'], str) and file_properties['url'].strip().startswith('http'):
+        source = file_properties['url'].strip()
+        return source, source
+    if 'recent_urls' in file_properties and isinstance(file_properties['recent_urls'], list) and file_properties['recent_urls']:
+        for url_candidate in file_properties['recent_urls']:
+            if isinstance(url_candidate, str) and url_candidate.strip().lower().startswith('http'):
+                source = url_candidate.strip()
+                return source, source
+    if 'recent_paths' in file_properties and \
+       isinstance(file_properties['recent_paths'], list) and file_properties['recent_paths']:
+        first_path_obj = file_properties['recent_paths'][0]
+        path_str = None
+        if hasattr(first_path_obj, 'abspath') and isinstance(first_path_obj.abspath, str): path_str = first_path_obj.abspath.strip()
+        elif isinstance(first_path_obj, str): path_str = first_path_obj.strip()
+        if path_str: return path_str, f"Local: {os.path.basename(path_str)}"
+    return None, "N/A"
+
+def summarize_table(data_table):
+    # Orange Table 에서 채점/요약에 필요한 부분만 뽑은 JSON 직렬화 가능한 dict
+    domain = data_table.domain
+    attributes_list = list(domain.attributes) if domain.attributes is not None else []
+    class_vars_list = []
+    if domain.class_var: class_vars_list = [domain.class_var]
+    elif domain.class_vars: class_vars_list = list(domain.class_vars)
+    class_vars = []
+    for cv in class_vars_list[:1]:
+        if cv is None or not hasattr(cv, 'name'): continue
+        if hasattr(cv, 'is_discrete') and cv.is_discrete and hasattr(cv, 'values'): cv_values_str = str(cv.values)
+        elif hasattr(cv, 'is_continuous') and cv.is_continuous: cv_values_str = "연속형"
+        else: cv_values_str = "타입 불명확"
+        class_vars.append([cv.name, type(cv).__name__, cv_values_str])
+    variables = domain.variables if domain.variables is not None else ()
+    return {"n_rows": len(data_table), "n_variables": len(variables),
+            "n_attributes": len(attributes_list), "attributes": [[attr.name, type(attr).__name__] for attr in attributes_list[:3]],
+            "n_class_vars": len(class_vars_list), "class_vars": class_vars, "error": None}
+
+def _fetch_error_summary(data_url, error):
+    if "drive.google.com" in data_url:
+        return {"error": f"데이터 로드 실패 (URL: {data_url[:30]}...). 구글 드라이브 직접 로드 실패 또는 접근 권한 문제일 수 있습니다. ({error})"}
+    return {"error": f"데이터 다운로드 실패 (URL: {data_url[:30]}...): {error}"}
+
+def _load_summary_with_orange(data_url):
     try:
-        data_table = Table(data_url)
+        Table = get_orange_table_class()
+        # 원격 데이터는 공유 다운로드 계층(동시 다운로드, 중복 제거, 타임아웃)을 거쳐 로컬 파일로 읽음
+        local_source = get_dataset_fetcher().local_path(data_url) if is_remote_source(data_url) else data_url
+        data_table = Table(local_source)
         if data_table.domain is None:
-            return f"데이터 로드 성공했으나 도메인 정보 없음 (URL: {data_url[:30]}...)"
-
-        domain = data_table.domain
-        summary_lines.append(f"총 {len(data_table)}개 행")
-        
-        attributes_list = domain.attributes if domain.attributes is not None else []
-        attributes_info = [f"{attr.name}({type(attr).__name__})" for i, attr in enumerate(attributes_list) if i < 3 or (i == 2 and len(attributes_list) > 3)]
-        if len(attributes_list) > 3 and attributes_info and not attributes_info[-1].endswith("..."): attributes_info[-1] += ",..."
-        summary_lines.append(f"특성({len(attributes_list)}개): {', '.join(attributes_info) if attributes_info else '없음'}")
-        
-        class_vars_list = []
-        if domain.class_var: class_vars_list = [domain.class_var]
-        elif domain.class_vars: class_vars_list = domain.class_vars if domain.class_vars is not None else []
-        
-        class_vars_info = []
-        for i, cv in enumerate(class_vars_list):
-            if cv is not None and hasattr(cv, 'name'):
-                cv_values_str = ""
-                if hasattr(cv, 'is_discrete') and cv.is_discrete and hasattr(cv, 'values'): cv_values_str = str(cv.values)
-                elif hasattr(cv, 'is_continuous') and cv.is_continuous: cv_values_str = "연속형"
-                else: cv_values_str = "타입 불명확"
-                class_vars_info.append(f"{cv.name}({type(cv).__name__}, 값: {cv_values_str})")
-                if i >= 0 and len(class_vars_list) > 1: class_vars_info.append("..."); break
-        summary_lines.append(f"클래스({len(class_vars_list)}개): {', '.join(class_vars_info) if class_vars_info else '없음'}")
-        
-        return " | ".join(summary_lines)
+            return {"error": f"데이터 로드 성공했으나 도메인 정보 없음 (URL: {data_url[:30]}...)"}
+        return summarize_table(data_table)
     except ImportError:
-        return f"데이터 요약 불가 (Orange3 라이브러리 또는 의존성 문제 - URL: {data_url[:30]}...)"
+        return {"error": f"데이터 요약 불가 (Orange3 라이브러리 또는 의존성 문제 - URL: {data_url[:30]}...)"}
+    except FetchError as e:
+        return _fetch_error_summary(data_url, e)
+    except MemoryError: raise
     except Exception as e:
         error_message = str(e)
         if "Cannot determine data type from URL" in error_message or \
            ("drive.google.com" in data_url and ("richiede l'autenticazione" in error_message.lower() or "requires authentication" in error_message.lower())): #이탈리아어, 영어 오류 메시지
-            return f"데이터 로드 실패 (URL: {data_url[:30]}...). 구글 드라이브 직접 로드 실패 또는 접근 권한 문제일 수 있습니다."
-        return f"데이터 로드/분석 오류: {error_message[:100]}"
+            return {"error": f"데이터 로드 실패 (URL: {data_url[:30]}...). 구글 드라이브 직접 로드 실패 또는 접근 권한 문제일 수 있습니다."}
+        return {"error": f"데이터 로드/분석 오류: {error_message[:100]}"}
+
+def _load_summary(data_url):
+    # csv/tab/tsv/xlsx 는 헤더와 줄 수만 읽는 가벼운 탐색으로 요약 (Table 을 만들지 않음, Orange 없어도 됨)
+    # 탐색으로 알 수 없는 형식이나 파일만 Orange Table 로 전부 읽음
+    if is_remote_source(data_url):
+        try: local_source = get_dataset_fetcher().local_path(data_url)
+        except FetchError as e: return _fetch_error_summary(data_url, e)
+    else: local_source = data_url
+    summary = probe_dataset(local_source)
+    if summary is not None: return summary
+    if not ORANGE_AVAILABLE_PARSER:
+        return {"error": f"데이터 요약 불가 (Orange 라이브러리 로드 실패 - URL: {data_url[:30]}...)"}
+    return _load_summary_with_orange(data_url)
+
+def load_data_summary(data_url, cache=None):
+    # 같은 URL/파일(로컬은 mtime, 크기까지 같을 때)은 실행 중 한 번만 읽고, 워커들끼리 디스크 캐시로 공유
+    if not data_url: return {"error": "데이터 URL 또는 경로 없음"}
+    if cache is None: cache = get_dataset_cache()
+    return cache.get_or_load(data_url, _load_summary)
+
+def is_valid_data_summary(summary):
+    return isinstance(summary, dict) and summary.get("error") is None and \
+           summary.get("n_rows", 0) > 0 and summary.get("n_variables", 0) > 0
+
+def format_data_summary(summary):
+    if summary.get("error") is not None: return summary["error"]
+    summary_lines = [f"총 {summary['n_rows']}개 행"]
+    attributes_info = [f"{name}({type_name})" for name, type_name in summary["attributes"]]
+    if summary["n_attributes"] > 3 and attributes_info: attributes_info[-1] += ",..."
+    summary_lines.append(f"특성({summary['n_attributes']}개): {', '.join(attributes_info) if attributes_info else '없음'}")
+    class_vars_info = [f"{name}({type_name}, 값: {values_str})" for name, type_name, values_str in summary["class_vars"]]
+    if summary["n_class_vars"] > 1 and class_vars_info: class_vars_info.append("...")
+    summary_lines.append(f"클래스({summary['n_class_vars']}개): {', '.join(class_vars_info) if class_vars_info else '없음'}")
+    return " | ".join(summary_lines)
+
+def get_data_summary_from_url(data_url):
+    return format_data_summary(load_data_summary(data_url))
 
 if __name__ == '__main__':
     pass
\ No newline at end of file
@@ -0,0 +1,209 @@
+# profiling.py
+
+import os
+import sys
+import json
+import time
+import fnmatch
+import cProfile
+import functools
+import contextlib
+import tracemalloc
+
+import ows_parser
+import rubric_engine
+import result_store
+import workflow_executor
+import grading_criteria_checks
+from dataset_cache import get_dataset_cache
+
+# 측정할 함수들. 다른 모듈이 from import 로 가져간 같은 함수도 함께 바꿔치기함
+PARSER_FUNCTIONS = ["load_ows_file", "get_node_by_id", "get_node_by_name", "get_node_by_qualified_name", "decode_pickle_properties",
+                    "get_node_actual_properties_element", "get_node_properties_obj", "get_node_settings", "check_link_exists",
+                    "get_file_widget_source", "load_data_summary", "get_data_summary_from_url", "_load_summary_with_orange"]
+PATCHED_MODULES = ["ows_parser", "grading_criteria_checks", "rubric_engine", "result_store", "batch_grading"]
+SUBMISSION = "grade_submission"
+
+
+def _properties_cached(workflow, node_id):
+    # 이미 디코딩한 pickle 속성이면 적중, 아직이면 실패, literal 속성이면 캐시 대상이 아니므로 None
+    if node_id in workflow._decoded_properties: return True
+    element = workflow.properties_by_node_id.get(node_id)
+    if isinstance(element, ows_parser.DeferredProperties): return False
+    return False if element is not None and element.get('format') == "pickle" else None
+
+def _settings_cached(workflow, node_id):
+    return node_id in workflow._literal_settings or node_id in workflow._decoded_properties
+
+
+class Profiler:
+    # 채점 함수들을 감싸서 호출 횟수, 누적/최대 시간(하위 호출 포함), 최대 메모리, 캐시 적중을 제출물 단위로 모음
+    # memory=True 이면 tracemalloc 으로 호출마다 최대 메모리 증가량도 잼 (느려짐)
+    def __init__(self, memory=False, dump_pattern=None, dump_tool="cprofile", dump_dir="profiles"):
+        self.memory = memory; self.dump_pattern = dump_pattern; self.dump_tool = dump_tool; self.dump_dir = dump_dir
+        self._stats = {}; self._caches = {}; self._frames = []
+        self.installed = False
+
+    def install(self, namespaces=()):
+        # namespaces: 함께 바꿀 전역 dict (스크립트로 실행된 batch_grading 은 __main__, spawn 워커에서는 runpy 가 만든
+        # 별도 dict 를 전역으로 쓰기 때문에 sys.modules 로는 닿지 않음)
+        if self.installed: return
+        wrappers = {}
+        for name in PARSER_FUNCTIONS:
+            original = getattr(ows_parser, name)
+            wrappers[id(original)] = self.wrap(f"ows_parser.{name}", original)
+        for criterion_id, _, check in grading_criteria_checks.CRITERIA:
+            wrappers[id(check)] = self.wrap(f"criterion {criterion_id}", check)
+        wrappers[id(result_store.hash_file)] = self.wrap("result_store.hash_file", result_store.hash_file)
+        wrappers[id(workflow_executor.recompute_scores)] = self.wrap("workflow_executor.recompute_scores", workflow_executor.recompute_scores)
+        namespaces = [vars(sys.modules[name]) for name in PATCHED_MODULES if name in sys.modules] + list(namespaces)
+        for namespace in namespaces:
+            for attr, value in list(namespace.items()):
+                if id(value) in wrappers: namespace[attr] = wrappers[id(value)]
+        # check is check_criterion_1_2 같은 비교가 그대로 맞도록 목록에도 같은 래퍼를 넣음
+        grading_criteria_checks.CRITERIA[:] = [(c, label, wrappers[id(check)]) for c, label, check in grading_criteria_checks.CRITERIA]
+
+        workflow = ows_parser.OwsWorkflow
+        workflow.properties_element = self.wrap("OwsWorkflow.properties_element", workflow.properties_element)
+        workflow.properties = self.wrap("OwsWorkflow.properties", workflow.properties, cache=("pickle 속성 디코딩", _properties_cached))
+        workflow.settings = self.wrap("OwsWorkflow.settings", workflow.settings, cache=("설정 해석", _settings_cached))
+        plan = rubric_engine.RubricPlan
+        plan.collect = self.wrap("RubricPlan.collect", plan.collect)
+        evaluate_criterion = plan._evaluate_criterion
+        def _evaluate_criterion(plan_self, criterion, facts):
+            frame = self._enter(); started = time.perf_counter()
+            try: return evaluate_criterion(plan_self, criterion, facts)
+            finally: self._exit(f"rubric {criterion['id']}", frame, time.perf_counter() - started)
+        plan._evaluate_criterion = _evaluate_criterion
+        store = result_store.ResultStore
+        store.lookup = self.wrap("ResultStore.lookup", store.lookup)
+        store.save = self.wrap("ResultStore.save", store.save)
+        if self.memory and not tracemalloc.is_tracing(): tracemalloc.start()
+        self.installed = True
+
+    def wrap(self, name, func, cache=None):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if cache is not None:
+                counts = self._caches.setdefault(cache[0], {"hits": 0, "misses": 0})
+                hit = cache[1](*args, **kwargs)
+                if hit is not None: counts["hits" if hit else "misses"] += 1
+            frame = self._enter(); started = time.perf_counter()
+            try: return func(*args, **kwargs)
+            finally: self._exit(name, frame, time.perf_counter() - started)
+        return wrapper
+
+    def _enter(self):
+        # 하위 호출이 tracemalloc 최대치를 초기화하기 전에 지금까지의 최대치를 상위 프레임에 넘겨 둠
+        if not (self.memory and tracemalloc.is_tracing()): return None
+        current, peak = tracemalloc.get_traced_memory()
+        if self._frames: self._frames[-1][1] = max(self._frames[-1][1], peak)
+        tracemalloc.reset_peak()
+        frame = [current, current]; self._frames.append(frame)
+        return frame
+
+    def _exit(self, name, frame, elapsed_s):
+        stat = self._stats.get(name)
+        if stat is None: stat = self._stats[name] = {"calls": 0, "total_ms": 0.0, "max_ms": 0.0, "peak_bytes": 0}
+        elapsed_ms = elapsed_s * 1000
+        stat["calls"] += 1; stat["total_ms"] += elapsed_ms; stat["max_ms"] = max(stat["max_ms"], elapsed_ms)
+        if frame is None: return
+        peak = max(tracemalloc.get_traced_memory()[1], frame[1])
+        if self._frames and self._frames[-1] is frame: self._frames.pop()
+        if self._frames: self._frames[-1][1] = max(self._frames[-1][1], peak)
+        stat["peak_bytes"] = max(stat["peak_bytes"], peak - frame[0])
+
+    def _dump_path(self, file_path):
+        if not self.dump_pattern or not fnmatch.fnmatch(os.path.basename(file_path), self.dump_pattern): return None
+        os.makedirs(self.dump_dir, exist_ok=True)
+        stem = os.path.splitext(os.path.basename(file_path))[0]
+        return os.path.join(self.dump_dir, stem + (".html" if self.dump_tool == "pyinstrument" else ".prof"))
+
+    @contextlib.contextmanager
+    def submission(self, file_path):
+        # 제출물 하나를 채점하는 동안의 측정값을 trace(dict)에 채움. 지정한 파일은 cProfile/pyinstrument 결과도 저장
+        self._stats = {}; self._caches = {}; self._frames = []
+        dataset_cache = get_dataset_cache(); hits, misses = dataset_cache.hits, dataset_cache.misses
+        node_memo = workflow_executor.get_node_memo(); node_hits, node_misses = node_memo.hits, node_memo.misses
+        trace = {"file": file_path}
+        dump_path = self._dump_path(file_path); sampler = None
+        if dump_path and self.dump_tool == "pyinstrument":
+            from pyinstrument import Profiler as PyinstrumentProfiler
+            sampler = PyinstrumentProfiler(); sampler.start()
+        elif dump_path: sampler = cProfile.Profile(); sampler.enable()
+        frame = self._enter(); started = time.perf_counter()
+        try: yield trace
+        finally:
+            elapsed_s = time.perf_counter() - started
+            if isinstance(sampler, cProfile.Profile): sampler.disable(); sampler.dump_stats(dump_path)
+            elif sampler is not None:
+                sampler.stop()
+                with open(dump_path, "w", encoding="utf-8") as f: f.write(sampler.output_html())
+            self._exit(SUBMISSION, frame, elapsed_s)
+            self._caches["데이터셋 요약"] = {"hits": dataset_cache.hits - hits, "misses": dataset_cache.misses - misses}
+            if node_memo.hits != node_hits or node_memo.misses != node_misses:
+                self._caches["노드 실행 memo"] = {"hits": node_memo.hits - node_hits, "misses": node_memo.misses - node_misses}
+            trace.update(elapsed_ms=round(elapsed_s * 1000, 3),
+                         peak_bytes=self._stats[SUBMISSION]["peak_bytes"] if self.memory else None,
+                         functions={name: stat for name, stat in self._stats.items() if name != SUBMISSION},
+                         caches=self._caches)
+            if dump_path: trace["dump"] = dump_path
+
+
+_profiler = None
+
+def get_profiler(options, namespace=None):
+    # options: {"memory": bool, "dump_pattern": str, "dump_tool": str, "dump_dir": str}. 워커 프로세스마다 한 번 설치
+    global _profiler
+    if _profiler is None:
+        _profiler = Profiler(**options); _profiler.install([namespace] if namespace is not None else ())
+    return _profiler
+
+
+class ProfileReport:
+    # 워커가 보낸 제출물별 trace 를 JSONL 로 기록하고, 실행 전체 요약(느린 기준/함수/제출물, 캐시 적중률)을 모음
+    def __init__(self, trace_path=None):
+        self._file = open(trace_path, "w", encoding="utf-8") if trace_path else None
+        self.functions = {}; self.caches = {}; self.submissions = []
+
+    def add(self, trace):
+        if self._file is not None:
+            self._file.write(json.dumps(trace, ensure_ascii=False) + "\n"); self._file.flush()
+        self.submissions.append((trace.get("elapsed_ms") or 0.0, trace.get("peak_bytes"), trace.get("file", ""), trace.get("status", "")))
+        for name, stat in trace.get("functions", {}).items():
+            total = self.functions.setdefault(name, {"calls": 0, "total_ms": 0.0, "max_ms": 0.0, "peak_bytes": 0})
+            total["calls"] += stat["calls"]; total["total_ms"] += stat["total_ms"]
+            total["max_ms"] = max(total["max_ms"], stat["max_ms"]); total["peak_bytes"] = max(total["peak_bytes"], stat["peak_bytes"])
+        for name, counts in trace.get("caches", {}).items():
+            total = self.caches.setdefault(name, {"hits": 0, "misses": 0})
+            total["hits"] += counts["hits"]; total["misses"] += counts["misses"]
+
+    def print_summary(self, top=10):
+        print(f"\n=== 프로파일 요약 (제출물 {len(self.submissions)}개, 시간은 하위 호출 포함) ===")
+        for title, criteria in (("느린 채점 기준", True), ("느린 파서/보조 함수", False)):
+            rows = [(name, stat) for name, stat in self.functions.items() if name.startswith(("criterion ", "rubric ")) == criteria]
+            rows.sort(key=lambda item: item[1]["total_ms"], reverse=True)
+            print(f"\n[{title}]")
+            print(f"  {'이름':<44} {'호출':>7} {'누적 ms':>11} {'평균 ms':>9} {'최대 ms':>9} {'최대 메모리':>11}")
+            for name, stat in rows[:top]:
+                print(f"  {name:<44} {stat['calls']:>7} {stat['total_ms']:>11.2f} {stat['total_ms'] / stat['calls']:>9.3f} "
+                      f"{stat['max_ms']:>9.2f} {_format_bytes(stat['peak_bytes']):>11}")
+        print("\n[느린 제출물]")
+        for elapsed_ms, peak_bytes, file_path, status in sorted(self.submissions, reverse=True, key=lambda s: s[0])[:top]:
+            peak = f", 최대 메모리 {_format_bytes(peak_bytes)}" if peak_bytes is not None else ""
+            print(f"  {elapsed_ms:>9.2f} ms{peak}  {os.path.basename(file_path)} ({status})")
+        if self.caches:
+            print("\n[캐시 적중]")
+            for name, counts in self.caches.items():
+                total = counts["hits"] + counts["misses"]
+                rate = f"{counts['hits'] / total:.0%}" if total else "-"
+                print(f"  {name}: 적중 {counts['hits']} / 실패 {counts['misses']} ({rate})")
+
+    def close(self):
+        if self._file is not None: self._file.close()
+
+def _format_bytes(n):
+    if not n: return "-"
+    for unit in ("B", "KB", "MB", "GB"):
+        if n < 1024 or unit == "GB": return f"{n:.1f} {unit}"
+        n /= 1024
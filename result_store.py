@@ -0,0 +1,107 @@
+# result_store.py
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+
+from dataset_cache import default_cache_dir, source_identity
+from ows_parser import get_file_widget_source
+from grading_criteria_checks import CRITERIA, CRITERIA_VERSION
+from zip_ingest import open_submission
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    file_hash TEXT NOT NULL,
+    criterion_key TEXT NOT NULL,
+    criterion_id TEXT NOT NULL,
+    value TEXT NOT NULL,
+    data_summary TEXT,
+    data_source TEXT,
+    source_identity TEXT,
+    graded_at REAL NOT NULL,
+    PRIMARY KEY (file_hash, criterion_key)
+)
+"""
+
+
+def hash_file(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open_submission(path) as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""): digest.update(chunk)
+    return digest.hexdigest()
+
+def _digest(obj):
+    return hashlib.sha256(json.dumps(obj, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")).hexdigest()
+
+def criterion_cache_keys(rubric=None, ca_threshold=0.0, recompute=False):
+    # 기준 ID -> 캐시 키. 기준의 정의(루브릭이면 기준 dict 전체, 기본 기준이면 CRITERIA_VERSION)와
+    # 판정에 쓰이는 매개변수가 같을 때만 같은 키가 됨 -> 임계값 하나를 바꾸면 그 기준만 다시 채점
+    # recompute(점수를 다시 실행해서 구함)는 켰을 때만 키에 넣음 (끈 상태의 기존 키는 그대로)
+    if rubric is None:
+        def params(criterion_id):
+            if criterion_id != "5-1": return {}
+            return dict({"ca_threshold": ca_threshold}, **({"recompute": True} if recompute else {}))
+        return {criterion_id: _digest({"builtin": CRITERIA_VERSION, "id": criterion_id, "params": params(criterion_id)})
+                for criterion_id, _, _ in CRITERIA}
+    return {str(criterion["id"]): _digest(dict({"rubric_version": rubric.get("version", 0), "criterion": criterion},
+                                               **({"recompute": True} if recompute and criterion.get("type") == "score" else {})))
+            for criterion in rubric["criteria"]}
+
+def score_cache_key(metric="CA", recompute=False):
+    # 결과 행에 함께 남기는 점수(기준이 아님)의 캐시 키. 기준과 같은 표에 "score:CA" 같은 ID 로 저장
+    return _digest(dict({"builtin": CRITERIA_VERSION, "score": metric}, **({"recompute": True} if recompute else {})))
+
+def data_source_of(workflow, widget):
+    # 데이터 기준이 불러온 소스 (캐시된 결과가 아직 유효한지 확인하는 데 사용)
+    node_id = workflow.node_id(widget)
+    source, _ = get_file_widget_source(workflow.properties(node_id) if node_id else None)
+    return source
+
+
+class ResultStore:
+    # (제출물 내용 해시, 기준 캐시 키) -> 판정 결과. 여러 워커 프로세스가 같은 SQLite 파일을 함께 씀 (WAL)
+    def __init__(self, db_path=None):
+        self.db_path = db_path or os.path.join(default_cache_dir(), "results.sqlite")
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        self._conn = sqlite3.connect(self.db_path, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(SCHEMA); self._conn.commit()
+
+    def lookup(self, file_hash, keys):
+        # keys: {기준 ID: 캐시 키}. 찾은 것만 {기준 ID: (값, 데이터 요약)} 으로 반환
+        # 데이터 기준은 데이터 소스(로컬 파일의 mtime/크기 포함)가 그대로일 때만 유효
+        if not keys: return {}
+        ids_by_key = {key: criterion_id for criterion_id, key in keys.items()}
+        placeholders = ",".join("?" * len(ids_by_key))
+        rows = self._conn.execute(
+            f"SELECT criterion_key, value, data_summary, data_source, source_identity FROM results "
+            f"WHERE file_hash = ? AND criterion_key IN ({placeholders})", [file_hash, *ids_by_key]).fetchall()
+        found = {}
+        for criterion_key, value, data_summary, data_source, identity in rows:
+            if data_source is not None and source_identity(data_source) != identity: continue
+            found[ids_by_key[criterion_key]] = (json.loads(value), data_summary)
+        return found
+
+    def save(self, file_hash, entries):
+        # entries: [(기준 ID, 캐시 키, 값, 데이터 요약 또는 None, 데이터 소스 또는 None), ...]
+        now = time.time()
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [(file_hash, key, criterion_id, json.dumps(value), data_summary, data_source,
+              source_identity(data_source) if data_source else None, now)
+             for criterion_id, key, value, data_summary, data_source in entries])
+        self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+
+_open_stores = {}
+
+def get_result_store(db_path=None):
+    # 워커 프로세스마다 DB 연결을 하나만 열어 재사용
+    store = _open_stores.get(db_path)
+    if store is None: store = _open_stores[db_path] = ResultStore(db_path)
+    return store
@@ -0,0 +1,217 @@
+# rubric_engine.py
+
+import os
+import json
+
+from ows_parser import PayloadTooLarge, get_file_widget_source, load_data_summary, format_data_summary, is_valid_data_summary
+from grading_criteria_checks import get_saved_score
+from workflow_executor import recompute_scores
+
+CRITERION_TYPES = ("widget", "setting", "link", "dataset", "score")
+PREDICATE_OPS = ("eq", "ne", "gt", "ge", "lt", "le", "in", "contains", "exists")
+LINK_MODES = ("direct", "path")  # path: 중간에 다른 위젯을 거쳐도 source 채널 -> sink 채널로 이어지면 인정
+DEFAULT_RUBRIC_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "rubrics", "default_rubric.json")
+
+
+class RubricError(ValueError):
+    pass
+
+
+def load_rubric(path=DEFAULT_RUBRIC_PATH):
+    # .json 또는 .yaml/.yml 루브릭 파일을 dict 로 읽음
+    with open(path, encoding="utf-8") as f:
+        if path.lower().endswith((".yaml", ".yml")):
+            try: import yaml
+            except ImportError: raise RubricError("YAML 루브릭을 읽으려면 PyYAML 이 필요합니다.")
+            return yaml.safe_load(f)
+        return json.load(f)
+
+def _require(criterion, key):
+    if key not in criterion: raise RubricError(f"기준 {criterion.get('id', '?')}: '{key}' 항목이 없습니다.")
+    return criterion[key]
+
+def _match(actual, expected):
+    # dict 는 부분 일치(expected 의 키만 비교), list 는 tuple/list 와 원소별 일치, 나머지는 ==
+    if isinstance(expected, dict):
+        return isinstance(actual, dict) and all(k in actual and _match(actual[k], v) for k, v in expected.items())
+    if isinstance(expected, list):
+        return isinstance(actual, (list, tuple)) and len(actual) == len(expected) and \
+               all(_match(a, e) for a, e in zip(actual, expected))
+    return actual == expected
+
+_MISSING = object()
+
+def _lookup_path(settings, path):
+    value = settings
+    for key in path:
+        if isinstance(value, dict) and key in value: value = value[key]
+        elif isinstance(value, (list, tuple)) and isinstance(key, int) and -len(value) <= key < len(value): value = value[key]
+        else: return _MISSING
+    return value
+
+def evaluate_predicate(settings, predicate):
+    value = _lookup_path(settings, predicate.get("path", []))
+    op = predicate.get("op", "eq"); expected = predicate.get("value")
+    if op == "exists": return value is not _MISSING
+    if value is _MISSING: return False
+    try:
+        if op == "eq": return _match(value, expected)
+        if op == "ne": return not _match(value, expected)
+        if op == "gt": return value > expected
+        if op == "ge": return value >= expected
+        if op == "lt": return value < expected
+        if op == "le": return value <= expected
+        if op == "in": return any(_match(value, e) for e in expected)
+        if op == "contains": return isinstance(value, (list, tuple, set)) and any(_match(item, expected) for item in value)
+    except TypeError: return False
+    raise RubricError(f"알 수 없는 조건 연산자: {op}")
+
+
+class RubricPlan:
+    # 루브릭을 한 번 컴파일해서, 여러 기준이 공유하는 위젯 조회/속성 디코딩/링크 확인을 한 번씩만 수행하는 실행 계획
+    def __init__(self, rubric):
+        self.rubric = rubric
+        self.name = rubric.get("name", ""); self.version = rubric.get("version", 0)
+        self.criteria = []
+        self.data_criteria = {}         # 데이터셋을 불러오는 기준 ID -> 데이터 소스 위젯
+        self.widgets = set()            # 이름으로 노드 ID 를 찾을 위젯
+        self.property_widgets = set()   # 설정을 디코딩할 위젯 (스트리밍 로더에도 전달)
+        self.link_probes = set()        # (source 위젯, sink 위젯, source 채널, sink 채널, 연결 방식)
+        self.dataset_widgets = set()
+        seen_ids = set()
+        for criterion in _require(rubric, "criteria"):
+            criterion_id = str(_require(criterion, "id"))
+            if criterion_id in seen_ids: raise RubricError(f"기준 ID 중복: {criterion_id}")
+            seen_ids.add(criterion_id)
+            self.criteria.append(self._compile(criterion_id, criterion))
+
+    @property
+    def criterion_ids(self):
+        return [c["id"] for c in self.criteria]
+
+    def subset(self, criterion_ids):
+        # 일부 기준만 담은 계획 (바뀐 기준만 다시 채점할 때 필요한 조회만 수행)
+        criterion_ids = set(criterion_ids)
+        return RubricPlan(dict(self.rubric, criteria=[c for c in self.rubric["criteria"] if str(c["id"]) in criterion_ids]))
+
+    def _compile(self, criterion_id, criterion):
+        kind = _require(criterion, "type")
+        compiled = {"id": criterion_id, "label": criterion.get("label", ""), "type": kind}
+        if kind == "widget":
+            compiled["widget"] = _require(criterion, "widget"); self.widgets.add(compiled["widget"])
+        elif kind in ("setting", "dataset", "score"):
+            compiled["widget"] = _require(criterion, "widget")
+            self.widgets.add(compiled["widget"]); self.property_widgets.add(compiled["widget"])
+            if kind == "setting":
+                compiled["predicates"] = list(_require(criterion, "predicates"))
+                for predicate in compiled["predicates"]:
+                    if predicate.get("op", "eq") not in PREDICATE_OPS: raise RubricError(f"기준 {criterion_id}: 알 수 없는 연산자 {predicate.get('op')}")
+            elif kind == "dataset":
+                self.dataset_widgets.add(compiled["widget"]); self.data_criteria[criterion_id] = compiled["widget"]
+            else:
+                compiled["metric"] = criterion.get("metric", "CA"); compiled["threshold"] = float(criterion.get("threshold", 0.0))
+                # recompute: 저장된 score_table 대신 워크플로를 다시 실행해서 지표를 구함 (안 되면 저장된 값)
+                compiled["recompute"] = bool(criterion.get("recompute", False))
+        elif kind == "link":
+            # sources: 위젯이 존재하는 첫 후보를 출발점으로 사용 (예: Preprocess 가 없을 때만 File 에서 직접 연결 허용)
+            if "sources" in criterion: candidates = [(c["widget"], c["channel"]) for c in criterion["sources"]]
+            else: candidates = [(_require(criterion, "source"), _require(criterion, "source_channel"))]
+            sink = _require(criterion, "sink"); sink_channel = _require(criterion, "sink_channel")
+            mode = criterion.get("mode", "direct")
+            if mode not in LINK_MODES: raise RubricError(f"기준 {criterion_id}: 알 수 없는 연결 방식 '{mode}' (가능: {', '.join(LINK_MODES)})")
+            compiled["candidates"] = candidates; compiled["sink"] = sink
+            self.widgets.add(sink)
+            compiled["probes"] = [(source, sink, source_channel, sink_channel, mode) for source, source_channel in candidates]
+            for source, _ in candidates: self.widgets.add(source)
+            self.link_probes.update(compiled["probes"])
+        else:
+            raise RubricError(f"기준 {criterion_id}: 알 수 없는 유형 '{kind}' (가능: {', '.join(CRITERION_TYPES)})")
+        return compiled
+
+    def collect(self, workflow, check_data=True, recompute=False):
+        # 한 워크플로에서 모든 기준이 필요로 하는 사실을 한 번에 모음 (check_data=False 면 데이터셋은 불러오지 않음)
+        # recompute=True 면 모든 score 기준을, 아니면 "recompute" 가 켜진 기준만 다시 실행한 지표로 판정
+        node_ids = {widget: workflow.node_id(widget) for widget in self.widgets}
+        settings = {}; oversized = set()  # oversized: 속성이 크기 상한을 넘어 읽지 않은 위젯
+        for widget in self.property_widgets:
+            if not node_ids[widget]: continue
+            try: settings[widget] = workflow.settings(node_ids[widget])
+            except PayloadTooLarge: oversized.add(widget)
+        links = {}
+        for probe in self.link_probes:
+            source_id, sink_id = node_ids[probe[0]], node_ids[probe[1]]
+            has = workflow.has_path if probe[4] == "path" else workflow.has_link
+            links[probe] = bool(source_id and sink_id) and has(source_id, sink_id, probe[2], probe[3])
+        datasets = {}
+        for widget in (self.dataset_widgets if check_data else ()):
+            source, display_name = get_file_widget_source(settings.get(widget))
+            summary = load_data_summary(source) if source else None
+            datasets[widget] = (display_name, summary)
+        scores = {}
+        wanted = {(c["widget"], c["metric"]) for c in self.criteria if c["type"] == "score" and (recompute or c["recompute"])}
+        for widget, metric in (wanted if check_data else ()):
+            scores[(widget, metric)] = recompute_scores(workflow, node_ids[widget], metric) if node_ids[widget] else None
+        return {"node_ids": node_ids, "settings": settings, "links": links, "datasets": datasets, "scores": scores,
+                "oversized": oversized}
+
+    def evaluate(self, facts):
+        results = {}
+        for criterion in self.criteria:
+            results[criterion["id"]] = self._evaluate_criterion(criterion, facts)
+        return results
+
+    def _evaluate_criterion(self, criterion, facts):
+        kind = criterion["type"]
+        if kind in ("setting", "dataset", "score") and criterion["widget"] in facts["oversized"]: return None
+        if kind == "widget": return facts["node_ids"][criterion["widget"]] is not None
+        if kind == "setting":
+            settings = facts["settings"].get(criterion["widget"])
+            return isinstance(settings, dict) and all(evaluate_predicate(settings, p) for p in criterion["predicates"])
+        if kind == "dataset":
+            if criterion["widget"] not in facts["datasets"]: return None
+            _, summary = facts["datasets"][criterion["widget"]]
+            return is_valid_data_summary(summary)
+        if kind == "score":
+            score = facts["scores"].get((criterion["widget"], criterion["metric"]))
+            if score is None: score = get_saved_score(facts["settings"].get(criterion["widget"]), criterion["metric"])
+            return score is not None and score >= criterion["threshold"]
+        for (source, _), probe in zip(criterion["candidates"], criterion["probes"]):
+            if facts["node_ids"][source] is not None: return facts["links"][probe]
+        return False
+
+    def data_summary(self, facts):
+        lines = []
+        for widget in sorted(self.dataset_widgets):
+            if widget not in facts["datasets"]: lines.append("데이터 검증 생략 (구조 채점 모드)"); continue
+            display_name, summary = facts["datasets"][widget]
+            summary_for_output = format_data_summary(summary) if summary else "데이터 소스 정보 없음 또는 요약 실패"
+            lines.append(f"소스: {display_name} | 요약: {summary_for_output}")
+        return " / ".join(lines) if lines else "N/A"
+
+    def grade(self, workflow, check_data=True, recompute=False, outcomes=None, facts=None):
+        # grade_workflow 와 같은 모양: ({기준 ID: bool}, 데이터 요약 문자열). outcomes 도 grade_workflow 와 같은 뜻
+        # (사실 수집은 모든 기준이 함께 하므로, 수집 중에 멈추면 모든 기준이 "running" 으로 남음)
+        # facts 가 주어지면 (merge_plans 로 여러 루브릭이 함께 모은 것) 다시 모으지 않고 그대로 판정
+        if workflow is None: return {c["id"]: False for c in self.criteria}, "N/A"
+        outcomes = {} if outcomes is None else outcomes
+        for criterion in self.criteria: outcomes[criterion["id"]] = "running"
+        if facts is None: facts = self.collect(workflow, check_data, recompute)
+        results = self.evaluate(facts)
+        for criterion in self.criteria:
+            widget = criterion.get("widget")
+            if criterion["type"] == "dataset" and not check_data: outcomes[criterion["id"]] = "skipped"
+            elif criterion["type"] in ("setting", "dataset", "score") and widget in facts["oversized"]: outcomes[criterion["id"]] = "payload"
+            elif criterion["type"] == "dataset" and widget not in facts["datasets"]: outcomes[criterion["id"]] = "skipped"
+            else: outcomes[criterion["id"]] = "ok"
+        return results, self.data_summary(facts)
+
+
+def merge_plans(plans):
+    # 여러 루브릭을 합친 계획. collect 를 한 번만 해서 모든 루브릭이 쓰는 사실(위젯, 설정, 링크, 데이터셋, 점수)을 모으고
+    # 각 루브릭의 계획은 그 사실로 evaluate 만 함. 기준 ID 는 겹치지 않도록 "순번/ID" 로 바꿈
+    criteria = [dict(criterion, id=f"{index}/{criterion['id']}") for index, plan in enumerate(plans) for criterion in plan.rubric["criteria"]]
+    return RubricPlan({"name": " + ".join(plan.name for plan in plans), "criteria": criteria})
+
+def compile_rubric(rubric):
+    if isinstance(rubric, str): rubric = load_rubric(rubric)
+    return RubricPlan(rubric)
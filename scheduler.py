@@ -0,0 +1,257 @@
+# scheduler.py
+
+import os
+import sys
+import time
+import heapq
+import itertools
+import multiprocessing
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from batch_grading import (_print_row, criterion_ids_for, data_phase_criteria, data_widgets_for, failed_row, grade_submission,
+                           memory_error_row)
+from dataset_cache import get_dataset_cache, is_remote_source
+from dataset_fetch import get_dataset_fetcher
+from ows_parser import get_file_widget_source, load_ows_file, parse_submission_name
+from zip_ingest import submission_size
+
+# 반 전체 채점 순서를 정하는 스케줄러
+# 1) 사전 조사: 제출물마다 크기, 데이터 소스 위젯의 소스 종류(원격/로컬/없음), 데이터셋 요약이 캐시에 있는지만 읽음
+# 2) 느린 제출물부터: 예상 비용(제출물 크기 + 로컬 데이터셋 크기 + 캐시에 없는 원격 데이터셋) 내림차순으로 워커에 배정
+#    (워커 수만큼만 넘겨주고 나머지는 여기서 들고 있어야 나중에 생긴 일이 앞 순서로 끼어들 수 있음)
+# 3) 캐시에 없는 원격 데이터셋은 처음에 모두 내려받기 시작하고, 받는 동안 그 제출물의 구조 기준만 먼저 채점 ("partial" 행)
+#    -> 다운로드가 끝나면 데이터 기준만 채점해서 합친 행("final")을 내보냄. 그 사이 워커는 다른 제출물을 채점
+# 4) ordered=True 면 final 행을 학번 순으로 맞춰 내보냄 (앞 학번이 끝날 때까지 뒤 학번 행은 버퍼에 둠)
+REMOTE_FETCH_COST = 4 * 1024 * 1024  # 캐시에 없는 원격 데이터셋은 4MB 짜리 로컬 데이터셋을 읽는 만큼 걸린다고 봄
+PROGRESS_INTERVAL = 1.0              # 끝나는 채점이 없어도 이 간격으로 진행 상황("tick")을 내보냄
+STRUCTURE, DATA, FULL = "structure", "data", "full"
+PHASE_OVERRIDES = {STRUCTURE: {"check_data": False}, FULL: {}}
+
+
+def prescan(path, widgets=("File",), cache=None):
+    # 채점하지 않고 싸게 알 수 있는 것만: {"path", "size", "source", "kind", "cached", "cost"}
+    # kind: "remote" / "local" / "none"(데이터 소스 없음) / "malformed"(읽을 수 없음). widgets 가 비면 크기만 봄
+    size = submission_size(path)
+    scan = {"path": path, "size": size, "source": None, "kind": "none", "cached": False, "cost": size}
+    if not widgets: return scan
+    try:
+        workflow = load_ows_file(path, property_widgets=set(widgets))
+        if workflow is None: scan["kind"] = "malformed"; return scan
+        source = None
+        for widget in widgets:
+            node_id = workflow.node_id(widget)
+            source, _ = get_file_widget_source(workflow.properties(node_id) if node_id else None)
+            if source: break
+    except Exception: return scan  # 속성 크기 상한 초과 등: 비용만 크기로 두고 채점은 워커에서 (payload/error 행)
+    if not source: return scan
+    scan["source"] = source; scan["kind"] = "remote" if is_remote_source(source) else "local"
+    scan["cached"] = (cache or get_dataset_cache()).get(source) is not None
+    if scan["cached"]: return scan
+    if scan["kind"] == "remote": scan["cost"] += REMOTE_FETCH_COST
+    else:
+        try: scan["cost"] += os.path.getsize(os.path.expanduser(source))
+        except OSError: pass
+    return scan
+
+def plan_schedule(paths, widgets=("File",)):
+    # 사전 조사 결과를 느린 것부터 (비용이 같으면 경로 순)
+    cache = get_dataset_cache()
+    return sorted((prescan(path, widgets, cache) for path in paths), key=lambda scan: (-scan["cost"], scan["path"]))
+
+def student_order(path):
+    student_id, _ = parse_submission_name(path)
+    return student_id, path
+
+def merge_rows(structure_row, data_row, data_ids):
+    # 구조 채점 행 + 데이터 기준 채점 행 -> 한 행. 데이터 기준 값/결과 종류, 데이터 요약, CA 는 데이터 쪽을 씀
+    row = dict(structure_row)
+    row.update((c, data_row[c]) for c in data_ids if c in data_row)
+    row["outcomes"] = dict(structure_row.get("outcomes") or {}, **{c: v for c, v in (data_row.get("outcomes") or {}).items() if c in data_ids})
+    if data_row.get("data_summary"): row["data_summary"] = data_row["data_summary"]
+    if data_row.get("ca") is not None: row["ca"] = data_row["ca"]
+    row["cached"] = structure_row.get("cached", 0) + data_row.get("cached", 0)
+    elapsed = [r["elapsed_ms"] for r in (structure_row, data_row) if isinstance(r.get("elapsed_ms"), (int, float))]
+    row["elapsed_ms"] = round(sum(elapsed), 1) if elapsed else ""
+    if data_row["status"] != "ok": row["status"] = data_row["status"]; row["error"] = data_row["error"]
+    return row
+
+
+class Progress:
+    # 예상 비용 기준 진행률과 남은 시간 (남은 시간 = 지금까지 걸린 시간 / 끝낸 비용 x 남은 비용)
+    # 느린 제출물부터 채점하므로 초반 추정치는 실제보다 길게 나오다가 점점 맞아 감
+    def __init__(self, scans):
+        self.total = len(scans); self.total_cost = sum(scan["cost"] for scan in scans) or 1
+        self.done = 0; self.done_cost = 0; self.partial = 0; self.waiting = 0
+        self.started = time.perf_counter()
+
+    def finish(self, scan):
+        self.done += 1; self.done_cost += scan["cost"]
+
+    @property
+    def elapsed(self): return time.perf_counter() - self.started
+
+    def eta(self):
+        if not self.done_cost: return None
+        return self.elapsed * (self.total_cost - self.done_cost) / self.done_cost
+
+    def line(self):
+        eta = self.eta()
+        waiting = f", 데이터 대기 {self.waiting}개" if self.waiting else ""
+        remaining = f", 남은 시간 약 {eta:.0f}초" if eta is not None else ""
+        return f"[{self.done}/{self.total} {self.done_cost * 100 / self.total_cost:3.0f}%] 경과 {self.elapsed:.1f}초{remaining}{waiting}"
+
+
+class ReorderBuffer:
+    # 끝나는 순서대로 들어오는 행을 학번 순으로 내보냄. push 는 지금 내보낼 수 있게 된 행 목록을 돌려줌
+    def __init__(self, paths):
+        self._order = sorted(paths, key=student_order); self._next = 0; self._held = {}
+
+    def push(self, row):
+        self._held[row["file"]] = row
+        released = []
+        while self._next < len(self._order) and self._order[self._next] in self._held:
+            released.append(self._held.pop(self._order[self._next])); self._next += 1
+        return released
+
+
+class _InlineExecutor:
+    # 워커 1개: 같은 프로세스에서 바로 채점 (다운로드 스레드와는 그대로 겹침)
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        try: future.set_result(fn(*args, **kwargs))
+        except Exception as e: future.set_exception(e)
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False): pass
+
+
+class GradingScheduler:
+    # for kind, row, progress in GradingScheduler(paths, ...): kind 는
+    #   "partial": 데이터셋을 받는 동안 먼저 채점한 구조 기준 결과 (데이터 기준은 None)
+    #   "final": 모든 기준을 채점한 행 (제출물마다 한 번, ordered 면 학번 순)
+    #   "tick": PROGRESS_INTERVAL 동안 끝난 채점이 없을 때 (row 는 None)
+    # 구조/데이터를 나눠 채점하는 것은 데이터 기준이 있고 변형/프로파일 채점이 아닐 때만 (그 외에는 다운로드가 끝난 뒤 한 번에 채점)
+    def __init__(self, paths, workers=None, limits=None, ordered=False, **grade_kwargs):
+        self.paths = list(paths); self.workers = workers or os.cpu_count() or 1
+        self.limits = limits; self.ordered = ordered; self.grade_kwargs = grade_kwargs
+        rubric = grade_kwargs.get("rubric"); self.check_data = grade_kwargs.get("check_data", True)
+        self.criterion_ids = criterion_ids_for(rubric)
+        self.data_ids = data_phase_criteria(rubric, grade_kwargs.get("recompute", False)) if self.check_data else set()
+        self.split = bool(self.data_ids) and not grade_kwargs.get("variants") and not grade_kwargs.get("profile")
+        self.scans = plan_schedule(self.paths, data_widgets_for(rubric) if self.check_data else ())
+        self.progress = Progress(self.scans)
+        self.fetches = {}
+        if self.check_data:
+            self.fetches = get_dataset_fetcher().prefetch(s["source"] for s in self.scans if s["kind"] == "remote" and not s["cached"])
+
+    def counts(self):
+        counts = {}
+        for scan in self.scans:
+            kind = "cached" if scan["cached"] else scan["kind"]
+            counts[kind] = counts.get(kind, 0) + 1
+        return counts
+
+    def _open_pool(self):
+        if self.limits:
+            from isolated_worker import IsolatedPool
+            return IsolatedPool(min(self.workers, len(self.paths)), **self.limits, **self.grade_kwargs)
+        if self.workers <= 1: return _InlineExecutor()
+        # spawn: 원격 데이터 선행 다운로드 스레드가 도는 중에 fork 하지 않도록 (macOS 기본값과도 같음)
+        return ProcessPoolExecutor(max_workers=min(self.workers, len(self.paths)), mp_context=multiprocessing.get_context("spawn"))
+
+    def _submit(self, pool, scan, phase):
+        overrides = {"only": self.data_ids} if phase == DATA else PHASE_OVERRIDES[phase]
+        if self.limits: return pool.submit(scan["path"], **overrides)
+        return pool.submit(grade_submission, scan["path"], **dict(self.grade_kwargs, **overrides))
+
+    def _failed(self, scan, error):
+        if isinstance(error, MemoryError): return memory_error_row(scan["path"], self.grade_kwargs.get("rubric"))
+        return failed_row(scan["path"], "crashed", f"{type(error).__name__}: {error}", self.criterion_ids)
+
+    def __iter__(self):
+        if not self.paths: return
+        queue = []; order = itertools.count()
+        # 데이터가 준비된 데이터 단계가 먼저 (그 제출물은 이미 구조 결과가 나가 있음), 그다음 비용 순
+        push = lambda scan, phase: heapq.heappush(queue, (phase != DATA, -scan["cost"], next(order), scan, phase))
+        waiting = {}  # 다운로드 Future -> 끝나면 넣을 [(사전 조사, 단계)]
+        partial = {}; retried = set(); jobs = {}
+        buffer = ReorderBuffer(self.paths) if self.ordered else None
+        for scan in self.scans:
+            fetch = self.fetches.get(scan["source"]) if scan["kind"] == "remote" else None
+            if fetch is None or fetch.done(): push(scan, FULL)
+            elif self.split: push(scan, STRUCTURE)
+            else: waiting.setdefault(fetch, []).append((scan, FULL)); self.progress.waiting += 1
+        pool = self._open_pool(); generation = 0; finished = False
+        try:
+            while queue or jobs or waiting:
+                while queue and len(jobs) < self.workers:
+                    _, _, _, scan, phase = heapq.heappop(queue)
+                    try: future = self._submit(pool, scan, phase)
+                    except RuntimeError as e:  # 멈춘 격리 풀: 그 제출물은 crashed 행으로
+                        future = Future(); future.set_exception(e)
+                    jobs[future] = (scan, phase, generation)
+                done, _ = wait(list(jobs) + list(waiting), timeout=PROGRESS_INTERVAL, return_when=FIRST_COMPLETED)
+                if not done:
+                    yield "tick", None, self.progress; continue
+                for future in done:
+                    if future in waiting:
+                        for scan, phase in waiting.pop(future): push(scan, phase); self.progress.waiting -= 1
+                        continue
+                    scan, phase, job_generation = jobs.pop(future)
+                    try: row = future.result()
+                    except BrokenProcessPool:
+                        # 풀이 깨지면 같이 돌던 채점도 모두 실패하므로 새 풀에서 한 번은 다시 시도
+                        if job_generation == generation:
+                            pool.shutdown(wait=False); pool = self._open_pool(); generation += 1
+                        if (scan["path"], phase) not in retried:
+                            retried.add((scan["path"], phase)); push(scan, phase); continue
+                        row = failed_row(scan["path"], "crashed", "채점 워커 프로세스가 비정상 종료됨", self.criterion_ids)
+                    except Exception as e: row = self._failed(scan, e)
+                    if phase == STRUCTURE:
+                        if row["status"] != "ok":
+                            yield from self._finish(scan, row, buffer); continue
+                        partial[scan["path"]] = row; self.progress.partial += 1
+                        yield "partial", row, self.progress
+                        fetch = self.fetches[scan["source"]]
+                        if fetch.done(): push(scan, DATA)
+                        else: waiting.setdefault(fetch, []).append((scan, DATA)); self.progress.waiting += 1
+                        continue
+                    if phase == DATA: row = merge_rows(partial.pop(scan["path"]), row, self.data_ids)
+                    yield from self._finish(scan, row, buffer)
+            finished = True
+        finally:
+            # 중간에 멈추면 (Ctrl+C, 호출한 쪽이 반복을 그만둠) 기다리던 채점은 취소하고 바로 돌아감
+            if self.limits: pool.close()
+            else: pool.shutdown(wait=finished, cancel_futures=True)
+
+    def _finish(self, scan, row, buffer):
+        self.progress.finish(scan)
+        for released in (buffer.push(row) if buffer is not None else [row]): yield "final", released, self.progress
+
+
+def _clear_line(live):
+    if live: print("\r\033[K", end="")
+
+def run_scheduled(paths, writer, criterion_ids, workers=None, limits=None, ordered=False, **grade_kwargs):
+    # batch_grading.run_batch 의 --schedule/--ordered: 결과를 나오는 대로 화면에 보여 주고 final 행만 writer 에 기록
+    # 터미널이면 진행률/남은 시간을 마지막 줄에서 계속 갱신
+    live = sys.stdout.isatty()
+    scheduler = GradingScheduler(paths, workers, limits, ordered, **grade_kwargs)
+    counts = scheduler.counts()
+    print("사전 조사: " + ", ".join(f"{label} {counts[kind]}개" for kind, label in
+                                  (("remote", "원격"), ("local", "로컬"), ("cached", "캐시됨"), ("none", "데이터 없음"), ("malformed", "읽기 실패"))
+                                  if counts.get(kind)))
+    if scheduler.fetches: print(f"원격 데이터셋 {len(scheduler.fetches)}개 선행 다운로드 시작 (받는 동안 구조 기준부터 채점)")
+    rows = []
+    for kind, row, progress in scheduler:
+        if kind == "tick":
+            if live: print("\r\033[K" + progress.line(), end="", flush=True)
+            continue
+        _clear_line(live)
+        if kind == "partial": _print_row(row, [c for c in criterion_ids if c not in scheduler.data_ids], "[구조 기준, 데이터 대기] ")
+        else:
+            writer.write(row); rows.append(row)
+            _print_row(row, criterion_ids, f"{progress.line()} ")
+    _clear_line(live)
+    return rows
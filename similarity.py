@@ -0,0 +1,192 @@
+# similarity.py
+
+import os
+import csv
+import sys
+import random
+import hashlib
+import argparse
+
+from ows_parser import PayloadTooLarge, load_ows_file, get_node_settings, parse_submission_name
+
+# 워크플로 지문 = 특징 문자열 집합. MinHash 서명으로 줄이고 LSH 버킷으로 비슷한 쌍만 후보로 뽑음 (모든 쌍 비교 없음)
+NUM_PERMUTATIONS = 128
+MERSENNE_PRIME = (1 << 61) - 1
+# 표시 상태처럼 의미 없는 설정 키는 설정 특징에서 제외 (savedWidgetGeometry 는 geom 특징으로 따로 넣음)
+IGNORED_SETTING_KEYS = {"controlAreaVisible", "__version__", "savedWidgetGeometry", "context_settings", "splitter_state"}
+MIN_COHORT_FOR_DF_FILTER = 10
+
+
+def _flatten_settings(value, prefix=""):
+    # 설정 dict -> ["경로=값", ...]. 값은 repr 로 정규화 (dict 키 순서 무관)
+    if isinstance(value, dict):
+        items = []
+        for key in sorted(value, key=str):
+            if key in IGNORED_SETTING_KEYS: continue
+            items.extend(_flatten_settings(value[key], f"{prefix}/{key}"))
+        return items
+    if isinstance(value, (list, tuple)) and len(value) <= 32:
+        items = []
+        for index, item in enumerate(value): items.extend(_flatten_settings(item, f"{prefix}[{index}]"))
+        return items
+    if isinstance(value, (bytes, bytearray)): return [f"{prefix}=bytes:{hashlib.sha1(value).hexdigest()[:12]}"]
+    if hasattr(value, "qualified_name"):  # pickle 속 Orange 객체 (OrangeStandIn): 클래스 이름 + 상태
+        return [f"{prefix}:{value.qualified_name}"] + _flatten_settings(getattr(value, "__dict__", {}), prefix)
+    return [f"{prefix}={value!r}"[:200]]
+
+def workflow_features(workflow):
+    # 노드 구성(qualified_name 중복 포함), 링크 구조, 위젯 위치, 제목, 정규화한 설정, 창 배치(savedWidgetGeometry)
+    features = set(); counts = {}
+    qualified = {}
+    for node in workflow.nodes:
+        qualified_name = node.get('qualified_name', ''); node_id = node.get('id')
+        qualified[node_id] = qualified_name
+        counts[qualified_name] = counts.get(qualified_name, 0) + 1
+        features.add(f"node:{qualified_name}#{counts[qualified_name]}")
+        title = node.get('title')
+        if title and title != node.get('name'): features.add(f"title:{title}")
+        position = node.get('position')
+        if position: features.add(f"pos:{qualified_name}:{position}")
+    link_counts = {}
+    for source, sink, source_channel, sink_channel in workflow.links:
+        key = f"{qualified.get(source)}>{qualified.get(sink)}:{source_channel}:{sink_channel}"
+        link_counts[key] = link_counts.get(key, 0) + 1
+        features.add(f"link:{key}#{link_counts[key]}")
+    for node in workflow.nodes:
+        node_id = node.get('id'); qualified_name = qualified[node_id]
+        try: settings = get_node_settings(workflow, node_id)
+        except PayloadTooLarge: features.add(f"oversized:{qualified_name}"); continue  # 크기 상한을 넘는 속성은 읽지 않음
+        if not isinstance(settings, dict): continue
+        geometry = settings.get("savedWidgetGeometry")
+        if isinstance(geometry, (bytes, bytearray)) and geometry:
+            features.add(f"geom:{qualified_name}:{hashlib.sha1(geometry).hexdigest()[:12]}")
+        for item in _flatten_settings(settings): features.add(f"set:{qualified_name}{item}")
+    return features
+
+def _feature_hash(feature):
+    return int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class MinHasher:
+    # h_i(x) = (a_i * hash(x) + b_i) mod p 의 최솟값들. 같은 seed 면 서명끼리 비교 가능
+    def __init__(self, num_permutations=NUM_PERMUTATIONS, seed=1):
+        rng = random.Random(seed)
+        self.permutations = [(rng.randrange(1, MERSENNE_PRIME), rng.randrange(0, MERSENNE_PRIME)) for _ in range(num_permutations)]
+
+    def signature(self, features):
+        hashes = [_feature_hash(feature) for feature in features]
+        if not hashes: return None
+        return tuple(min((a * h + b) % MERSENNE_PRIME for h in hashes) for a, b in self.permutations)
+
+def lsh_parameters(threshold, num_permutations=NUM_PERMUTATIONS):
+    # 밴드 수 b, 밴드당 행 수 r (b*r = 순열 수). 후보가 되는 유사도 (1/b)^(1/r) 가 threshold 보다 조금 낮도록 고름
+    best = None
+    for rows in range(1, num_permutations + 1):
+        if num_permutations % rows: continue
+        bands = num_permutations // rows
+        knee = (1 / bands) ** (1 / rows)
+        if knee <= threshold * 0.9 and (best is None or knee > best[2]): best = (bands, rows, knee)
+    return (best[0], best[1]) if best else (num_permutations, 1)
+
+def jaccard(a, b):
+    return len(a & b) / len(a | b) if a or b else 0.0
+
+
+class SimilarityIndex:
+    # 제출물들의 특징 집합을 모아 두었다가 find_pairs 에서 한 번에 MinHash + LSH
+    # max_df: 반 전체의 max_df 비율 이상이 가진 특징(과제 템플릿 그대로인 위젯/링크 등)은 빼고 비교
+    def __init__(self, threshold=0.7, num_permutations=NUM_PERMUTATIONS, max_df=0.5):
+        self.threshold = threshold; self.max_df = max_df
+        self.hasher = MinHasher(num_permutations)
+        self.bands, self.rows = lsh_parameters(threshold, num_permutations)
+        self.features = {}
+
+    def add(self, key, workflow):
+        if workflow is not None: self.features[key] = workflow_features(workflow)
+
+    def _distinctive_features(self):
+        if len(self.features) < MIN_COHORT_FOR_DF_FILTER: return self.features
+        document_frequency = {}
+        for features in self.features.values():
+            for feature in features: document_frequency[feature] = document_frequency.get(feature, 0) + 1
+        limit = self.max_df * len(self.features)
+        return {key: {f for f in features if document_frequency[f] <= limit} for key, features in self.features.items()}
+
+    def find_pairs(self):
+        # [(유사도, key1, key2)] 유사도 내림차순. 후보는 LSH 버킷을 공유한 쌍만, 유사도는 실제 Jaccard 로 확인
+        distinctive = self._distinctive_features()
+        buckets = {}
+        for key, features in distinctive.items():
+            signature = self.hasher.signature(features)
+            if signature is None: continue
+            for band in range(self.bands):
+                buckets.setdefault((band, signature[band * self.rows:(band + 1) * self.rows]), []).append(key)
+        candidates = set()
+        for members in buckets.values():
+            for i in range(len(members)):
+                for j in range(i + 1, len(members)): candidates.add(tuple(sorted((members[i], members[j]))))
+        pairs = []
+        for a, b in candidates:
+            score = jaccard(distinctive[a], distinctive[b])
+            if score >= self.threshold: pairs.append((score, a, b))
+        return sorted(pairs, reverse=True)
+
+    def clusters(self, pairs=None):
+        # 유사 쌍을 이어서 묶은 그룹: [{"members": [...], "max": 최고 유사도, "pairs": [(유사도, a, b), ...]}]
+        pairs = self.find_pairs() if pairs is None else pairs
+        parent = {}
+        def find(x):
+            while parent.setdefault(x, x) != x: parent[x] = parent[parent[x]]; x = parent[x]
+            return x
+        for _, a, b in pairs: parent[find(a)] = find(b)
+        groups = {}
+        for score, a, b in pairs:
+            group = groups.setdefault(find(a), {"members": set(), "max": 0.0, "pairs": []})
+            group["members"].update((a, b)); group["max"] = max(group["max"], score); group["pairs"].append((score, a, b))
+        result = [dict(group, members=sorted(group["members"])) for group in groups.values()]
+        return sorted(result, key=lambda g: (-g["max"], g["members"]))
+
+
+def build_index(paths, threshold=0.7, max_df=0.5):
+    index = SimilarityIndex(threshold, max_df=max_df)
+    for path in paths:
+        try: index.add(path, load_ows_file(path))
+        except Exception as e: print(f"  유사도 비교에서 제외: {path} ({type(e).__name__}: {e})")
+    return index
+
+def print_clusters(clusters):
+    if not clusters:
+        print("유사 워크플로 의심 그룹 없음"); return
+    print(f"유사 워크플로 의심 그룹 {len(clusters)}개")
+    for number, cluster in enumerate(clusters, 1):
+        names = [" ".join(part for part in parse_submission_name(path) if part) for path in cluster["members"]]
+        print(f"  [{number}] 최고 유사도 {cluster['max']:.2f}: {', '.join(names)}")
+
+def write_similarity_csv(csv_path, clusters):
+    # 학생별 한 줄: 그룹 번호, 그룹 안 최고 유사도, 가장 비슷한 상대
+    with open(csv_path, "w", newline="", encoding="utf-8-sig") as f:
+        writer = csv.writer(f)
+        writer.writerow(["cluster", "student_id", "student_name", "file", "max_similarity", "most_similar_to"])
+        for number, cluster in enumerate(clusters, 1):
+            for path in cluster["members"]:
+                best = max((p for p in cluster["pairs"] if path in p[1:]), key=lambda p: p[0])
+                other = best[2] if best[1] == path else best[1]
+                student_id, student_name = parse_submission_name(path)
+                writer.writerow([number, student_id, student_name, path, f"{best[0]:.3f}", os.path.basename(other)])
+
+def main(argv=None):
+    from batch_grading import find_submissions
+    parser = argparse.ArgumentParser(description="반 전체 .ows 워크플로 유사도(표절 의심) 검사 (MinHash + LSH)")
+    parser.add_argument("target", help="제출물 디렉터리 또는 glob 패턴")
+    parser.add_argument("--threshold", type=float, default=0.7, help="의심으로 볼 Jaccard 유사도 (기본 0.7)")
+    parser.add_argument("--max-df", type=float, default=0.5, help="이 비율 이상의 학생이 가진 특징은 비교에서 제외 (기본 0.5)")
+    parser.add_argument("--csv", dest="csv_path", help="의심 그룹 CSV 경로")
+    args = parser.parse_args(argv)
+    paths = find_submissions(args.target)
+    clusters = build_index(paths, args.threshold, args.max_df).clusters()
+    print_clusters(clusters)
+    if args.csv_path: write_similarity_csv(args.csv_path, clusters)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
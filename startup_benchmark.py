@@ -0,0 +1,63 @@
+# startup_benchmark.py
+
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 각 시나리오는 새 파이썬 프로세스에서 실행 (모듈 캐시가 없는 콜드 스타트). 결과는 stdout 의 JSON 한 줄
+SCENARIOS = [
+    ("구조 채점 (Orange import 없음)", """
+import time; t0 = time.perf_counter()
+import batch_grading
+t1 = time.perf_counter()
+row = batch_grading.grade_submission(SAMPLE, check_data=False)
+t2 = time.perf_counter()
+print(json.dumps({"import_ms": (t1 - t0) * 1000, "first_grade_ms": (t2 - t1) * 1000,
+                  "orange_loaded": "Orange" in sys.modules}))
+"""),
+    ("데이터 검증 포함 (Orange import)", """
+import time; t0 = time.perf_counter()
+import batch_grading, ows_parser
+ows_parser.get_orange_table_class()
+t1 = time.perf_counter()
+row = batch_grading.grade_submission(SAMPLE, check_data=True)
+t2 = time.perf_counter()
+print(json.dumps({"import_ms": (t1 - t0) * 1000, "first_grade_ms": (t2 - t1) * 1000,
+                  "orange_loaded": "Orange" in sys.modules}))
+"""),
+]
+
+
+def run_scenario(code, sample_path, repeats):
+    prelude = f"import sys, json; sys.path.insert(0, {SCRIPT_DIR!r}); SAMPLE = {sample_path!r}\n"
+    samples = []
+    for _ in range(repeats):
+        completed = subprocess.run([sys.executable, "-c", prelude + code], capture_output=True, text=True, cwd=SCRIPT_DIR)
+        if completed.returncode != 0:
+            return None, completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else "실패"
+        samples.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+    return samples, None
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="채점기 콜드 스타트(import) 시간 측정")
+    parser.add_argument("--sample", default=os.path.join(SCRIPT_DIR, "30101 테스트.ows"), help="첫 채점에 쓸 .ows 파일")
+    parser.add_argument("--repeats", type=int, default=5, help="시나리오별 반복 횟수 (중앙값 보고)")
+    args = parser.parse_args(argv)
+    print(f"콜드 스타트 측정 (반복 {args.repeats}회, 중앙값)")
+    for name, code in SCENARIOS:
+        samples, error = run_scenario(code, args.sample, args.repeats)
+        if samples is None:
+            print(f"  {name}: 측정 불가 - {error}"); continue
+        import_ms = statistics.median(s["import_ms"] for s in samples)
+        grade_ms = statistics.median(s["first_grade_ms"] for s in samples)
+        orange = "예" if samples[0]["orange_loaded"] else "아니오"
+        print(f"  {name}: import {import_ms:.1f} ms, 첫 채점 {grade_ms:.1f} ms, Orange 로드됨: {orange}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
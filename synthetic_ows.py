@@ -0,0 +1,184 @@
+# synthetic_ows.py
+
+import os
+import sys
+import types
+import pickle
+import base64
+import random
+import argparse
+import contextlib
+from xml.sax.saxutils import quoteattr, escape
+
+# 모범 답안과 같은 기본 파이프라인 (이름, qualified_name)
+BASE_WIDGETS = [
+    ("File", "Orange.widgets.data.owfile.OWFile"),
+    ("Data Table", "Orange.widgets.data.owtable.OWTable"),
+    ("Preprocess", "Orange.widgets.data.owpreprocess.OWPreprocess"),
+    ("Data Sampler", "Orange.widgets.data.owdatasampler.OWDataSampler"),
+    ("kNN", "Orange.widgets.model.owknn.OWKNNLearner"),
+    ("Tree", "Orange.widgets.model.owtree.OWTreeLearner"),
+    ("Logistic Regression", "Orange.widgets.model.owlogisticregression.OWLogisticRegression"),
+    ("Test and Score", "Orange.widgets.evaluate.owtestandscore.OWTestAndScore"),
+    ("Predictions", "Orange.widgets.evaluate.owpredictions.OWPredictions"),
+    ("Tree Viewer", "Orange.widgets.visualize.owtreeviewer.OWTreeGraph"),
+]
+# (source, sink, source 채널 이름, sink 채널 이름, source 채널 id, sink 채널 id)
+BASE_LINKS = [
+    (2, 3, "Preprocessed Data", "Data", "preprocessed_data", "data"),
+    (3, 4, "Data Sample", "Data", "data_sample", "data"),
+    (3, 5, "Data Sample", "Data", "data_sample", "data"),
+    (3, 6, "Data Sample", "Data", "data_sample", "data"),
+    (4, 7, "Learner", "Learner", "learner", "learner"),
+    (5, 7, "Learner", "Learner", "learner", "learner"),
+    (6, 7, "Learner", "Learner", "learner", "learner"),
+    (4, 8, "Model", "Predictors", "model", "predictors"),
+    (5, 8, "Model", "Predictors", "model", "predictors"),
+    (6, 8, "Model", "Predictors", "model", "predictors"),
+    (3, 8, "Remaining Data", "Data", "remaining_data", "data"),
+    (5, 9, "Model", "Tree", "model", "tree"),
+    (3, 7, "Data Sample", "Data", "data_sample", "train_data"),
+    (0, 2, "Data", "Data", "data", "data"),
+    (0, 1, "Data", "Data", "data", "data"),
+]
+EXTRA_WIDGETS = [
+    ("Scatter Plot", "Orange.widgets.visualize.owscatterplot.OWScatterPlot"),
+    ("Distributions", "Orange.widgets.visualize.owdistributions.OWDistributions"),
+    ("Select Columns", "Orange.widgets.data.owselectcolumns.OWSelectAttributes"),
+    ("Impute", "Orange.widgets.data.owimpute.OWImpute"),
+    ("Confusion Matrix", "Orange.widgets.evaluate.owconfusionmatrix.OWConfusionMatrix"),
+    ("Box Plot", "Orange.widgets.visualize.owboxplot.OWBoxPlot"),
+    ("Feature Statistics", "Orange.widgets.data.owfeaturestatistics.OWFeatureStatistics"),
+]
+PICKLE_WIDGETS = {"File", "Test and Score", "Predictions", "Tree Viewer"}
+
+
+@contextlib.contextmanager
+def _fake_orange_modules():
+    # 실제 .ows 와 같은 전역 이름(orangewidget...RecentPath, Context)으로 pickle 하기 위해 잠깐 가짜 모듈을 등록
+    names = ["orangewidget", "orangewidget.utils", "orangewidget.utils.filedialogs", "orangewidget.settings"]
+    saved = {name: sys.modules.get(name) for name in names}
+    modules = {name: types.ModuleType(name) for name in names}
+    for class_name, module_name in (("RecentPath", "orangewidget.utils.filedialogs"), ("Context", "orangewidget.settings")):
+        cls = type(class_name, (), {"__module__": module_name})
+        setattr(modules[module_name], class_name, cls)
+    try:
+        sys.modules.update(modules)
+        yield modules["orangewidget.utils.filedialogs"].RecentPath, modules["orangewidget.settings"].Context
+    finally:
+        for name, module in saved.items():
+            if module is None: sys.modules.pop(name, None)
+            else: sys.modules[name] = module
+
+def _padding(rng, kb):
+    return rng.randbytes(kb * 1024) if kb else b""
+
+def _pickle_properties(name, rng, payload_kb, ca_value):
+    with _fake_orange_modules() as (RecentPath, Context):
+        settings = {"controlAreaVisible": True, "savedWidgetGeometry": _padding(rng, 1) + _padding(rng, payload_kb), "__version__": 1}
+        context = Context(); context.values = {"__version__": 1, "padding": list(range(payload_kb * 16))}
+        settings["context_settings"] = [context]
+        if name == "File":
+            paths = []
+            for i in range(3):
+                recent = RecentPath(); recent.abspath = f"/Users/student/data/dataset_{i}.csv"
+                recent.prefix = "basedir"; recent.relpath = f"dataset_{i}.csv"; recent.title = ""; recent.sheet = ""; recent.file_format = None
+                paths.append(recent)
+            settings.update(recent_paths=paths, recent_urls=["https://example.com/data/penguins_size.csv"], source=0, url="")
+        elif name in ("Predictions", "Test and Score"):
+            score_table = {"show_score_hints": {"CA": True, "AUC": True, "F1": True}}
+            if ca_value is not None: score_table["results"] = [{"model": "kNN", "CA": ca_value, "AUC": min(1.0, ca_value + 0.05)}]
+            settings["score_table"] = score_table
+        data = pickle.dumps(settings, protocol=4)
+    return base64.encodebytes(data).decode("ascii")
+
+def _literal_properties(name, rng, payload_kb, correct):
+    settings = {"controlAreaVisible": True, "savedWidgetGeometry": _padding(rng, 1), "__version__": 1}
+    if name == "Preprocess":
+        method = 5 if correct else rng.choice([0, 1, 2, 3, 4])
+        settings["storedsettings"] = {"name": "", "preprocessors": [("orange.preprocess.impute", {"method": method})]}
+    elif name == "Data Sampler":
+        settings.update(sampling_type=0 if correct else rng.choice([0, 1]), sampleSizePercentage=80 if correct else rng.choice([50, 70, 90]),
+                        number_of_folds=10, replacement=False, sampleSizeNumber=1)
+    elif name == "kNN": settings.update(n_neighbors=rng.choice([3, 5, 7]), metric_index=0, weight_index=0)
+    if payload_kb: settings["padding"] = _padding(rng, payload_kb)
+    return repr(settings)
+
+def generate_workflow(n_nodes=10, n_links=15, payload_kb=0, pickle_payload_kb=0, disabled_ratio=0.0,
+                      missing_channel_ids=False, correct=True, ca_value=0.9, seed=0):
+    # 모범 답안 파이프라인에서 시작해 위젯/링크 수를 맞춘 .ows XML(bytes) 생성
+    rng = random.Random(seed)
+    widgets = list(BASE_WIDGETS[:min(n_nodes, len(BASE_WIDGETS))])
+    while len(widgets) < n_nodes: widgets.append(rng.choice(EXTRA_WIDGETS))
+    links = [l for l in BASE_LINKS if l[0] < len(widgets) and l[1] < len(widgets)][:n_links]
+    existing = {(l[0], l[1]) for l in links}
+    while len(links) < n_links and len(widgets) > 1:
+        source, sink = rng.sample(range(len(widgets)), 2)
+        if (source, sink) in existing and len(existing) < len(widgets) * (len(widgets) - 1): continue
+        existing.add((source, sink)); links.append((source, sink, "Data", "Data", "data", "data"))
+
+    out = ["<?xml version='1.0' encoding='utf-8'?>", '<scheme version="2.0" title="" description="">', "\t<nodes>"]
+    for node_id, (name, qualified_name) in enumerate(widgets):
+        position = (round(rng.uniform(50, 1300), 3), round(rng.uniform(50, 600), 3))
+        out.append(f'\t\t<node id="{node_id}" name={quoteattr(name)} qualified_name="{qualified_name}" project_name="Orange3" '
+                   f'version="" title={quoteattr(name)} position="{position}" />')
+    out.append("\t</nodes>\n\t<links>")
+    for link_id, (source, sink, s_name, t_name, s_id, t_id) in enumerate(links):
+        enabled = "false" if rng.random() < disabled_ratio else "true"
+        channel_ids = "" if missing_channel_ids else f' source_channel_id="{s_id}" sink_channel_id="{t_id}"'
+        out.append(f'\t\t<link id="{link_id}" source_node_id="{source}" sink_node_id="{sink}" source_channel="{s_name}" '
+                   f'sink_channel="{t_name}" enabled="{enabled}"{channel_ids} />')
+    out.append("\t</links>\n\t<annotations />\n\t<thumbnail />\n\t<node_properties>")
+    for node_id, (name, _) in enumerate(widgets):
+        if name in PICKLE_WIDGETS:
+            text = _pickle_properties(name, rng, pickle_payload_kb, ca_value); prop_format = "pickle"
+        else:
+            text = _literal_properties(name, rng, payload_kb, correct); prop_format = "literal"
+        out.append(f'\t\t<properties node_id="{node_id}" format="{prop_format}">{escape(text)}</properties>')
+    out.append("\t</node_properties>\n\t<session_state>\n\t\t<window_groups />\n\t</session_state>\n</scheme>\n")
+    return "\n".join(out).encode("utf-8")
+
+def generate_malformed(seed=0):
+    rng = random.Random(seed)
+    valid = generate_workflow(seed=seed)
+    kind = rng.choice(["truncated", "garbage", "empty"])
+    if kind == "truncated": return valid[: rng.randint(100, len(valid) - 100)]
+    if kind == "garbage": return rng.randbytes(2048)
+    return b""
+
+def write_class(out_dir, n_students=30, malformed_ratio=0.05, incorrect_ratio=0.2, seed=0, **workflow_kwargs):
+    # "학번 이름.ows" 파일들을 만들고 경로 목록 반환
+    os.makedirs(out_dir, exist_ok=True)
+    rng = random.Random(seed); paths = []
+    for i in range(n_students):
+        student_id = f"3{(i // 30) + 1:02d}{(i % 30) + 1:02d}"
+        path = os.path.join(out_dir, f"{student_id} 학생{i + 1}.ows")
+        if rng.random() < malformed_ratio: data = generate_malformed(seed + i)
+        else:
+            data = generate_workflow(correct=rng.random() >= incorrect_ratio, ca_value=round(rng.uniform(0.5, 1.0), 3),
+                                     seed=seed + i, **workflow_kwargs)
+        with open(path, "wb") as f: f.write(data)
+        paths.append(path)
+    return paths
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="벤치마크/테스트용 합성 .ows 워크플로 생성")
+    parser.add_argument("out_dir")
+    parser.add_argument("--students", type=int, default=30)
+    parser.add_argument("--nodes", type=int, default=10)
+    parser.add_argument("--links", type=int, default=15)
+    parser.add_argument("--payload-kb", type=int, default=0, help="literal 속성마다 덧붙일 크기(KB)")
+    parser.add_argument("--pickle-payload-kb", type=int, default=0, help="pickle 속성마다 덧붙일 크기(KB)")
+    parser.add_argument("--disabled-ratio", type=float, default=0.05, help="비활성 링크 비율")
+    parser.add_argument("--missing-channel-ids", action="store_true", help="channel_id 없이 채널 이름만 있는 예전 형식")
+    parser.add_argument("--malformed-ratio", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    paths = write_class(args.out_dir, args.students, args.malformed_ratio, seed=args.seed, n_nodes=args.nodes, n_links=args.links,
+                        payload_kb=args.payload_kb, pickle_payload_kb=args.pickle_payload_kb,
+                        disabled_ratio=args.disabled_ratio, missing_channel_ids=args.missing_channel_ids)
+    print(f"{len(paths)}개 파일 생성: {args.out_dir}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,282 @@
+# workflow_executor.py
+
+import os
+import json
+import pickle
+import hashlib
+import tempfile
+import importlib
+import threading
+import contextlib
+from itertools import chain
+from collections import OrderedDict
+
+from dataset_cache import default_cache_dir, file_lock, is_remote_source, source_identity
+from dataset_fetch import get_dataset_fetcher
+from ows_parser import ORANGE_AVAILABLE_PARSER, get_file_widget_source, get_orange_table_class
+
+# 학생 워크플로를 저장된 설정 그대로 Orange 로 다시 실행 (File -> Preprocess -> Data Sampler -> 학습기 -> Predictions)
+# 노드 출력은 (위젯, 설정에서 뽑은 매개변수, 입력으로 들어온 노드 출력들의 키)의 해시로 memo 하므로
+# 앞단이 같은 학생들은 데이터 로드/전처리/분할/학습을 한 번만 함 (워커끼리는 디스크 memo 로 공유)
+EXECUTOR_VERSION = 1   # 위젯을 재현하는 방식을 바꾸면 올림 (디스크 memo 가 무효화됨)
+DATA_SAMPLER_SEED = 42  # OWDataSampler.RandomSeed. 시드를 안 쓴 워크플로도 같은 시드로 재현 (실행마다 결과가 달라지지 않게)
+KNN_METRICS = ("euclidean", "manhattan", "chebyshev", "mahalanobis")  # OWKNNLearner.metric_index
+KNN_WEIGHTS = ("uniform", "distance")                                   # OWKNNLearner.weight_index
+LR_PENALTIES = ("l1", "l2", None)                                       # OWLogisticRegression.penalty_type
+LR_C_VALUES = list(chain(range(1000, 200, -50), range(200, 100, -10), range(100, 20, -5), range(20, 0, -1),
+                         [x / 10 for x in range(9, 2, -1)], [x / 100 for x in range(20, 2, -1)],
+                         [x / 1000 for x in range(20, 0, -1)]))         # OWLogisticRegression.C_s (C_index 61 -> 1)
+FILE_ROLE_ATTRIBUTE, FILE_ROLE_CLASS, FILE_ROLE_META = 0, 1, 2           # File 위젯 domain_editor 의 역할 (3 은 건너뜀)
+
+
+class UnsupportedWorkflow(Exception):
+    pass
+
+
+def _digest(obj):
+    return hashlib.sha256(json.dumps(obj, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")).hexdigest()
+
+def _single(inputs, channel):
+    values = inputs.get(channel) or []
+    return values[0] if values else None
+
+
+# === 위젯별: 설정 -> memo 키에 들어갈 매개변수, (매개변수, 입력) -> {출력 채널: 값} ===
+def _file_params(settings):
+    source, _ = get_file_widget_source(settings)
+    if not source: raise UnsupportedWorkflow("File 위젯에 데이터 소스 없음")
+    # 학생이 File 위젯에서 바꾼 역할(타깃/메타/건너뛰기). 데이터셋마다 컨텍스트가 따로 저장되므로 모두 넘기고 실행할 때 고름
+    role_sets = []
+    for context in settings.get("context_settings") or []:
+        editor = (getattr(context, "values", None) or {}).get("domain_editor")
+        variables = editor.get("variables") if isinstance(editor, dict) else None
+        if isinstance(variables, list):
+            role_sets.append([(row[0], row[2]) for row in variables if isinstance(row, (list, tuple)) and len(row) > 2])
+    return {"source": source, "identity": source_identity(source), "roles": role_sets}
+
+def _run_file(params, inputs):
+    from Orange.data import Domain
+    source = params["source"]
+    data = get_orange_table_class()(get_dataset_fetcher().local_path(source) if is_remote_source(source) else source)
+    variables = {var.name: var for var in data.domain.variables + data.domain.metas}
+    for roles in params["roles"]:
+        if not roles or any(name not in variables for name, _ in roles): continue
+        parts = ([], [], [])
+        for name, role in roles:
+            if role in (FILE_ROLE_ATTRIBUTE, FILE_ROLE_CLASS, FILE_ROLE_META): parts[role].append(variables[name])
+        data = data.transform(Domain(*parts)); break
+    return {"data": data}
+
+def _preprocess_params(settings):
+    stored = settings.get("storedsettings") or {}
+    return {"preprocessors": [list(item) for item in stored.get("preprocessors", [])]}
+
+def _run_preprocess(params, inputs):
+    # 위젯이 쓰는 편집기의 createinstance 를 그대로 써서 같은 전처리기를 만듦
+    from Orange.preprocess.preprocess import PreprocessorList
+    from Orange.widgets.data.owpreprocess import PREPROCESS_ACTIONS
+    actions = {action.qualname: action for action in PREPROCESS_ACTIONS}
+    preprocessors = []
+    for qualname, pp_params in params["preprocessors"]:
+        if qualname not in actions: raise UnsupportedWorkflow(f"알 수 없는 전처리: {qualname}")
+        instance = actions[qualname].viewclass.createinstance(pp_params)
+        if instance is not None: preprocessors.append(instance)
+    preprocessor = PreprocessorList(preprocessors); data = _single(inputs, "data")
+    return {"preprocessed_data": preprocessor(data) if data is not None else None, "preprocessor": preprocessor}
+
+def _sampler_params(settings):
+    keys = ("sampling_type", "sampleSizePercentage", "sampleSizeNumber", "number_of_folds", "selectedFold", "replacement", "stratify")
+    return {key: settings.get(key) for key in keys}
+
+def _run_data_sampler(params, inputs):
+    from Orange.widgets.data import owdatasampler as sampler
+    data = _single(inputs, "data")
+    if data is None: return {"data_sample": None, "remaining_data": None}
+    kind = params["sampling_type"]; stratify = bool(params["stratify"])
+    if kind == 0: indices = sampler.SampleRandomP(params["sampleSizePercentage"] / 100, stratified=stratify, random_state=DATA_SAMPLER_SEED)(data)
+    elif kind == 1: indices = sampler.SampleRandomN(params["sampleSizeNumber"], stratified=stratify, replace=bool(params["replacement"]),
+                                                    random_state=DATA_SAMPLER_SEED)(data)
+    elif kind == 2: indices = sampler.SampleFoldIndices(params["number_of_folds"], stratified=stratify,
+                                                        random_state=DATA_SAMPLER_SEED)(data)[params["selectedFold"] - 1]
+    elif kind == 3: indices = sampler.SampleBootstrap(len(data), random_state=DATA_SAMPLER_SEED)(data)
+    else: raise UnsupportedWorkflow(f"알 수 없는 샘플링 방식: {kind}")
+    remaining, sample = indices
+    return {"data_sample": data[sample], "remaining_data": data[remaining]}
+
+def _knn_params(settings):
+    return {"n_neighbors": settings.get("n_neighbors", 5), "metric": KNN_METRICS[settings.get("metric_index", 0)],
+            "weights": KNN_WEIGHTS[settings.get("weight_index", 0)]}
+
+def _tree_params(settings):
+    # OWTreeLearner: 제한을 끈 항목은 Orange 기본값
+    return {"binarize": settings.get("binary_trees", True),
+            "max_depth": settings.get("max_depth", 100) if settings.get("limit_depth", True) else None,
+            "min_samples_split": settings.get("min_internal", 5) if settings.get("limit_min_internal", True) else 2,
+            "min_samples_leaf": settings.get("min_leaf", 2) if settings.get("limit_min_leaf", True) else 1,
+            "sufficient_majority": settings.get("sufficient_majority", 95) / 100 if settings.get("limit_majority", True) else 1}
+
+def _logistic_regression_params(settings):
+    penalty = LR_PENALTIES[settings.get("penalty_type", 1)]
+    return {"penalty": penalty, "C": LR_C_VALUES[settings.get("C_index", 61)] if penalty else 1.0,
+            "class_weight": "balanced" if settings.get("class_weight") else None}
+
+def _learner(class_path):
+    def run(params, inputs):
+        module_name, _, class_name = class_path.rpartition(".")
+        learner = getattr(importlib.import_module(module_name), class_name)(**params)
+        data = _single(inputs, "data")
+        return {"learner": learner, "model": learner(data) if data is not None else None}
+    return run
+
+def _run_predictions(params, inputs):
+    # Predictions 위젯의 CA: data 입력 중 정답이 있는 행에서 예측이 맞은 비율 (모델마다)
+    import numpy as np
+    data = _single(inputs, "data"); models = [model for model in inputs.get("predictors", []) if model is not None]
+    if data is None or not models or data.domain.class_var is None or not data.domain.has_discrete_class:
+        raise UnsupportedWorkflow("Predictions 에 데이터/모델/범주형 타깃이 없음")
+    actual = data.Y if data.Y.ndim == 1 else data.Y[:, 0]
+    known = ~np.isnan(actual)
+    scores = [float(np.mean(model(data)[known] == actual[known])) if known.any() else None for model in models]
+    return {"scores": {"CA": scores}}
+
+WIDGETS = {
+    "File": (_file_params, _run_file),
+    "Preprocess": (_preprocess_params, _run_preprocess),
+    "Data Sampler": (_sampler_params, _run_data_sampler),
+    "kNN": (_knn_params, _learner("Orange.classification.KNNLearner")),
+    "Tree": (_tree_params, _learner("Orange.modelling.TreeLearner")),
+    "Logistic Regression": (_logistic_regression_params, _learner("Orange.classification.LogisticRegressionLearner")),
+    "Predictions": (lambda settings: {}, _run_predictions),
+}
+SCORED_METRICS = ("CA",)
+
+
+class NodeMemo:
+    # 노드 출력 memo. 프로세스 안에서는 LRU dict, 워커들끼리는 디스크의 pickle 파일로 공유
+    # 같은 키를 여러 워커가 동시에 계산하지 않도록 파일 잠금 (DatasetCache 와 같은 방식). 디스크 파일은 이 프로그램이 쓴 것만 읽음
+    def __init__(self, cache_dir=None, max_memory_entries=64, max_disk_bytes=1024 * 1024 * 1024):
+        self.cache_dir = os.path.join(cache_dir or default_cache_dir(), "executor")
+        self.max_memory_entries = max_memory_entries; self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict(); self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key + ".pickle")
+
+    def _remember(self, key, outputs):
+        with self._lock:
+            self._memory[key] = outputs; self._memory.move_to_end(key)
+            while len(self._memory) > self.max_memory_entries: self._memory.popitem(last=False)
+
+    def _lookup(self, key):
+        with self._lock:
+            if key in self._memory: self._memory.move_to_end(key); return self._memory[key]
+        entry_path = self._entry_path(key)
+        try:
+            with open(entry_path, "rb") as f: outputs = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError): return None
+        with contextlib.suppress(OSError): os.utime(entry_path)
+        self._remember(key, outputs)
+        return outputs
+
+    def get_or_compute(self, key, compute):
+        outputs = self._lookup(key)
+        if outputs is not None: self.hits += 1; return outputs
+        try: os.makedirs(os.path.dirname(self._entry_path(key)), exist_ok=True)
+        except OSError: return self._compute(key, compute, persist=False)
+        with file_lock(self._entry_path(key) + ".lock"):
+            outputs = self._lookup(key)  # 다른 워커가 잠금을 잡고 있는 동안 이미 계산했을 수 있음
+            if outputs is not None: self.hits += 1; return outputs
+            return self._compute(key, compute)
+
+    def _compute(self, key, compute, persist=True):
+        self.misses += 1
+        outputs = compute()
+        self._remember(key, outputs)
+        if persist: self._write_disk(key, outputs)
+        return outputs
+
+    def _write_disk(self, key, outputs):
+        entry_path = self._entry_path(key)
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(entry_path), suffix=".tmp")
+            with os.fdopen(fd, "wb") as f: pickle.dump(outputs, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, entry_path)
+        except (OSError, pickle.PicklingError, TypeError, AttributeError):
+            with contextlib.suppress(OSError, UnboundLocalError): os.remove(tmp_path)
+            return
+        self._evict_disk()
+
+    def _evict_disk(self):
+        entries = []; total = 0
+        for dirpath, _, filenames in os.walk(self.cache_dir):
+            for filename in filenames:
+                if not filename.endswith(".pickle"): continue
+                path = os.path.join(dirpath, filename)
+                try: st = os.stat(path)
+                except OSError: continue
+                entries.append((st.st_mtime, st.st_size, path)); total += st.st_size
+        for _, size, path in sorted(entries):
+            if total <= self.max_disk_bytes: break
+            with contextlib.suppress(OSError): os.remove(path); os.remove(path + ".lock")
+            total -= size
+
+_default_memo = None
+
+def get_node_memo():
+    global _default_memo
+    if _default_memo is None: _default_memo = NodeMemo()
+    return _default_memo
+
+
+class WorkflowExecutor:
+    # 한 워크플로에서 요청한 노드의 상류만 실행. key() 는 설정과 상류 키만으로 memo 키를 계산하고(실행 없음)
+    # outputs() 는 memo 에 없을 때만 상류 출력을 가져와 실행 -> Predictions 결과가 memo 에 있으면 앞단 데이터는 읽지도 않음
+    def __init__(self, workflow, memo=None):
+        self.workflow = workflow; self.memo = memo or get_node_memo()
+        self.incoming = {}
+        for link in workflow.links: self.incoming.setdefault(link[1], []).append(link)
+        self._keys = {}; self._plans = {}; self._outputs = {}; self._visiting = set()
+
+    def key(self, node_id):
+        if node_id in self._keys: return self._keys[node_id]
+        if node_id in self._visiting: raise UnsupportedWorkflow("순환 연결")
+        node = self.workflow.node_by_id(node_id)
+        name = node.get('name') if node is not None else None
+        if name not in WIDGETS: raise UnsupportedWorkflow(f"다시 실행할 수 없는 위젯: {name}")
+        make_params, run_widget = WIDGETS[name]
+        self._visiting.add(node_id)
+        try:
+            inputs = {}  # 입력 채널 -> [(상류 출력 키, 상류 노드, 상류 출력 채널)]
+            for source, _, source_channel, sink_channel in self.incoming.get(node_id, []):
+                inputs.setdefault(sink_channel, []).append((f"{self.key(source)}:{source_channel}", source, source_channel))
+        finally: self._visiting.discard(node_id)
+        for entries in inputs.values(): entries.sort()  # 링크 순서와 상관없이 같은 키
+        settings = self.workflow.settings(node_id)
+        params = make_params(settings if isinstance(settings, dict) else {})
+        node_key = _digest([EXECUTOR_VERSION, name, params, {channel: [e[0] for e in entries] for channel, entries in inputs.items()}])
+        self._keys[node_id] = node_key; self._plans[node_id] = (run_widget, params, inputs)
+        return node_key
+
+    def outputs(self, node_id):
+        # {출력 채널: 값}
+        if node_id in self._outputs: return self._outputs[node_id]
+        node_key = self.key(node_id); run_widget, params, inputs = self._plans[node_id]
+        def compute():
+            return run_widget(params, {channel: [self.outputs(source).get(source_channel) for _, source, source_channel in entries]
+                                       for channel, entries in inputs.items()})
+        self._outputs[node_id] = self.memo.get_or_compute(node_key, compute)
+        return self._outputs[node_id]
+
+
+def recompute_scores(workflow, predictions_node_id=None, metric="CA"):
+    # Predictions 위젯까지 다시 실행해서 얻은 지표 값 (모델이 여러 개면 가장 높은 값)
+    # Orange 가 없거나, 지원하지 않는 위젯/설정이 경로에 있거나, 실행 중 오류가 나면 None (호출한 쪽에서 저장된 값을 씀)
+    if not ORANGE_AVAILABLE_PARSER or workflow is None or metric.upper() not in SCORED_METRICS: return None
+    node_id = predictions_node_id or workflow.node_id("Predictions")
+    if not node_id: return None
+    try: scores = WorkflowExecutor(workflow).outputs(node_id)["scores"]
+    except MemoryError: raise
+    except Exception: return None
+    values = [score for score in scores.get(metric.upper(), []) if score is not None]
+    return max(values) if values else None
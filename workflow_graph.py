@@ -0,0 +1,101 @@
+# workflow_graph.py
+
+def normalize_channel(channel):
+    # 예전 .ows 에는 channel_id 없이 채널 이름("Preprocessed Data")만 있음 -> id 형식("preprocessed_data")으로 맞춤
+    if channel is None: return None
+    return "_".join(channel.strip().lower().split())
+
+
+class ReachabilityIndex:
+    # enabled 링크 그래프의 도달 가능성 색인. 한 번 선형 시간에 만들고 나면 질의는 정수 비트 연산 한 번
+    # - reach[i]: 노드 i 에서 링크를 하나 이상 따라가서 닿는 노드들의 비트셋 (강한 연결 요소로 묶어 순환도 처리)
+    # - out_masks[(노드, source 채널)]: 그 채널로 나가는 첫 링크 다음 노드 + 그 노드에서 닿는 노드 (채널 None 은 모든 채널)
+    # - in_masks[(노드, sink 채널)]: 그 채널로 들어오는 마지막 링크의 출발 노드 (채널 None 은 모든 채널)
+    # "source 가 채널 X 로 내보낸 것이 (중간 위젯을 거쳐) sink 의 채널 Y 로 들어가는가"
+    #   = 두 채널이 맞는 직접 링크가 있거나, out_mask & in_mask != 0 (첫 링크 뒤에 닿는 노드 중 하나가 마지막 링크의 출발 노드)
+    def __init__(self, node_ids, links):
+        self.node_ids = list(node_ids)
+        self.index = {node_id: i for i, node_id in enumerate(self.node_ids)}
+        successors = [set() for _ in self.node_ids]
+        edges = []
+        for source, sink, source_channel, sink_channel in links:
+            i, j = self.index.get(source), self.index.get(sink)
+            if i is None or j is None: continue
+            successors[i].add(j); edges.append((i, j, source_channel, sink_channel))
+        self.reach = self._closure(successors)
+        self.out_masks = {}; self.in_masks = {}; self.direct = set()
+        for i, j, source_channel, sink_channel in edges:
+            for s_ch in (source_channel, None):
+                for t_ch in (sink_channel, None): self.direct.add((i, j, s_ch, t_ch))
+            forward = (1 << j) | self.reach[j]
+            for key in ((i, source_channel), (i, None)): self.out_masks[key] = self.out_masks.get(key, 0) | forward
+            for key in ((j, sink_channel), (j, None)): self.in_masks[key] = self.in_masks.get(key, 0) | (1 << i)
+
+    @staticmethod
+    def _closure(successors):
+        # Tarjan 으로 강한 연결 요소를 찾고(반복문, 재귀 한도 없음), 요소들의 역위상 순서로 비트셋을 합침
+        n = len(successors)
+        index_of = [None] * n; lowlink = [0] * n; on_stack = [False] * n
+        stack = []; components = []; counter = 0
+        for root in range(n):
+            if index_of[root] is not None: continue
+            work = [(root, iter(successors[root]))]
+            index_of[root] = lowlink[root] = counter; counter += 1; stack.append(root); on_stack[root] = True
+            while work:
+                node, children = work[-1]
+                advanced = False
+                for child in children:
+                    if index_of[child] is None:
+                        index_of[child] = lowlink[child] = counter; counter += 1; stack.append(child); on_stack[child] = True
+                        work.append((child, iter(successors[child]))); advanced = True; break
+                    if on_stack[child]: lowlink[node] = min(lowlink[node], index_of[child])
+                if advanced: continue
+                work.pop()
+                if work: lowlink[work[-1][0]] = min(lowlink[work[-1][0]], lowlink[node])
+                if lowlink[node] == index_of[node]:
+                    component = []
+                    while True:
+                        member = stack.pop(); on_stack[member] = False; component.append(member)
+                        if member == node: break
+                    components.append(component)
+        # Tarjan 은 요소를 역위상 순서(하류 먼저)로 내보내므로 그대로 한 번만 훑으면 됨
+        component_of = [0] * n
+        for c, component in enumerate(components):
+            for member in component: component_of[member] = c
+        component_reach = [0] * len(components)
+        for c, component in enumerate(components):
+            bits = 0; members = 0
+            for member in component:
+                members |= 1 << member
+                for child in successors[member]:
+                    if component_of[child] != c: bits |= (1 << child) | component_reach[component_of[child]]
+            if len(component) > 1 or any(member in successors[member] for member in component): bits |= members
+            component_reach[c] = bits
+        return [component_reach[component_of[i]] for i in range(n)]
+
+    def reaches(self, source_id, sink_id):
+        i, j = self.index.get(source_id), self.index.get(sink_id)
+        return i is not None and j is not None and bool(self.reach[i] >> j & 1)
+
+    def has_path(self, source_id, sink_id, source_channel=None, sink_channel=None):
+        # source 의 source_channel 출력에서 sink 의 sink_channel 입력까지 이어지는 경로가 있는가 (직접 연결 포함)
+        i, j = self.index.get(source_id), self.index.get(sink_id)
+        if i is None or j is None: return False
+        source_channel = normalize_channel(source_channel); sink_channel = normalize_channel(sink_channel)
+        if (i, j, source_channel, sink_channel) in self.direct: return True
+        return bool(self.out_masks.get((i, source_channel), 0) & self.in_masks.get((j, sink_channel), 0))
+
+    def _ids(self, bits):
+        return [node_id for i, node_id in enumerate(self.node_ids) if bits >> i & 1]
+
+    def downstream(self, source_id):
+        i = self.index.get(source_id)
+        return self._ids(self.reach[i]) if i is not None else []
+
+    def upstream(self, sink_id, sink_channel=None):
+        # sink 로 (sink_channel 입력을 통해) 흘러 들어오는 노드들. 예: Test and Score 의 learner 입력에 닿는 학습기
+        j = self.index.get(sink_id)
+        if j is None: return []
+        last_hops = self.in_masks.get((j, normalize_channel(sink_channel)), 0)
+        return [node_id for i, node_id in enumerate(self.node_ids)
+                if (last_hops >> i & 1) or self.reach[i] & last_hops]
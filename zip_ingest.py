@@ -0,0 +1,148 @@
+# zip_ingest.py
+
+import os
+import re
+import sys
+import zlib
+import argparse
+import zipfile
+import unicodedata
+
+# LMS 에서 받은 ZIP 을 풀지 않고 바로 채점. ZIP 안의 제출물은 "반.zip::폴더/30101 홍길동.ows" 형태의 경로 문자열로 다룸
+# (그대로 피클되어 워커로 넘어가고, CSV 의 file 열에도 그대로 남음)
+MEMBER_SEPARATOR = "::"
+UTF8_NAME_FLAG = 0x800
+ZIP_ERRORS = (zipfile.BadZipFile, zlib.error, EOFError)  # 깨진 ZIP/멤버 -> 읽을 수 없는 파일로 취급
+SKIPPED_PREFIXES = ("__MACOSX/",)
+
+# LMS 가 파일 이름 앞에 붙이는 접두어. 떼고 남은 부분이 학생이 올린 원래 파일 이름
+LMS_PREFIXES = [
+    re.compile(r"^(?P<who>.*?)_\d+_assignsubmission_(?:file|onlinetext)_(?P<rest>.*)$"),  # Moodle
+    re.compile(r"^(?P<who>.*?)_attempt_\d{4}(?:-\d{2}){5}_?(?P<rest>.*)$"),                 # Blackboard
+    re.compile(r"^(?P<who>[^_]+)_(?:late_)?\d+_\d+_(?P<rest>.*)$", re.IGNORECASE),         # Canvas
+]
+STUDENT_PATTERN = re.compile(r"^(?P<id>\d{4,10})(?:[\s_\-.]+(?P<name>.*?))?$")
+COPY_SUFFIX = re.compile(r"(?:\s*\(\d+\)|-\d{1,2})$")  # "30101 홍길동 (1)", Canvas 재제출 "-1"
+
+
+def split_member_path(path):
+    # (ZIP 경로, 멤버 이름) 또는 일반 파일이면 (경로, None)
+    archive, separator, member = path.partition(MEMBER_SEPARATOR)
+    if separator and archive.lower().endswith(".zip"): return archive, member
+    return path, None
+
+def member_path(archive, member):
+    return f"{archive}{MEMBER_SEPARATOR}{member}"
+
+def decode_member_name(info):
+    # UTF-8 플래그가 없는 이름은 zipfile 이 cp437 로 읽어 둔 것 -> 원래 바이트로 되돌려 UTF-8, cp949 순으로 다시 해석
+    # macOS 에서 만든 ZIP 은 한글이 NFD(자모 분리)로 들어 있으므로 NFC 로 맞춤
+    name = info.filename
+    if not info.flag_bits & UTF8_NAME_FLAG:
+        raw = name.encode("cp437")
+        for encoding in ("utf-8", "cp949"):
+            try: name = raw.decode(encoding); break
+            except UnicodeDecodeError: continue
+    return unicodedata.normalize("NFC", name.replace("\\", "/"))
+
+def _is_submission(name, info):
+    base = name.rsplit("/", 1)[-1]
+    return not info.is_dir() and base.lower().endswith(".ows") and not base.startswith("._") \
+        and not name.startswith(SKIPPED_PREFIXES)
+
+
+class ZipArchiveIndex:
+    # ZIP 중앙 디렉터리를 한 번 읽어서 멤버 이름(디코딩한 것) -> ZipInfo. ZipInfo 에 로컬 헤더 오프셋이 있으므로
+    # 멤버를 열 때는 그 위치로 바로 가서 그 멤버만 압축을 풂 (다른 멤버나 임시 파일을 거치지 않음)
+    def __init__(self, archive_path):
+        self.path = archive_path
+        self.signature = _signature(archive_path)
+        self.archive = zipfile.ZipFile(archive_path)
+        self.members = {}
+        for info in self.archive.infolist(): self.members.setdefault(decode_member_name(info), info)
+
+    def submissions(self):
+        return sorted(name for name, info in self.members.items() if _is_submission(name, info))
+
+    def open(self, member):
+        info = self.members.get(unicodedata.normalize("NFC", member))
+        if info is None: raise FileNotFoundError(member_path(self.path, member))
+        return self.archive.open(info)
+
+    def close(self):
+        self.archive.close()
+
+def _signature(path):
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+_archives = {}
+
+def get_archive_index(archive_path):
+    # 프로세스마다 ZIP 하나당 한 번만 색인 (워커들은 각자 열어서 서로 다른 멤버를 동시에 읽음). ZIP 이 바뀌면 다시 색인
+    archive_path = os.path.abspath(archive_path)
+    index = _archives.get(archive_path)
+    if index is not None and index.signature != _signature(archive_path):
+        index.close(); index = None
+    if index is None: index = _archives[archive_path] = ZipArchiveIndex(archive_path)
+    return index
+
+def open_submission(path):
+    # 일반 파일이든 ZIP 멤버든 바이너리 읽기용 파일 객체 (seek 가능)
+    archive, member = split_member_path(path)
+    if member is None: return open(path, "rb")
+    return get_archive_index(archive).open(member)
+
+def submission_exists(path):
+    archive, member = split_member_path(path)
+    if member is None: return os.path.isfile(path)
+    try: return unicodedata.normalize("NFC", member) in get_archive_index(archive).members
+    except (OSError,) + ZIP_ERRORS: return False
+
+def submission_size(path):
+    # 제출물 크기(바이트, ZIP 멤버는 풀었을 때 크기). 읽을 수 없으면 0
+    archive, member = split_member_path(path)
+    try:
+        if member is None: return os.path.getsize(path)
+        info = get_archive_index(archive).members.get(unicodedata.normalize("NFC", member))
+    except (OSError,) + ZIP_ERRORS: return 0
+    return info.file_size if info is not None else 0
+
+def list_zip_submissions(archive_path):
+    return [member_path(archive_path, name) for name in get_archive_index(archive_path).submissions()]
+
+
+def parse_member_name(member):
+    # LMS 가 바꿔 놓은 멤버 이름 -> (학번, 이름). 파일 이름, 그다음 상위 폴더 이름 순으로 "학번 이름" 을 찾음
+    # 예: "홍길동_1234567_assignsubmission_file_/30101 홍길동.ows", "hongkildong_LATE_123_456_30101_홍길동-1.ows"
+    parts = [part for part in member.split("/") if part]
+    candidates = [os.path.splitext(parts[-1])[0] if parts else ""] + parts[-2::-1]
+    lms_name = ""
+    for candidate in candidates:
+        rest = candidate.strip()
+        for pattern in LMS_PREFIXES:
+            matched = pattern.match(rest)
+            if matched: rest = matched.group("rest").strip(); lms_name = lms_name or matched.group("who").replace("_", " ").strip(); break
+        rest = COPY_SUFFIX.sub("", rest).strip()
+        matched = STUDENT_PATTERN.match(rest)
+        if matched: return matched.group("id"), (matched.group("name") or "").replace("_", " ").strip() or lms_name
+    # 학번을 못 찾으면: LMS 가 붙인 이름이 있으면 (학번 없음, 그 이름), 없으면 parse_filename 과 같이 첫 단어/나머지
+    if lms_name: return "", lms_name
+    head, _, tail = candidates[0].partition(" ")
+    return head, tail
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="LMS ZIP 안의 .ows 제출물과 해석한 학번/이름 목록 (압축을 풀지 않음)")
+    parser.add_argument("archive", help="LMS 에서 내려받은 ZIP 파일")
+    args = parser.parse_args(argv)
+    paths = list_zip_submissions(args.archive)
+    for path in paths:
+        member = split_member_path(path)[1]
+        student_id, student_name = parse_member_name(member)
+        print(f"{student_id:>10}  {student_name:<12}  {member}")
+    print(f"제출물 {len(paths)}개")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())